@@ -47,10 +47,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'major.middleware.SQLProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'company.middleware.CompanyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,10 +81,70 @@ WSGI_APPLICATION = 'Poultry.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# DATABASE_ENGINE selects the backend: the tuned SQLite profile below, or
+# PostgreSQL with persistent connections or psycopg's connection pool.
+
+DATABASE_ENGINE = config('DATABASE_ENGINE', default='django.db.backends.sqlite3')
+
+if DATABASE_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DATABASE_ENGINE,
+            'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+            'OPTIONS': {
+                # Applied to every new connection. WAL lets readers run alongside
+                # the single writer; NORMAL only syncs at checkpoints under WAL.
+                'init_command': ';'.join([
+                    'PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=NORMAL',
+                    f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int)}",
+                    f"PRAGMA busy_timeout={config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)}",
+                    'PRAGMA temp_store=MEMORY',
+                ]),
+                # Take the write lock at BEGIN so concurrent writers wait on
+                # busy_timeout instead of failing when upgrading a read lock
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': DATABASE_ENGINE,
+            'NAME': config('DATABASE_NAME', default='poultry'),
+            'USER': config('DATABASE_USER', default=''),
+            'PASSWORD': config('DATABASE_PASSWORD', default=''),
+            'HOST': config('DATABASE_HOST', default='localhost'),
+            'PORT': config('DATABASE_PORT', default='5432'),
+            # Pooled connections are returned after each request, so they cannot
+            # also be persistent
+            'CONN_MAX_AGE': 0 if DATABASE_POOL else config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if DATABASE_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Per-process memory by default. Use a shared backend in production so
+# versions, fragments and counters are shared between workers, e.g.
+# django.core.cache.backends.filebased.FileBasedCache with a directory, or
+# django.core.cache.backends.redis.RedisCache with redis://host:6379/0.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
     }
 }
 
@@ -133,6 +195,54 @@ LOGIN_REDIRECT_URL = 'company:dashboard'
 LOGIN_URL = 'company:login'
 LOGOUT_REDIRECT_URL = 'company:login'
 
+# Seconds a user's resolved company is cached (see company.tenancy)
+COMPANY_CACHE_TIMEOUT = config('COMPANY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a rendered batch detail tab or inventory page is cached (see products.fragments)
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Rows written per transaction by the bulk health check / feed importers
+BULK_IMPORT_CHUNK_SIZE = config('BULK_IMPORT_CHUNK_SIZE', default=500, cast=int)
+
+# Closed batches untouched for this many days are moved to per-company
+# archive files under ARCHIVE_ROOT (see products.archive)
+ARCHIVE_ROOT = config('ARCHIVE_ROOT', default=str(BASE_DIR / 'archive'))
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=365, cast=int)
+
+# Per-request SQL profiling (see major.profiling); off unless SQL_PROFILING=True
+SQL_PROFILING = config('SQL_PROFILING', default=False, cast=bool)
+SQL_PROFILING_SLOW_MS = config('SQL_PROFILING_SLOW_MS', default=100, cast=float)
+# A fingerprint repeated this many times in one request is reported as an N+1
+SQL_PROFILING_DUPLICATE_THRESHOLD = config('SQL_PROFILING_DUPLICATE_THRESHOLD', default=5, cast=int)
+SQL_PROFILING_BUFFER_SIZE = config('SQL_PROFILING_BUFFER_SIZE', default=200, cast=int)
+SQL_PROFILING_LOG = config('SQL_PROFILING_LOG', default=str(BASE_DIR / 'sql_profile.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'sql_profile': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SQL_PROFILING_LOG,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            # The file is only created once something is logged
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'poultry.sql': {
+            'handlers': ['sql_profile'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Allow login with email or username
 AUTHENTICATION_BACKENDS = [
     'company.backends.EmailOrUsernameBackend',
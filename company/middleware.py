@@ -0,0 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from company.tenancy import get_request_tenancy
+
+
+class CompanyMiddleware:
+    """
+    Attach the active company and membership to the request as
+    ``request.company`` and ``request.company_membership``.
+
+    Both are resolved lazily and at most once per request, so views that do
+    not touch them pay nothing. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.company = SimpleLazyObject(lambda: get_request_tenancy(request).company)
+        request.company_membership = SimpleLazyObject(lambda: get_request_tenancy(request).membership)
+        return self.get_response(request)
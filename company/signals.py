@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from company.models import Company, CompanyMembership
+from company.tenancy import invalidate_company, invalidate_user
+
+
+@receiver([post_save, post_delete], sender=CompanyMembership)
+def membership_changed(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, **kwargs):
+    invalidate_company(instance)
+
+
+@receiver(post_delete, sender=Company)
+def company_deleted(sender, instance, **kwargs):
+    # Cascaded membership deletes already cleared the members' entries.
+    invalidate_user(instance.owner_id)
@@ -0,0 +1,110 @@
+"""
+Resolution of the active company for a user.
+
+The active membership (or, failing that, an owned company) is looked up once
+and cached by user id, so scoped views do not repeat the lookup on every
+request. Cache entries are dropped by the signal handlers in company.signals
+whenever a Company or CompanyMembership changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from company.models import Company, CompanyMembership
+
+CACHE_KEY = 'company:tenancy:{user_id}'
+CACHE_TIMEOUT = getattr(settings, 'COMPANY_CACHE_TIMEOUT', 300)
+
+
+class Tenancy:
+    """The company a user acts for and the membership granting it"""
+
+    def __init__(self, company=None, membership=None):
+        self.company = company
+        self.membership = membership
+
+
+def cache_key(user_id):
+    return CACHE_KEY.format(user_id=user_id)
+
+
+def lookup_tenancy(user):
+    """Resolve the user's company from the database (at most two queries)"""
+    membership = CompanyMembership.objects.filter(
+        user=user,
+        is_active=True
+    ).select_related('company').first()
+    if membership:
+        return Tenancy(membership.company, membership)
+
+    company = Company.objects.filter(owner=user).first()
+    return Tenancy(company)
+
+
+def get_tenancy(user):
+    """Return the cached Tenancy for a user, resolving it on a cache miss"""
+    if not user.is_authenticated:
+        return Tenancy()
+
+    key = cache_key(user.pk)
+    tenancy = cache.get(key)
+    if tenancy is None:
+        tenancy = lookup_tenancy(user)
+        cache.set(key, tenancy, CACHE_TIMEOUT)
+    return tenancy
+
+
+async def alookup_tenancy(user):
+    """Async lookup_tenancy"""
+    membership = await CompanyMembership.objects.filter(
+        user=user,
+        is_active=True
+    ).select_related('company').afirst()
+    if membership:
+        return Tenancy(membership.company, membership)
+
+    company = await Company.objects.filter(owner=user).afirst()
+    return Tenancy(company)
+
+
+async def aget_tenancy(user):
+    """Async get_tenancy, sharing its cache entries"""
+    if not user.is_authenticated:
+        return Tenancy()
+
+    key = cache_key(user.pk)
+    tenancy = await cache.aget(key)
+    if tenancy is None:
+        tenancy = await alookup_tenancy(user)
+        await cache.aset(key, tenancy, CACHE_TIMEOUT)
+    return tenancy
+
+
+def get_request_tenancy(request):
+    """Resolve the Tenancy for a request, memoized on the request object"""
+    if not hasattr(request, '_cached_tenancy'):
+        request._cached_tenancy = get_tenancy(request.user)
+    return request._cached_tenancy
+
+
+async def aget_request_tenancy(request):
+    """Async get_request_tenancy; resolves the user with ``request.auser()``"""
+    if not hasattr(request, '_cached_tenancy'):
+        request._cached_tenancy = await aget_tenancy(await request.auser())
+    return request._cached_tenancy
+
+
+def get_request_company(request):
+    return get_request_tenancy(request).company
+
+
+def invalidate_user(user_id):
+    cache.delete(cache_key(user_id))
+
+
+def invalidate_company(company):
+    """Drop cached tenancy for the owner and every member of a company"""
+    user_ids = set(
+        CompanyMembership.objects.filter(company=company).values_list('user_id', flat=True)
+    )
+    user_ids.add(company.owner_id)
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
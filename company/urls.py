@@ -1,7 +1,7 @@
 from django.urls import path
 from company import views
 from company.views import CompanyRegistrationView, CompanyLoginView, CompanyLogoutView, CompanyDashboardView, \
-    CompanyProfileView, CompanyRegView
+    AsyncCompanyDashboardView, CompanyProfileView, CompanyRegView
 
 app_name = 'company'
 
@@ -13,6 +13,7 @@ urlpatterns = [
 
     # Dashboard & Profile
     path('dashboard/', CompanyDashboardView.as_view(), name='dashboard'),
+    path('dashboard/async/', AsyncCompanyDashboardView.as_view(), name='dashboard_async'),
     path('profile/', CompanyProfileView.as_view(), name='profile'),
 
     # Legacy routes for backward compatibility
@@ -1,10 +1,11 @@
 from datetime import timedelta
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, resolve_url
+from django.template.response import TemplateResponse
 from django.views import View
 from django.views.generic import TemplateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.views import LogoutView, LoginView
+from django.contrib.auth.views import LogoutView, LoginView, redirect_to_login
 from django.contrib.auth import login
 from django.contrib import messages
 from django.urls import reverse_lazy
@@ -13,6 +14,8 @@ from django.utils import timezone
 
 from company.models import Company, CompanyMembership
 from company.forms import CompanyRegistrationForm, CompanyProfileForm, LoginForm
+from company.tenancy import aget_request_tenancy, get_request_tenancy
+from products.asyncdb import gather_queries
 
 
 
@@ -79,124 +82,70 @@ class CompanyLogoutView(LogoutView):
         return super().dispatch(request, *args, **kwargs)
 
 
-class CompanyDashboardView(LoginRequiredMixin, TemplateView):
+class DashboardQueriesMixin:
     """
-    Main dashboard for company users showing overview of operations
+    The dashboard's independent queries, shared by the sync and async views
     """
     template_name = 'company/company_dashboard.html'
-    login_url = 'company:login'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def dashboard_queries(self, company):
+        """Zero-argument callables, by name, each running one query"""
+        from products.models import ChickBatch, InventoryProduct
+        from products.outbreaks import active_outbreaks
+        from products.stats import batch_aggregates, inventory_aggregates
 
-        # Get user's active company membership
-        membership = CompanyMembership.objects.filter(
-            user=self.request.user,
-            is_active=True
-        ).select_related('company').first()
-
-        if membership:
-            company = membership.company
-            context['company'] = company
-            context['membership'] = membership
-
-            # Get company statistics
-            from products.models import ChickBatch, InventoryProduct, ChickStatus
-
-            # Basic stats
-            all_batches = ChickBatch.objects.filter(company=company)
-            active_batches = all_batches.filter(status=ChickStatus.ACTIVE)
-
-            # Calculate total chicks for active batches
-            total_chicks = 0
-            for batch in active_batches:
-                total_chicks += batch.current_count if batch.current_count is not None else batch.initial_count
-
-            context['stats'] = {
-                'total_batches': all_batches.count(),
-                'active_batches': active_batches.count(),
-                'total_chicks': total_chicks,
-                'inventory_items': InventoryProduct.objects.filter(
-                    company=company,
-                    is_active=True
-                ).count(),
-                'low_stock_items': InventoryProduct.objects.filter(
-                    company=company,
-                    is_active=True,
-                    stock_on_hand__lte=models.F('reorder_point')
-                ).count() if InventoryProduct.objects.filter(company=company).exists() else 0,
-            }
-
-            # Enhanced performance metrics
-            if active_batches.exists():
-                today = timezone.now().date()
-
-                # Calculate average batch age
-                total_age = 0
-                valid_batches = 0
-                for batch in active_batches:
-                    if batch.hatch_date:
-                        age_days = (today - batch.hatch_date).days
-                        total_age += age_days
-                        valid_batches += 1
-
-                if valid_batches > 0:
-                    context['stats']['avg_batch_age'] = total_age // valid_batches
-
-                # Calculate mortality rate
-                total_initial = sum(batch.initial_count for batch in active_batches)
-                total_current = 0
-                for batch in active_batches:
-                    total_current += batch.current_count if batch.current_count is not None else batch.initial_count
-
-                if total_initial > 0:
-                    mortality_rate = ((total_initial - total_current) / total_initial) * 100
-                    context['stats']['mortality_rate'] = round(mortality_rate, 1)
-
-                # Oldest active batch age
-                oldest_batch = None
-                for batch in active_batches:
-                    if batch.hatch_date:
-                        if oldest_batch is None or batch.hatch_date < oldest_batch.hatch_date:
-                            oldest_batch = batch
-
-                if oldest_batch and oldest_batch.hatch_date:
-                    context['stats']['oldest_active_batch'] = (today - oldest_batch.hatch_date).days
-
-            # Recent activity simulation
-            context['recent_activities'] = self.get_recent_activities(company)
-
-            # Alerts and notifications
-            context['alerts'] = self.get_alerts(company)
-            context['alerts_count'] = len(context['alerts'])
-
-            # Recent batches (age_days is already calculated via @property in model)
-            recent_batches = all_batches.select_related().order_by('-created_at')[:5]
-
-
-            context['recent_batches'] = recent_batches
-
-        else:
-            context['company'] = None
-            messages.warning(
-                self.request,
-                'You are not associated with any company. Please contact support.'
-            )
-
-        return context
+        today = timezone.now().date()
+        return {
+            'batch_totals': lambda: batch_aggregates(company, today),
+            'inventory_totals': lambda: inventory_aggregates(company),
+            'new_batches': lambda: list(ChickBatch.objects.filter(
+                company=company,
+                created_at__gte=timezone.now() - timedelta(days=1)
+            )[:3]),
+            'low_stock': lambda: list(InventoryProduct.objects.filter(
+                company=company,
+                stock_on_hand__lte=models.F('reorder_point'),
+                is_active=True
+            )[:2]),
+            'alerts': lambda: self.get_alerts(company),
+            'outbreaks': lambda: list(active_outbreaks(company)),
+            'recent_batches': lambda: list(
+                ChickBatch.objects.filter(company=company).select_related().order_by('-created_at')[:5]
+            ),
+        }
+
+    def dashboard_context(self, tenancy, results):
+        """Template context from the dashboard_queries results"""
+        from products.stats import build_dashboard_stats
+
+        return {
+            'company': tenancy.company,
+            'membership': tenancy.membership,
+            'stats': build_dashboard_stats(results['batch_totals'], results['inventory_totals']),
+            'recent_activities': self.build_activities(results['new_batches'], results['low_stock']),
+            'alerts': results['alerts'],
+            'alerts_count': len(results['alerts']),
+            'outbreaks': results['outbreaks'],
+            'recent_batches': results['recent_batches'],
+        }
+
+    def no_company_context(self):
+        messages.warning(
+            self.request,
+            'You are not associated with any company. Please contact support.'
+        )
+        return {'company': None}
 
     def get_recent_activities(self, company):
         """Get recent activities for the company"""
+        queries = self.dashboard_queries(company)
+        return self.build_activities(queries['new_batches'](), queries['low_stock']())
+
+    def build_activities(self, new_batches, low_stock):
         activities = []
 
         # Check for recent batch creations
-        from products.models import ChickBatch
-        recent_batches = ChickBatch.objects.filter(
-            company=company,
-            created_at__gte=timezone.now() - timedelta(days=1)
-        )[:3]
-
-        for batch in recent_batches:
+        for batch in new_batches:
             activities.append({
                 'icon': 'plus-circle',
                 'color': 'success',
@@ -205,13 +154,6 @@ class CompanyDashboardView(LoginRequiredMixin, TemplateView):
             })
 
         # Check for low inventory
-        from products.models import InventoryProduct
-        low_stock = InventoryProduct.objects.filter(
-            company=company,
-            stock_on_hand__lte=models.F('reorder_point'),
-            is_active=True
-        )[:2]
-
         for item in low_stock:
             activities.append({
                 'icon': 'exclamation-triangle',
@@ -223,56 +165,61 @@ class CompanyDashboardView(LoginRequiredMixin, TemplateView):
         return activities
 
     def get_alerts(self, company):
-        """Get current alerts for the company"""
-        alerts = []
-
-        # Check for batches needing attention
-        from products.models import ChickBatch, ChickStatus
-        active_batches = ChickBatch.objects.filter(
-            company=company,
-            status=ChickStatus.ACTIVE
-        )
+        """Get current alerts for the company (maintained by products.alerts)"""
+        from products.alerts import open_alerts_for
+        return list(open_alerts_for(company))
 
-        today = timezone.now().date()
 
-        for batch in active_batches:
-            # Calculate current count safely
-            current_count = batch.current_count if batch.current_count is not None else batch.initial_count
-
-            # Check for high mortality (more than 10% loss)
-            if current_count < batch.initial_count * 0.9:
-                alerts.append({
-                    'priority': 'high',
-                    'title': 'High Mortality Rate',
-                    'message': f'Batch #{batch.id} has significant losses'
-                })
-
-            # Check for old batches (older than 365 days)
-            if batch.hatch_date:
-                age_days = (today - batch.hatch_date).days
-                if age_days > 365:
-                    alerts.append({
-                        'priority': 'medium',
-                        'title': 'Batch Aging',
-                        'message': f'Batch #{batch.id} is over 1 year old'
-                    })
-
-        # Check for critical low inventory
-        from products.models import InventoryProduct
-        critical_stock = InventoryProduct.objects.filter(
-            company=company,
-            stock_on_hand=0,  # Completely out of stock
-            is_active=True
-        )
+class CompanyDashboardView(LoginRequiredMixin, DashboardQueriesMixin, TemplateView):
+    """
+    Main dashboard for company users showing overview of operations
+    """
+    login_url = 'company:login'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        # Get user's active company membership (cached per user)
+        tenancy = get_request_tenancy(self.request)
+
+        if tenancy.company:
+            # Aggregated in SQL: the query count does not grow with the company
+            queries = self.dashboard_queries(tenancy.company)
+            results = {name: query() for name, query in queries.items()}
+            context.update(self.dashboard_context(tenancy, results))
+        else:
+            context.update(self.no_company_context())
+
+        return context
+
+
+class AsyncCompanyDashboardView(DashboardQueriesMixin, View):
+    """
+    The dashboard as an async view: its six queries run concurrently (see
+    products.asyncdb), so the page waits for the slowest query instead of
+    the sum of all of them. Served natively under ASGI.
+    """
+    login_url = 'company:login'
+
+    async def get(self, request):
+        # LoginRequiredMixin.dispatch is sync, so check the user here
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), resolve_url(self.login_url))
+        # Templates and context processors read request.user in a sync thread
+        request.user = user
+
+        tenancy = await aget_request_tenancy(request)
+        if tenancy.company:
+            queries = self.dashboard_queries(tenancy.company)
+            results = dict(zip(queries, await gather_queries(*queries.values())))
+            context = self.dashboard_context(tenancy, results)
+        else:
+            context = self.no_company_context()
+        context['view'] = self
+        return TemplateResponse(request, self.template_name, context)
 
-        for item in critical_stock:
-            alerts.append({
-                'priority': 'high',
-                'title': 'Out of Stock',
-                'message': f'{item.name} is completely out of stock'
-            })
 
-        return alerts
 class CompanyProfileView(LoginRequiredMixin, UpdateView):
     """
     View for updating company profile
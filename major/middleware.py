@@ -0,0 +1,36 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from major import profiling
+
+
+class SQLProfilingMiddleware:
+    """
+    Opt-in (settings.SQL_PROFILING) per-request SQL profiling: query count,
+    DB time, slow queries and repeated fingerprints. Adds a Server-Timing
+    header and records the profile (see major.profiling). Queries run while a
+    streaming response is being consumed are not included.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = profiling.QueryRecorder(settings.SQL_PROFILING_SLOW_MS)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        profile = profiling.build_profile(request, response, recorder, total_ms)
+        profiling.record(profile)
+        response['Server-Timing'] = profiling.server_timing(profile)
+        return response
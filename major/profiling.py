@@ -0,0 +1,126 @@
+"""
+Per-request SQL profiling.
+
+A QueryRecorder is installed with ``connection.execute_wrapper`` for the
+duration of a request (see major.middleware). It times every query and
+groups them by fingerprint: the SQL with literals and IN lists normalised.
+When one fingerprint runs many times in a request, something is querying per
+row (an N+1), e.g. a template touching a relation that was not
+select_related.
+
+Finished profiles go to the ``poultry.sql`` logger as JSON and into an
+in-process ring buffer shown on the staff profiling page.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger('poultry.sql')
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalised SQL and a short hash identifying its shape"""
+    normalised = _IN_LIST.sub('IN (...)', sql)
+    normalised = _STRING.sub('?', normalised)
+    normalised = _NUMBER.sub('?', normalised)
+    normalised = _WHITESPACE.sub(' ', normalised).strip()
+    return hashlib.sha1(normalised.encode()).hexdigest()[:12], normalised
+
+
+class QueryRecorder:
+    """execute_wrapper callable collecting timings and fingerprints of one request"""
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.duration += elapsed
+            key, normalised = fingerprint(sql)
+            entry = self.fingerprints.setdefault(key, {'fingerprint': key, 'sql': normalised, 'count': 0, 'ms': 0.0})
+            entry['count'] += 1
+            entry['ms'] += elapsed
+            if elapsed >= self.slow_ms:
+                self.slow.append({'fingerprint': key, 'sql': normalised, 'ms': round(elapsed, 2)})
+
+    def duplicates(self, threshold):
+        """Fingerprints executed at least ``threshold`` times, most repeated first"""
+        repeated = [dict(entry, ms=round(entry['ms'], 2)) for entry in self.fingerprints.values()
+                    if entry['count'] >= threshold]
+        return sorted(repeated, key=lambda entry: entry['count'], reverse=True)
+
+
+class ProfileBuffer:
+    """Thread-safe ring buffer of the most recent request profiles (per process)"""
+
+    def __init__(self, size):
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def snapshot(self):
+        """Profiles newest first"""
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+buffer = ProfileBuffer(settings.SQL_PROFILING_BUFFER_SIZE)
+
+
+def build_profile(request, response, recorder, total_ms):
+    duplicates = recorder.duplicates(settings.SQL_PROFILING_DUPLICATE_THRESHOLD)
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'timestamp': time.time(),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'queries': recorder.count,
+        'db_ms': round(recorder.duration, 2),
+        'total_ms': round(total_ms, 2),
+        'duplicates': duplicates,
+        'slow': recorder.slow,
+        'flagged': bool(duplicates or recorder.slow),
+    }
+
+
+def record(profile):
+    buffer.append(profile)
+    level = logging.WARNING if profile['flagged'] else logging.INFO
+    logger.log(level, json.dumps(profile, default=str))
+
+
+def server_timing(profile):
+    """Server-Timing header value for a profile"""
+    return (
+        f'db;dur={profile["db_ms"]:.2f};desc="{profile["queries"]} queries", '
+        f'app;dur={profile["total_ms"]:.2f}'
+    )
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import BreederCreateView, FrontpageView
+from .views import BreederCreateView, FrontpageView, SQLProfileView
 
 app_name = 'major'
 
@@ -8,4 +8,5 @@ urlpatterns = [
     path('', FrontpageView.as_view(), name="frontpage"),
     # Alias for frontpage - for backward compatibility
     path('home/', FrontpageView.as_view(), name="home"),
+    path('profiling/sql/', SQLProfileView.as_view(), name="sql_profiles"),
 ]
@@ -1,6 +1,9 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView, FormView
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from major.forms import *
+from major import profiling
+from django.conf import settings
 from django.contrib import messages
 
 # Class-based views
@@ -17,3 +20,26 @@ class BreederCreateView(FormView):
 
 class FrontpageView(TemplateView):
     template_name = 'frontpage.html'
+
+class SQLProfileView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Recent request SQL profiles of this process (staff only)"""
+    template_name = 'sql_profiles.html'
+    login_url = 'company:login'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        profiles = profiling.buffer.snapshot()
+        flagged_only = self.request.GET.get('flagged') == '1'
+        if flagged_only:
+            profiles = [profile for profile in profiles if profile['flagged']]
+        context.update({
+            'profiles': profiles,
+            'flagged_only': flagged_only,
+            'profiling_enabled': settings.SQL_PROFILING,
+            'duplicate_threshold': settings.SQL_PROFILING_DUPLICATE_THRESHOLD,
+            'slow_ms': settings.SQL_PROFILING_SLOW_MS,
+        })
+        return context
@@ -1,19 +1,185 @@
-from django.contrib import admin
+from collections import defaultdict
+from functools import partial
+
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products import alerts, fragments
 from products.models import (
-    ChickBatch, HealthCheck, FeedFormula, FeedSchedule,
-    MedicineProduct, TreatmentRecord, DiseaseCatalog, DiseaseCase,
+    ChickBatch, ChickStatus, HealthCheck, FeedFormula, FeedSchedule,
+    MedicineProduct, TreatmentRecord, DiseaseCatalog, DiseaseCase, DiseaseCaseStatus,
     InventoryProduct
 )
+from products.pagination import EstimatedCountPaginator
+from products.rollups import rebuild_rollups
+from products.stock import stock_changed
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist for tables that grow without bound: counts are estimated
+    (see EstimatedCountPaginator) and the unfiltered total is not counted
+    next to a filtered one.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+def _after_commit(func, *args):
+    # Bulk actions write with queryset.update(), which sends no signals
+    transaction.on_commit(partial(func, *args))
+
+
+def _rules_fed_by(model):
+    return [rule for rule in alerts.RULES.values() if model in rule.sources]
+
+
+# ---------------------------------------------------------------------------
+# Batches and their records
+# ---------------------------------------------------------------------------
+def batch_status_action(status):
+    @admin.action(description=f"Mark selected batches as {status.label.lower()}")
+    def action(modeladmin, request, queryset):
+        batch_ids = list(queryset.exclude(status=status).values_list('pk', flat=True))
+        now = timezone.now()
+        # Dated as ChickBatch.save dates closing: a batch already closed keeps its date
+        closed_at = None if status == ChickStatus.ACTIVE else Coalesce('closed_at', Value(now))
+        updated = ChickBatch.objects.filter(pk__in=batch_ids).update(status=status, closed_at=closed_at, updated_at=now)
+        _after_commit(alerts.evaluate_scopes, [(rule, batch_ids) for rule in _rules_fed_by(ChickBatch)])
+        modeladmin.message_user(request, f"{updated} batches marked as {status.label.lower()}.", messages.SUCCESS)
+    action.__name__ = f"mark_{status.value.lower()}"
+    return action
+
+
+@admin.register(ChickBatch)
+class ChickBatchAdmin(LargeTableAdmin):
+    list_display = ['id', 'company', 'breeder_type', 'hatch_date', 'initial_count', 'current_count', 'status', 'farm_location']
+    list_filter = ['status', 'breeder_type']
+    list_select_related = ['company']
+    search_fields = ['=id', 'farm_location', 'source']
+    raw_id_fields = ['company']
+    date_hierarchy = 'hatch_date'
+    actions = [batch_status_action(status) for status in ChickStatus]
+
+
+@admin.register(HealthCheck)
+class HealthCheckAdmin(LargeTableAdmin):
+    list_display = ['id', 'batch', 'check_date', 'mortality_count', 'diseased_count', 'average_weight_g']
+    list_select_related = ['batch']
+    raw_id_fields = ['batch']
+    readonly_fields = ['company']
+    date_hierarchy = 'check_date'
+
+
+@admin.register(FeedSchedule)
+class FeedScheduleAdmin(LargeTableAdmin):
+    list_display = ['id', 'batch', 'formula', 'date', 'quantity_kg']
+    list_select_related = ['batch', 'formula']
+    raw_id_fields = ['batch']
+    readonly_fields = ['company']
+    autocomplete_fields = ['formula']
+    date_hierarchy = 'date'
+
+
+@admin.register(TreatmentRecord)
+class TreatmentRecordAdmin(LargeTableAdmin):
+    list_display = ['id', 'batch', 'medicine', 'date_administered', 'quantity_used', 'administered_by']
+    list_select_related = ['batch', 'medicine', 'administered_by']
+    raw_id_fields = ['batch', 'administered_by']
+    readonly_fields = ['company']
+    autocomplete_fields = ['medicine']
+    date_hierarchy = 'date_administered'
+
+
+@admin.action(description="Mark selected disease cases as resolved")
+def resolve_cases(modeladmin, request, queryset):
+    rows = list(queryset.exclude(status=DiseaseCaseStatus.RESOLVED).values_list('pk', 'batch_id', 'disease_id'))
+    updated = DiseaseCase.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+        status=DiseaseCaseStatus.RESOLVED, updated_at=timezone.now(),
+    )
+    batch_ids = {batch_id for _, batch_id, _ in rows}
+    rebuild_rollups(batch_ids)
+    fragments.invalidate_batches(batch_ids, 'disease_cases')
+    _after_commit(alerts.evaluate_scopes, [
+        (rule, list({disease_id for _, _, disease_id in rows})) for rule in _rules_fed_by(DiseaseCase)
+    ])
+    modeladmin.message_user(request, f"{updated} disease cases resolved.", messages.SUCCESS)
+
+
+@admin.register(DiseaseCase)
+class DiseaseCaseAdmin(LargeTableAdmin):
+    # __str__ reads disease.name
+    list_display = ['id', 'batch', 'disease', 'date_detected', 'affected_count', 'status']
+    list_filter = ['status']
+    list_select_related = ['batch', 'disease']
+    raw_id_fields = ['batch']
+    readonly_fields = ['company']
+    autocomplete_fields = ['disease']
+    date_hierarchy = 'date_detected'
+    actions = [resolve_cases]
+
+
+# ---------------------------------------------------------------------------
+# Catalogs
+# ---------------------------------------------------------------------------
+@admin.register(FeedFormula)
+class FeedFormulaAdmin(admin.ModelAdmin):
+    list_display = ['name', 'breeder_type', 'sku']
+    list_filter = ['breeder_type']
+    search_fields = ['name', 'sku']
+    ordering = ['name']
+
+
+@admin.register(MedicineProduct)
+class MedicineProductAdmin(admin.ModelAdmin):
+    list_display = ['name', 'breeder_type', 'sku']
+    list_filter = ['breeder_type']
+    search_fields = ['name', 'sku']
+    ordering = ['name']
+
+
+@admin.register(DiseaseCatalog)
+class DiseaseCatalogAdmin(admin.ModelAdmin):
+    list_display = ['name', 'breeder_type', 'severity', 'mortality_rate']
+    list_filter = ['breeder_type', 'severity']
+    search_fields = ['name']
+    ordering = ['name']
+
 
-# Simple admin registrations; customize later with list_display / search
+# ---------------------------------------------------------------------------
+# Inventory
+# ---------------------------------------------------------------------------
+def product_active_action(is_active, name, description):
+    @admin.action(description=description)
+    def action(modeladmin, request, queryset):
+        rows = list(queryset.exclude(is_active=is_active).values_list('pk', 'company_id'))
+        updated = InventoryProduct.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+            is_active=is_active, updated_at=timezone.now(),
+        )
+        by_company = defaultdict(list)
+        for pk, company_id in rows:
+            by_company[company_id].append(pk)
+        for company_id, product_ids in by_company.items():
+            _after_commit(stock_changed, company_id, product_ids)
+        modeladmin.message_user(request, f"{updated} products updated.", messages.SUCCESS)
+    action.__name__ = name
+    return action
 
-admin.site.register(ChickBatch)
-admin.site.register(HealthCheck)
-admin.site.register(FeedFormula)
-admin.site.register(FeedSchedule)
-admin.site.register(MedicineProduct)
-admin.site.register(TreatmentRecord)
-admin.site.register(DiseaseCatalog)
-admin.site.register(DiseaseCase)
-admin.site.register(InventoryProduct)
 
+@admin.register(InventoryProduct)
+class InventoryProductAdmin(admin.ModelAdmin):
+    list_display = ['sku', 'name', 'company', 'category', 'stock_on_hand', 'reorder_point', 'is_active']
+    list_filter = ['is_active', 'category']
+    list_select_related = ['company']
+    search_fields = ['sku', 'name']
+    raw_id_fields = ['company']
+    # Stock moves through the ledger (products.stock), not by editing the count
+    readonly_fields = ['stock_on_hand']
+    actions = [
+        product_active_action(False, 'archive_products', "Archive selected products (mark inactive)"),
+        product_active_action(True, 'restore_products', "Restore selected products (mark active)"),
+    ]
@@ -0,0 +1,307 @@
+"""
+Alert rules and their evaluation.
+
+Each rule finds the rows that currently breach it with one set-based query,
+optionally restricted to a scope (a few batches, products or diseases).
+``evaluate`` then reconciles the findings with the persisted open alerts: new
+conditions are inserted, ongoing ones refreshed and vanished ones resolved,
+so the dashboard only has to read open Alert rows.
+
+Rules are evaluated incrementally from signals (see products.signals) for
+the rows that changed, and the batches or diseases they were moved off, and
+for everything by ``manage.py sweep_alerts``.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from products.models import (
+    Alert, AlertPriority, AlertStatus, ChickBatch, ChickStatus, DiseaseCase,
+    DiseaseCaseStatus, HealthCheck, InventoryProduct
+)
+from products.stats import aging_batch_q, high_mortality_q
+
+RULES = {}
+
+DISEASE_SPIKE_WINDOW_DAYS = 7
+DISEASE_SPIKE_MIN_CASES = 3
+
+# Foreign keys a record's scope is read from; moving a record off one also
+# changes the scope it left
+SCOPE_FIELDS = ['batch', 'disease']
+
+
+def register(rule_class):
+    """Class decorator adding a rule to the registry"""
+    rule = rule_class()
+    RULES[rule.code] = rule
+    return rule_class
+
+
+class Finding:
+    """A breach reported by a rule"""
+
+    def __init__(self, company_id, key, message, batch_id=None, product_id=None):
+        self.company_id = company_id
+        self.key = key
+        self.message = message
+        self.batch_id = batch_id
+        self.product_id = product_id
+
+
+class AlertRule:
+    code = None
+    title = None
+    priority = AlertPriority.MEDIUM
+    # Models whose writes can change this rule's outcome
+    sources = ()
+
+    def find(self, company_ids=None, scope=None):
+        """Yield Findings for the given companies (all when None) within ``scope``"""
+        raise NotImplementedError
+
+    def scope_for(self, instance):
+        """
+        Return the scope to re-evaluate after ``instance`` changed. Read only
+        local fields: the instance may be part of a cascade delete.
+        """
+        raise NotImplementedError
+
+    def open_alerts(self, company_ids=None, scope=None):
+        """Open alerts of this rule that an evaluation over ``scope`` may resolve"""
+        alerts = Alert.objects.filter(rule=self.code, status=AlertStatus.OPEN)
+        if company_ids is not None:
+            alerts = alerts.filter(company_id__in=company_ids)
+        return alerts
+
+    def dedupe_key(self, key):
+        return f"{self.code}:{key}"
+
+
+class BatchRule(AlertRule):
+    """Rules over active batches; scope is a list of batch ids"""
+    sources = (ChickBatch,)
+
+    def breaching(self):
+        raise NotImplementedError
+
+    def message(self, batch_id):
+        raise NotImplementedError
+
+    def find(self, company_ids=None, scope=None):
+        batches = ChickBatch.objects.filter(self.breaching(), status=ChickStatus.ACTIVE)
+        if company_ids is not None:
+            batches = batches.filter(company_id__in=company_ids)
+        if scope is not None:
+            batches = batches.filter(pk__in=scope)
+        for batch_id, company_id in batches.values_list('pk', 'company_id'):
+            yield Finding(company_id, f"batch:{batch_id}", self.message(batch_id), batch_id=batch_id)
+
+    def scope_for(self, instance):
+        if isinstance(instance, ChickBatch):
+            return [instance.pk]
+        return [instance.batch_id]
+
+    def open_alerts(self, company_ids=None, scope=None):
+        alerts = super().open_alerts(company_ids)
+        return alerts if scope is None else alerts.filter(batch_id__in=scope)
+
+
+class ProductRule(AlertRule):
+    """Rules over active inventory; scope is a list of product ids"""
+    sources = (InventoryProduct,)
+    priority = AlertPriority.HIGH
+
+    def breaching(self):
+        raise NotImplementedError
+
+    def message(self, name):
+        raise NotImplementedError
+
+    def find(self, company_ids=None, scope=None):
+        products = InventoryProduct.objects.filter(self.breaching(), is_active=True)
+        if company_ids is not None:
+            products = products.filter(company_id__in=company_ids)
+        if scope is not None:
+            products = products.filter(pk__in=scope)
+        for product_id, company_id, name in products.values_list('pk', 'company_id', 'name'):
+            yield Finding(company_id, f"product:{product_id}", self.message(name), product_id=product_id)
+
+    def scope_for(self, instance):
+        return [instance.pk]
+
+    def open_alerts(self, company_ids=None, scope=None):
+        alerts = super().open_alerts(company_ids)
+        return alerts if scope is None else alerts.filter(product_id__in=scope)
+
+
+@register
+class HighMortalityRule(BatchRule):
+    code = 'high_mortality'
+    title = 'High Mortality Rate'
+    priority = AlertPriority.HIGH
+    sources = (ChickBatch, HealthCheck)
+
+    def breaching(self):
+        return high_mortality_q()
+
+    def message(self, batch_id):
+        return f'Batch #{batch_id} has significant losses'
+
+
+@register
+class AgingBatchRule(BatchRule):
+    code = 'aging_batch'
+    title = 'Batch Aging'
+
+    def breaching(self):
+        return aging_batch_q()
+
+    def message(self, batch_id):
+        return f'Batch #{batch_id} is over 1 year old'
+
+
+@register
+class OutOfStockRule(ProductRule):
+    code = 'out_of_stock'
+    title = 'Out of Stock'
+
+    def breaching(self):
+        return Q(stock_on_hand=0)
+
+    def message(self, name):
+        return f'{name} is completely out of stock'
+
+
+@register
+class ReorderPointRule(ProductRule):
+    code = 'reorder_point'
+    title = 'Reorder Needed'
+    priority = AlertPriority.MEDIUM
+
+    def breaching(self):
+        return Q(stock_on_hand__gt=0, reorder_point__gt=0, stock_on_hand__lte=F('reorder_point'))
+
+    def message(self, name):
+        return f'{name} is at or below its reorder point'
+
+
+@register
+class DiseaseSpikeRule(AlertRule):
+    """Several active cases of one disease detected within a short window"""
+    code = 'disease_spike'
+    title = 'Disease Case Spike'
+    priority = AlertPriority.HIGH
+    sources = (DiseaseCase,)
+
+    def find(self, company_ids=None, scope=None):
+        since = timezone.now().date() - timedelta(days=DISEASE_SPIKE_WINDOW_DAYS)
+        cases = DiseaseCase.objects.filter(status=DiseaseCaseStatus.ACTIVE, date_detected__gte=since)
+        if company_ids is not None:
+            cases = cases.filter(company_id__in=company_ids)
+        if scope is not None:
+            cases = cases.filter(disease_id__in=scope)
+        spikes = cases.values('company_id', 'disease_id', 'disease__name').annotate(
+            cases=Count('id'),
+        ).filter(cases__gte=DISEASE_SPIKE_MIN_CASES)
+        for row in spikes:
+            yield Finding(
+                row['company_id'],
+                f"disease:{row['disease_id']}",
+                f"{row['cases']} active {row['disease__name']} cases in the last {DISEASE_SPIKE_WINDOW_DAYS} days",
+            )
+
+    def scope_for(self, instance):
+        return [instance.disease_id]
+
+    def open_alerts(self, company_ids=None, scope=None):
+        alerts = super().open_alerts(company_ids)
+        if scope is None:
+            return alerts
+        return alerts.filter(dedupe_key__in=[self.dedupe_key(f"disease:{pk}") for pk in scope])
+
+
+def evaluate(rule, company_ids=None, scope=None):
+    """
+    Reconcile ``rule``'s current findings with its open alerts.
+    Returns (opened, resolved) counts.
+    """
+    now = timezone.now()
+    findings = {}
+    for finding in rule.find(company_ids, scope):
+        if finding.company_id is not None:
+            findings[(finding.company_id, rule.dedupe_key(finding.key))] = finding
+
+    existing = {
+        (company_id, key): pk
+        for pk, company_id, key in rule.open_alerts(company_ids, scope).values_list('pk', 'company_id', 'dedupe_key')
+    }
+
+    new_alerts = [
+        Alert(
+            company_id=company_id,
+            rule=rule.code,
+            dedupe_key=key,
+            priority=rule.priority,
+            title=rule.title,
+            message=finding.message,
+            batch_id=finding.batch_id,
+            product_id=finding.product_id,
+            last_seen_at=now,
+        )
+        for (company_id, key), finding in findings.items()
+        if (company_id, key) not in existing
+    ]
+    if new_alerts:
+        Alert.objects.bulk_create(new_alerts, ignore_conflicts=True)
+
+    ongoing = [pk for ident, pk in existing.items() if ident in findings]
+    if ongoing:
+        Alert.objects.filter(pk__in=ongoing).update(last_seen_at=now)
+
+    cleared = [pk for ident, pk in existing.items() if ident not in findings]
+    if cleared:
+        Alert.objects.filter(pk__in=cleared).update(status=AlertStatus.RESOLVED, resolved_at=now, updated_at=now)
+
+    return len(new_alerts), len(cleared)
+
+
+def scopes_for(instance):
+    """
+    (rule, scope) pairs to re-evaluate after ``instance`` was written, with
+    the scopes it was saved under before (noted by saved_scopes)
+    """
+    saved = dict(getattr(instance, '_saved_scopes', []))
+    return [
+        (rule, list(dict.fromkeys([*rule.scope_for(instance), *saved.get(rule, [])])))
+        for rule in RULES.values() if type(instance) in rule.sources
+    ]
+
+
+def saved_scopes(instance):
+    """
+    (rule, scope) pairs of ``instance`` as saved in the database, read before
+    it is saved again. Empty for a new row and for a row scoped by its own pk.
+    """
+    fields = [field.name for field in instance._meta.concrete_fields if field.name in SCOPE_FIELDS]
+    saved = type(instance).objects.filter(pk=instance.pk).only(*fields).first() if fields else None
+    return scopes_for(saved) if saved is not None else []
+
+
+def evaluate_scopes(scopes):
+    for rule, scope in scopes:
+        evaluate(rule, scope=scope)
+
+
+def sweep(company_ids=None):
+    """Evaluate all rules for the given companies (all when None)"""
+    totals = {}
+    for code, rule in RULES.items():
+        totals[code] = evaluate(rule, company_ids)
+    return totals
+
+
+def open_alerts_for(company):
+    """Open alerts for the dashboard (reads the company/status index)"""
+    return Alert.objects.filter(company=company, status=AlertStatus.OPEN).order_by('-created_at')
@@ -0,0 +1,219 @@
+"""
+Growth, feed conversion and mortality analytics.
+
+Health checks and feed schedules are loaded for many batches at once (one
+query per series) into dense NumPy grids of shape (batches, age in days), so
+every metric is computed with array operations instead of per-batch loops:
+
+* FCR: cumulative feed consumed divided by the flock's live weight, both in kg
+* ADG: average daily weight gain in grams since the first weigh-in
+* cumulative mortality as a percentage of the initial count
+* rolling averages of daily mortality and feed
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from django.db.models import FloatField, Func, IntegerField, Sum
+from django.db.models.functions import Cast
+
+from products.models import ChickBatch, ChickStatus, FeedSchedule, HealthCheck
+
+ROLLING_WINDOW_DAYS = 7
+
+
+@dataclass
+class Series:
+    """Per-batch daily series indexed by age in days since hatch"""
+    batch_ids: np.ndarray
+    initial: np.ndarray
+    weight: np.ndarray     # grams at each weigh-in, NaN on other days
+    mortality: np.ndarray  # birds lost per day
+    feed: np.ndarray       # kg fed per day
+
+    @property
+    def days(self):
+        return self.weight.shape[1]
+
+
+@dataclass
+class Metrics:
+    """Daily metric curves plus the latest value of each per batch"""
+    series: Series
+    cumulative_mortality_pct: np.ndarray
+    fcr: np.ndarray
+    adg: np.ndarray
+    rolling_mortality: np.ndarray
+    rolling_feed: np.ndarray
+    latest_check: np.ndarray
+    has_checks: np.ndarray
+
+
+class AgeInDays(Func):
+    """Whole days between a date and the batch hatch date, computed in SQL"""
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def __init__(self, date, hatch_date='batch__hatch_date', **extra):
+        super().__init__(date, hatch_date, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', arg_joiner=') - julianday(',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ', **extra_context)
+
+
+def _columns(records, size):
+    """Split numeric result rows into one float array per column"""
+    return np.array(records, dtype=float).reshape(-1, size).T
+
+
+def load_series(batches):
+    """
+    Load the daily series of ``batches`` (a ChickBatch queryset) into grids.
+    Ages and weights arrive as plain numbers so no per-value conversion runs.
+    """
+    rows = list(batches.order_by('pk').values_list('pk', 'initial_count'))
+    if not rows:
+        empty = np.zeros((0, 1))
+        return Series(np.zeros(0, dtype=np.int64), np.zeros(0), empty, empty, empty)
+
+    batch_ids, initial = _columns(rows, 2)
+    batch_ids = batch_ids.astype(np.int64)
+    batch_filter = {'batch__in': batches.values('pk')}
+
+    # Unordered: each check lands in its own (batch, age) cell
+    checks = HealthCheck.objects.filter(**batch_filter).order_by().values_list(
+        'batch_id', AgeInDays('check_date'), 'mortality_count', Cast('average_weight_g', FloatField()),
+    )
+    feeds = FeedSchedule.objects.filter(**batch_filter).values('batch_id', 'date').order_by().values_list(
+        'batch_id', AgeInDays('date'), Cast(Sum('quantity_kg'), FloatField()),
+    )
+    check_batch, check_age, check_mortality, check_weight = _columns(list(checks), 4)
+    feed_batch, feed_age, feed_kg = _columns(list(feeds), 3)
+
+    check_row = np.searchsorted(batch_ids, check_batch)
+    feed_row = np.searchsorted(batch_ids, feed_batch)
+    check_age = check_age.astype(np.int64)
+    feed_age = feed_age.astype(np.int64)
+
+    days = int(max(check_age.max(initial=-1), feed_age.max(initial=-1))) + 1
+    shape = (len(batch_ids), max(days, 1))
+    weight = np.full(shape, np.nan)
+    mortality = np.zeros(shape)
+    feed = np.zeros(shape)
+
+    # Records dated before the hatch date cannot be placed on the age axis
+    valid = check_age >= 0
+    weight[check_row[valid], check_age[valid]] = check_weight[valid]
+    np.add.at(mortality, (check_row[valid], check_age[valid]), check_mortality[valid])
+    valid = feed_age >= 0
+    np.add.at(feed, (feed_row[valid], feed_age[valid]), feed_kg[valid])
+
+    return Series(batch_ids, initial, weight, mortality, feed)
+
+
+def rolling_sum(values, window=ROLLING_WINDOW_DAYS):
+    """Trailing sum over ``window`` columns along each row"""
+    totals = np.cumsum(values, axis=1)
+    totals[:, window:] = totals[:, window:] - totals[:, :-window].copy()
+    return totals
+
+
+def rolling_mean(values, window=ROLLING_WINDOW_DAYS):
+    """Trailing mean along each row; the first days average what is available"""
+    return rolling_sum(values, window) / np.minimum(np.arange(1, values.shape[1] + 1), window)
+
+
+def forward_fill(values):
+    """Carry the last non-NaN value of each row forward"""
+    days = np.arange(values.shape[1])
+    last = np.maximum.accumulate(np.where(np.isnan(values), -1, days), axis=1)
+    filled = values[np.arange(values.shape[0])[:, None], np.maximum(last, 0)]
+    filled[last < 0] = np.nan
+    return filled
+
+
+def compute_metrics(series, window=ROLLING_WINDOW_DAYS):
+    """Compute every metric curve for all batches in ``series`` at once"""
+    days = np.arange(series.days)
+    weighed = ~np.isnan(series.weight)
+    has_checks = weighed.any(axis=1)
+    first_check = weighed.argmax(axis=1)
+    latest_check = series.days - 1 - weighed[:, ::-1].argmax(axis=1)
+
+    initial = series.initial[:, None]
+    dead = np.cumsum(series.mortality, axis=1)
+    live = np.clip(initial - dead, 0, None)
+    weight = forward_fill(series.weight)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cumulative_mortality_pct = np.where(initial > 0, dead / initial * 100, np.nan)
+        biomass_kg = weight * live / 1000
+        fcr = np.where(biomass_kg > 0, np.cumsum(series.feed, axis=1) / biomass_kg, np.nan)
+        first_weight = series.weight[np.arange(len(first_check)), first_check][:, None]
+        elapsed = days - first_check[:, None]
+        adg = np.where(elapsed > 0, (weight - first_weight) / elapsed, np.nan)
+
+    return Metrics(
+        series=series,
+        cumulative_mortality_pct=cumulative_mortality_pct,
+        fcr=fcr,
+        adg=adg,
+        rolling_mortality=rolling_mean(series.mortality, window),
+        rolling_feed=rolling_mean(series.feed, window),
+        latest_check=latest_check,
+        has_checks=has_checks,
+    )
+
+
+def _value(number, digits=2):
+    """Round for display, mapping NaN/inf to None"""
+    return round(float(number), digits) if np.isfinite(number) else None
+
+
+def summaries(metrics):
+    """Latest FCR, ADG and mortality per batch id"""
+    rows = np.arange(len(metrics.series.batch_ids))
+    latest = metrics.latest_check
+    fcr = np.where(metrics.has_checks, metrics.fcr[rows, latest], np.nan)
+    adg = np.where(metrics.has_checks, metrics.adg[rows, latest], np.nan)
+    mortality = metrics.cumulative_mortality_pct[:, -1]
+    return {
+        int(batch_id): {
+            'fcr': _value(fcr[i]),
+            'adg_g': _value(adg[i]),
+            'cumulative_mortality_pct': _value(mortality[i]),
+        }
+        for i, batch_id in enumerate(metrics.series.batch_ids)
+    }
+
+
+def company_analytics(company):
+    """Summaries for all active batches of a company"""
+    batches = ChickBatch.objects.filter(company=company, status=ChickStatus.ACTIVE)
+    return summaries(compute_metrics(load_series(batches)))
+
+
+def batch_analytics(batch):
+    """Summary and daily curves of a single batch"""
+    metrics = compute_metrics(load_series(ChickBatch.objects.filter(pk=batch.pk)))
+    summary = summaries(metrics).get(batch.pk, {})
+    curves = {
+        'cumulative_mortality_pct': metrics.cumulative_mortality_pct,
+        'fcr': metrics.fcr,
+        'adg_g': metrics.adg,
+        'rolling_mortality': metrics.rolling_mortality,
+        'rolling_feed_kg': metrics.rolling_feed,
+    }
+    return {
+        'summary': summary,
+        'window_days': ROLLING_WINDOW_DAYS,
+        'age_days': list(range(metrics.series.days)) if len(metrics.series.batch_ids) else [],
+        'series': {name: [_value(v) for v in values[0]] if len(values) else [] for name, values in curves.items()},
+    }
@@ -0,0 +1,124 @@
+"""
+Read-only JSON API over batches, health checks, inventory and disease cases.
+
+Rows are read with ``values()`` restricted to the requested ``fields=``, so no
+model instances are built. Lists are keyset paginated (see
+products.pagination). Every response carries a strong ETag derived from the
+row count and the latest ``updated_at`` of the requested rows, and of the
+related rows behind any joined fields (``disease__name``), so a client
+polling with ``If-None-Match`` gets a 304 after one aggregate query, before
+any rows are read or serialized.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Count, Max
+
+from products.models import ChickBatch, DiseaseCase, HealthCheck, InventoryProduct
+from products.pagination import NEXT, KeysetPaginator
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ApiError(Exception):
+    """A client error reported as a 400 response"""
+
+
+class Resource:
+    """A company-scoped API resource: exposed fields, exact-match filters and ordering"""
+
+    def __init__(self, model, fields, filters=(), ordering=('-id',), company_lookup='company'):
+        self.model = model
+        self.fields = fields
+        self.filters = filters
+        self.ordering = ordering
+        self.company_lookup = company_lookup
+
+    def queryset(self, company):
+        return self.model.objects.filter(**{self.company_lookup: company})
+
+    def select_fields(self, requested):
+        """Validate a comma separated ``fields=`` value; empty selects every field"""
+        if not requested:
+            return list(self.fields)
+        fields = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = sorted(set(fields) - set(self.fields))
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    def timestamps(self, fields):
+        """updated_at of the rows and of the related rows the joined ``fields`` read"""
+        relations = sorted({name.split('__')[0] for name in fields if '__' in name})
+        return ['updated_at', *(f'{relation}__updated_at' for relation in relations)]
+
+    def filter(self, queryset, params):
+        lookups = {}
+        for name in self.filters:
+            value = params.get(name, '')
+            if value == '':
+                continue
+            if isinstance(self.model._meta.get_field(name), BooleanField):
+                value = {'true': True, 'false': False}.get(value.lower(), value)
+            lookups[name] = value
+        try:
+            return queryset.filter(**lookups)
+        except (ValueError, TypeError, ValidationError) as e:
+            raise ApiError(f"Invalid filter value: {e}")
+
+    def values(self, queryset, fields):
+        """values() over the requested fields plus the columns pagination orders on"""
+        columns = list(fields)
+        columns += [name.lstrip('-') for name in self.ordering if name.lstrip('-') not in columns]
+        return queryset.values(*columns)
+
+
+RESOURCES = {
+    'batches': Resource(ChickBatch, [
+        'id', 'breeder_type', 'hatch_date', 'initial_count', 'current_count',
+        'farm_location', 'source', 'status', 'notes', 'created_at', 'updated_at',
+    ], filters=('status', 'breeder_type'), ordering=('-hatch_date', '-id')),
+    'health_checks': Resource(HealthCheck, [
+        'id', 'batch', 'check_date', 'diseased_count', 'mortality_count',
+        'average_weight_g', 'notes', 'created_at', 'updated_at',
+    ], filters=('batch',), ordering=('-check_date', '-id')),
+    'inventory': Resource(InventoryProduct, [
+        'id', 'sku', 'name', 'category', 'breeder_type', 'unit', 'stock_on_hand',
+        'reorder_point', 'cost_price', 'sale_price', 'is_active', 'created_at', 'updated_at',
+    ], filters=('category', 'is_active'), ordering=('name', 'id')),
+    'disease_cases': Resource(DiseaseCase, [
+        'id', 'batch', 'disease', 'disease__name', 'date_detected', 'affected_count',
+        'status', 'notes', 'created_at', 'updated_at',
+    ], filters=('batch', 'disease', 'status'), ordering=('-date_detected', '-id')),
+}
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError("limit must be an integer")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def compute_etag(queryset, *parts, timestamps=('updated_at',)):
+    """
+    Strong ETag for ``queryset`` from its row count and newest ``timestamps``,
+    combined with ``parts`` (resource, fields, page) so each view of the same
+    rows gets its own tag. Count catches deletes, which leave no timestamp.
+    """
+    latest = {f'latest_{n}': Max(timestamp) for n, timestamp in enumerate(timestamps)}
+    state = queryset.order_by().aggregate(count=Count('pk'), **latest)
+    digest = hashlib.sha1(repr((state['count'], [state[name] for name in latest], parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def paginate(resource, queryset, fields, limit, cursor=None, direction=NEXT):
+    """One keyset page of ``fields`` dicts, with the ordering-only columns dropped"""
+    paginator = KeysetPaginator(resource.values(queryset, fields), limit, ordering=resource.ordering)
+    page = paginator.page(cursor, direction)
+    rows = [{name: row[name] for name in fields} for row in page.object_list]
+    return page, rows
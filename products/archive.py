@@ -0,0 +1,219 @@
+"""
+Archival of closed batches.
+
+Batches that were sold, culled or died out (ChickBatch.closed_at) more than
+ARCHIVE_AFTER_DAYS ago are moved out of the hot tables together with their
+health checks, feed schedules, treatments and disease cases. Each run writes
+one gzip-compressed JSON Lines file per company under ARCHIVE_ROOT, one batch
+and its records per line. Batches are handled in chunks: a chunk is appended
+to the file and flushed, then deleted in one transaction that also writes an
+ArchivedBatch summary row per batch, so memory use does not grow with a
+company's history and a failed chunk leaves its batches in place.
+
+``restore`` reads batches back from their files and recreates the rows with
+their original primary keys.
+
+The rows are removed with raw deletes: the per-row signal handlers would
+recompute rollups, fragments and alerts of batches that are going away.
+Stock movements stay on the ledger, unlinked from their records.
+"""
+import gzip
+import json
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from products import fragments, search
+from products.models import (
+    Alert, ArchivedBatch, BatchRollup, ChickBatch, ChickStatus, DiseaseCase, FeedSchedule, HealthCheck,
+    SearchDocument, SearchKind, StockMovement, TreatmentRecord
+)
+from products.rollups import rebuild_rollups
+
+ARCHIVE_ROOT = Path(getattr(settings, 'ARCHIVE_ROOT', settings.BASE_DIR / 'archive'))
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ARCHIVE_AFTER_DAYS', 365)
+CHUNK_SIZE = 200
+CLOSED_STATUSES = [ChickStatus.SOLD, ChickStatus.DECEASED, ChickStatus.CULLED]
+
+# Child records stored with their batch, keyed like the batch detail sections
+CHILDREN = {
+    'health_checks': HealthCheck,
+    'feed_schedules': FeedSchedule,
+    'treatments': TreatmentRecord,
+    'disease_cases': DiseaseCase,
+}
+# Ledger links cleared when the linked record is archived
+MOVEMENT_LINKS = {'feed_schedules': 'feed_schedule', 'treatments': 'treatment'}
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _decode(model, row):
+    """Model instance from an archived row; values go back through the fields"""
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return model(**{name: fields[name].to_python(value) for name, value in row.items() if name in fields})
+
+
+def closed_batches(before, company_ids=None):
+    batches = ChickBatch.objects.filter(status__in=CLOSED_STATUSES, closed_at__lt=before, company__isnull=False)
+    if company_ids is not None:
+        batches = batches.filter(company_id__in=company_ids)
+    return batches
+
+
+# ---------------------------------------------------------------------------
+# Archiving
+# ---------------------------------------------------------------------------
+def load_chunk(batch_ids):
+    """Batches and their records as rows, with one query per table"""
+    documents = {
+        row['id']: {'batch': row, **{name: [] for name in CHILDREN}}
+        for row in ChickBatch.objects.filter(pk__in=batch_ids).order_by('pk').values(*_columns(ChickBatch))
+    }
+    for name, model in CHILDREN.items():
+        for row in model.objects.filter(batch_id__in=batch_ids).order_by('pk').values(*_columns(model)):
+            documents[row['batch_id']][name].append(row)
+    return documents
+
+
+def summarize(document, archive_file):
+    batch = document['batch']
+    return ArchivedBatch(
+        company_id=batch['company_id'],
+        batch_id=batch['id'],
+        breeder_type=batch['breeder_type'],
+        hatch_date=batch['hatch_date'],
+        closed_on=timezone.localdate(batch['closed_at']),
+        status=batch['status'],
+        farm_location=batch['farm_location'],
+        initial_count=batch['initial_count'],
+        final_count=batch['current_count'],
+        total_mortality=sum(row['mortality_count'] for row in document['health_checks']),
+        total_feed_kg=sum((row['quantity_kg'] for row in document['feed_schedules']), Decimal(0)),
+        treatments=len(document['treatments']),
+        disease_cases=len(document['disease_cases']),
+        archive_file=archive_file,
+    )
+
+
+def delete_chunk(documents):
+    """Remove archived batches and everything pointing at them"""
+    batch_ids = list(documents)
+    for name, link in MOVEMENT_LINKS.items():
+        record_ids = [row['id'] for document in documents.values() for row in document[name]]
+        StockMovement.objects.filter(**{f'{link}_id__in': record_ids}).update(**{link: None})
+    # The same order Django's collector would use, without per-row signals
+    for queryset in [
+        BatchRollup.objects.filter(batch_id__in=batch_ids),
+        Alert.objects.filter(batch_id__in=batch_ids),
+        SearchDocument.objects.filter(kind=SearchKind.BATCH, object_id__in=batch_ids),
+        *(model.objects.filter(batch_id__in=batch_ids) for model in CHILDREN.values()),
+        ChickBatch.objects.filter(pk__in=batch_ids),
+    ]:
+        queryset._raw_delete(queryset.db)
+
+
+def archive_company(company_id, before, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Archive the company's batches closed before ``before``; returns how many"""
+    batches = closed_batches(before, [company_id]).order_by('pk').values_list('pk', flat=True)
+    if dry_run:
+        return batches.count()
+
+    relative = f"company-{company_id}/{timezone.now():%Y%m%d-%H%M%S}.jsonl.gz"
+    path = ARCHIVE_ROOT / relative
+    archived = 0
+    last_pk = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, 'at', encoding='utf-8') as out:
+        while True:
+            batch_ids = list(batches.filter(pk__gt=last_pk)[:chunk_size])
+            if not batch_ids:
+                break
+            last_pk = batch_ids[-1]
+            with transaction.atomic():
+                documents = load_chunk(batch_ids)
+                for document in documents.values():
+                    out.write(json.dumps(document, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n')
+                # On disk before the rows are deleted
+                out.flush()
+                ArchivedBatch.objects.bulk_create([summarize(document, relative) for document in documents.values()])
+                delete_chunk(documents)
+            archived += len(documents)
+    if not archived:
+        path.unlink()
+    return archived
+
+
+def archive(days=ARCHIVE_AFTER_DAYS, company_ids=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Archive batches closed more than ``days`` ago; returns counts by company id"""
+    before = timezone.now() - timedelta(days=days)
+    companies = closed_batches(before, company_ids).order_by('company_id').values_list('company_id', flat=True)
+    return {
+        company_id: archive_company(company_id, before, chunk_size, dry_run)
+        for company_id in companies.distinct()
+    }
+
+
+# ---------------------------------------------------------------------------
+# Restoring
+# ---------------------------------------------------------------------------
+def read_documents(archive_file, batch_ids):
+    """Stream an archive file, yielding the documents of ``batch_ids``"""
+    wanted = set(batch_ids)
+    with gzip.open(ARCHIVE_ROOT / archive_file, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            document = json.loads(line)
+            if document['batch']['id'] in wanted:
+                wanted.discard(document['batch']['id'])
+                yield document
+                if not wanted:
+                    return
+
+
+def restore(batch_ids):
+    """
+    Recreate archived batches and their records, one transaction per archive
+    file. Timestamps become the restore time, so a restored batch is only
+    archived again once it ages out anew. Returns the batch ids restored.
+    """
+    now = timezone.now()
+    by_file = defaultdict(list)
+    for archive_file, batch_id in ArchivedBatch.objects.filter(batch_id__in=batch_ids) \
+            .values_list('archive_file', 'batch_id'):
+        by_file[archive_file].append(batch_id)
+
+    restored = []
+    for archive_file, file_batch_ids in by_file.items():
+        batches, children = [], defaultdict(list)
+        for document in read_documents(archive_file, file_batch_ids):
+            batch = _decode(ChickBatch, document['batch'])
+            batch.closed_at = now
+            batches.append(batch)
+            for name, model in CHILDREN.items():
+                for row in document[name]:
+                    record = _decode(model, row)
+                    # Files written before records carried a company have none
+                    record.company_id = batch.company_id
+                    children[model].append(record)
+
+        with transaction.atomic():
+            ChickBatch.objects.bulk_create(batches)
+            for model, rows in children.items():
+                model.objects.bulk_create(rows, batch_size=1000)
+            ids = [batch.pk for batch in batches]
+            rebuild_rollups(ids)
+            search.index_instances(batches)
+            # Cached tabs of these ids may predate the archive
+            for section in CHILDREN:
+                fragments.invalidate_batches(ids, section)
+            ArchivedBatch.objects.filter(batch_id__in=ids).delete()
+        restored.extend(ids)
+    return restored
@@ -0,0 +1,46 @@
+"""
+Running independent ORM queries concurrently from async views.
+
+Django's async ORM methods (``aget``, ``aaggregate``, ...) wrap the sync
+query in ``sync_to_async(thread_sensitive=True)``. That runs them one at a
+time on the single thread that owns the request's connection, so gathering
+them overlaps no database work. gather_queries instead runs each callable on
+a worker thread with its own connection, so the queries really do run in
+parallel. A worker closes its connection when its query is done: no request
+signal ever reaches the worker threads, so nothing else would close it.
+
+The gain comes from a networked database such as PostgreSQL, where a query
+mostly waits on the server. SQLite queries run in-process and are too short
+to be worth the thread hand-off (see the bench_async command).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+
+def _in_atomic_block():
+    return connection.in_atomic_block
+
+
+def _in_worker(query):
+    def run():
+        try:
+            return query()
+        finally:
+            connection.close()
+    return run
+
+
+async def gather_queries(*queries):
+    """
+    Run zero-argument callables concurrently and return their results in
+    order. Each callable must evaluate its querysets (e.g. with ``list()``).
+    Inside an open transaction they run serially on the request's connection,
+    because other connections cannot see its uncommitted writes.
+    """
+    if await sync_to_async(_in_atomic_block)():
+        return [await sync_to_async(query)() for query in queries]
+    return await asyncio.gather(*(
+        sync_to_async(_in_worker(query), thread_sensitive=False)() for query in queries
+    ))
@@ -0,0 +1,250 @@
+"""
+Helpers for seeding benchmark data and measuring query behaviour.
+
+Benchmarks run inside a transaction that is always rolled back, so they can be
+pointed at a development database without leaving any rows behind.
+"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from company.models import Company, CompanyMembership
+from products.models import (
+    ChickBatch, BreederType, ChickStatus, DiseaseCase, DiseaseCaseStatus, DiseaseCatalog, FeedFormula,
+    FeedSchedule, HealthCheck, InventoryProduct, InventoryCategory, MedicineProduct, StockSnapshot,
+    TreatmentRecord,
+)
+from products.rollups import rebuild_company_rollups
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-pass'
+
+
+class Rollback(Exception):
+    """Raised to discard everything a benchmark wrote"""
+
+
+@contextmanager
+def rollback_after():
+    """Run the enclosed block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+@contextmanager
+def measure():
+    """Capture query count and wall-clock time of the enclosed block"""
+    result = {}
+    # The query log is a bounded deque; a full one would hide new queries
+    connection.queries_log.clear()
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as ctx:
+        yield result
+    result['queries'] = len(ctx.captured_queries)
+    result['sql_ms'] = sum(float(q['time']) for q in ctx.captured_queries) * 1000
+    result['total_ms'] = (time.perf_counter() - start) * 1000
+
+
+def create_company(name=None, username=None):
+    """Create a company with an owner membership (names are unique by default)"""
+    suffix = uuid.uuid4().hex[:8]
+    username = username or f'bench-owner-{suffix}'
+    name = name or f'Benchmark Farm {suffix}'
+    user = User.objects.create_user(username=username, password=BENCH_PASSWORD)
+    company = Company.objects.create(
+        name=name, slug=username, email=f'{username}@example.com',
+        city='Bench City', state_province='Bench State', owner=user,
+    )
+    CompanyMembership.objects.create(user=user, company=company, role='OWNER')
+    return company
+
+
+def seed_batches(company, count, rng=None, batch_size=1000):
+    """Bulk-create ``count`` chick batches with varied ages and losses"""
+    rng = rng or random.Random(0)
+    today = timezone.now().date()
+    statuses = [ChickStatus.ACTIVE] * 7 + [ChickStatus.SOLD, ChickStatus.CULLED, ChickStatus.DECEASED]
+    batches = []
+    for _ in range(count):
+        initial = rng.randint(100, 5000)
+        batches.append(ChickBatch(
+            company=company,
+            breeder_type=rng.choice(BreederType.values),
+            hatch_date=today - timedelta(days=rng.randint(0, 500)),
+            initial_count=initial,
+            current_count=initial - rng.randint(0, initial // 5),
+            farm_location=f'House {rng.randint(1, 20)}',
+            status=rng.choice(statuses),
+        ))
+        # bulk_create skips ChickBatch.save, which dates closing
+        if batches[-1].status != ChickStatus.ACTIVE:
+            batches[-1].closed_at = timezone.now()
+    return ChickBatch.objects.bulk_create(batches, batch_size=batch_size)
+
+
+def seed_inventory(company, count, rng=None, batch_size=1000):
+    """
+    Bulk-create ``count`` inventory products with a mix of stock levels,
+    each with a stock snapshot so the ledger starts at that stock
+    """
+    rng = rng or random.Random(0)
+    products = []
+    for i in range(count):
+        cost = rng.randint(1, 500)
+        products.append(InventoryProduct(
+            company=company,
+            sku=f'SKU-{i:07d}',
+            name=f'Product {i}',
+            category=rng.choice(InventoryCategory.values),
+            stock_on_hand=rng.choice([0, rng.randint(1, 50), rng.randint(50, 1000)]),
+            reorder_point=rng.choice([0, 25, 100]),
+            cost_price=cost,
+            sale_price=cost + rng.randint(0, 200),
+        ))
+    products = InventoryProduct.objects.bulk_create(products, batch_size=batch_size)
+    StockSnapshot.objects.bulk_create(
+        [StockSnapshot(product=product, quantity=product.stock_on_hand) for product in products],
+        batch_size=batch_size,
+    )
+    return products
+
+
+def seed_health_checks(batches, days, rng=None, batch_size=5000):
+    """Bulk-create one health check per batch per day, ``batch_size`` rows at a time"""
+    rng = rng or random.Random(0)
+    pending = []
+    created = 0
+    for batch in batches:
+        for day in range(days):
+            pending.append(HealthCheck(
+                batch_id=batch.pk,
+                company_id=batch.company_id,
+                check_date=batch.hatch_date + timedelta(days=day),
+                diseased_count=rng.randint(0, 5),
+                mortality_count=rng.randint(0, 3),
+                average_weight_g=40 + day * rng.uniform(40, 60),
+            ))
+            if len(pending) >= batch_size:
+                HealthCheck.objects.bulk_create(pending)
+                created += len(pending)
+                pending = []
+    if pending:
+        HealthCheck.objects.bulk_create(pending)
+        created += len(pending)
+    return created
+
+
+def create_formula():
+    return FeedFormula.objects.create(name=f'Bench Feed {uuid.uuid4().hex[:8]}', breeder_type=BreederType.BROILER)
+
+
+def seed_feed_schedules(batches, days, rng=None, batch_size=5000, formula=None):
+    """Bulk-create one feed schedule per batch per day against a benchmark formula"""
+    rng = rng or random.Random(0)
+    formula = formula or create_formula()
+    pending = []
+    created = 0
+    for batch in batches:
+        for day in range(days):
+            pending.append(FeedSchedule(
+                batch_id=batch.pk,
+                company_id=batch.company_id,
+                formula=formula,
+                date=batch.hatch_date + timedelta(days=day),
+                quantity_kg=round(batch.initial_count * (0.01 + day * rng.uniform(0.003, 0.005)), 2),
+            ))
+            if len(pending) >= batch_size:
+                FeedSchedule.objects.bulk_create(pending)
+                created += len(pending)
+                pending = []
+    if pending:
+        FeedSchedule.objects.bulk_create(pending)
+        created += len(pending)
+    return created
+
+
+def seed_treatments(batches, per_batch, rng=None, batch_size=5000):
+    """Bulk-create ``per_batch`` treatment records per batch with a benchmark medicine"""
+    rng = rng or random.Random(0)
+    medicine = MedicineProduct.objects.create(name=f'Bench Medicine {uuid.uuid4().hex[:8]}')
+    treatments = [
+        TreatmentRecord(
+            batch_id=batch.pk,
+            company_id=batch.company_id,
+            medicine=medicine,
+            date_administered=batch.hatch_date + timedelta(days=rng.randint(0, 30)),
+            dosage=f'{rng.randint(1, 10)} ml/L',
+        )
+        for batch in batches
+        for _ in range(per_batch)
+    ]
+    TreatmentRecord.objects.bulk_create(treatments, batch_size=batch_size)
+    return medicine
+
+
+def seed_disease_cases(batches, per_batch, rng=None, batch_size=5000):
+    """Bulk-create ``per_batch`` disease cases per batch against a benchmark catalog entry"""
+    rng = rng or random.Random(0)
+    disease = DiseaseCatalog.objects.create(name=f'Bench Disease {uuid.uuid4().hex[:8]}', severity=rng.randint(1, 5))
+    cases = [
+        DiseaseCase(
+            batch_id=batch.pk,
+            company_id=batch.company_id,
+            disease=disease,
+            date_detected=batch.hatch_date + timedelta(days=rng.randint(0, 30)),
+            affected_count=rng.randint(1, 50),
+            status=rng.choice(DiseaseCaseStatus.values),
+        )
+        for batch in batches
+        for _ in range(per_batch)
+    ]
+    DiseaseCase.objects.bulk_create(cases, batch_size=batch_size)
+    return disease
+
+
+class Farm:
+    """Everything seed_farm created, for building URLs and assertions"""
+
+    def __init__(self, company, batches, formula, medicine, disease, products):
+        self.company = company
+        self.batches = batches
+        self.formula = formula
+        self.medicine = medicine
+        self.disease = disease
+        self.products = products
+
+    @property
+    def batch(self):
+        """A representative active batch"""
+        return next((b for b in self.batches if b.status == ChickStatus.ACTIVE), self.batches[0])
+
+
+def seed_farm(batches=50, days=30, inventory=100, seed=0, username=None):
+    """
+    Seed one company with every kind of record, deterministically for a given
+    ``seed``: batches with daily health checks and feeds, treatments, disease
+    cases and inventory. Rollups are rebuilt because bulk_create skips signals.
+    """
+    rng = random.Random(seed)
+    company = create_company(username=username)
+    seeded = seed_batches(company, batches, rng)
+    seed_health_checks(seeded, days, rng)
+    formula = create_formula()
+    seed_feed_schedules(seeded, days, rng, formula=formula)
+    medicine = seed_treatments(seeded, 2, rng)
+    disease = seed_disease_cases(seeded, 1, rng)
+    products = seed_inventory(company, inventory, rng)
+    rebuild_company_rollups(company)
+    return Farm(company, seeded, formula, medicine, disease, products)
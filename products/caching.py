@@ -0,0 +1,43 @@
+"""
+Versioned cache keys.
+
+Instead of deleting every cached entry derived from some data, writers bump a
+version number for it and readers include the current version in their cache
+keys. Stale entries are simply never read again and expire on their own.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{namespace}:{scope}'
+
+
+def _version_key(namespace, scope):
+    return VERSION_KEY.format(namespace=namespace, scope=':'.join(str(part) for part in scope))
+
+
+def get_version(namespace, *scope):
+    """Current version for ``namespace`` and ``scope``, creating it if missing"""
+    key = _version_key(namespace, scope)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_version(namespace, *scope):
+    """Invalidate everything cached under ``namespace`` and ``scope``"""
+    key = _version_key(namespace, scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def versioned_key(namespace, *scope, suffix=''):
+    """Cache key that changes whenever bump_version is called for the scope"""
+    version = get_version(namespace, *scope)
+    key = f"{namespace}:{':'.join(str(part) for part in scope)}:v{version}"
+    return f"{key}:{suffix}" if suffix else key
@@ -0,0 +1,131 @@
+"""
+Feed and medicine drawn from inventory.
+
+A FeedFormula or MedicineProduct names the inventory SKU it is stocked as.
+Feed schedules and treatments then consume that SKU from their batch's
+company as CONSUMPTION movements linked to the record (products.stock).
+
+``sync`` brings the movements linked to a set of records in line with what
+the records say now, for many records at once: creating, editing and
+deleting records, and bulk imports, all go through it. Editing a record
+only moves the difference, and changing its formula returns the stock to
+the old SKU. A record whose formula or medicine has no SKU, or whose company
+does not stock it, consumes nothing. ``check_stock`` tells a form ahead
+of the write that a record would take its SKU below zero.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from company.models import Company
+from products.models import FeedSchedule, InventoryProduct, MovementKind, StockMovement, TreatmentRecord
+from products.stock import apply_movements
+
+
+def whole_units(quantity):
+    """Stock is counted in whole units; fractions of a unit round half up"""
+    return int(Decimal(quantity).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class Consumed:
+    """How records of one model draw from inventory"""
+
+    def __init__(self, link, sku, quantity, units, fields):
+        self.link = link
+        self.sku = sku
+        self.quantity = quantity
+        self.units = units
+        # Fields whose change alters the consumption
+        self.fields = set(fields)
+
+
+SOURCES = {
+    FeedSchedule: Consumed('feed_schedule', 'formula__sku', 'quantity_kg', whole_units, ['batch', 'formula', 'quantity_kg']),
+    TreatmentRecord: Consumed('treatment', 'medicine__sku', 'quantity_used', int, ['batch', 'medicine', 'quantity_used']),
+}
+
+
+def needs_sync(instance, update_fields=None):
+    if update_fields is None:
+        return True
+    return bool({name.removesuffix('_id') for name in update_fields} & SOURCES[type(instance)].fields)
+
+
+def check_stock(instance):
+    """
+    Raise ValidationError when saving ``instance`` would take its SKU below
+    zero. Only a check ahead of the write: sync still raises StockError.
+    """
+    consumed = SOURCES[type(instance)]
+    relation, sku_field = consumed.sku.split('__')
+    quantity = getattr(instance, consumed.quantity)
+    if instance.batch_id is None or getattr(instance, f'{relation}_id') is None or quantity is None:
+        return
+    sku = getattr(getattr(instance, relation), sku_field)
+    product = InventoryProduct.objects.filter(company_id=instance.batch.company_id, sku=sku) \
+        .exclude(sku='').values_list('pk', 'stock_on_hand').first()
+    if product is None:
+        return
+    product_id, stock = product
+    change = -consumed.units(quantity)
+    if instance.pk:
+        # What the record already took from this product comes back first
+        change -= StockMovement.objects.filter(product_id=product_id, **{consumed.link: instance.pk}) \
+            .aggregate(total=Coalesce(Sum('quantity'), 0))['total']
+    if stock + change < 0:
+        raise ValidationError({consumed.quantity: f"Insufficient stock: {sku} (has {stock}, change {change:+})"})
+
+
+def sync(model, pks, removed=False, user=None):
+    """
+    Record the consumption of the ``model`` rows ``pks`` (none when
+    ``removed``) as movements correcting what their linked movements add up
+    to. A few queries whatever the number of records; raises StockError,
+    applying nothing, when a SKU would go below zero.
+    """
+    consumed = SOURCES[model]
+    pks = list(pks)
+    if not pks:
+        return 0
+
+    with transaction.atomic():
+        wanted = defaultdict(int)
+        if not removed:
+            rows = model.objects.filter(pk__in=pks, company__isnull=False).exclude(**{consumed.sku: ''}) \
+                .values_list('pk', 'company_id', consumed.sku, consumed.quantity)
+            records = [(pk, company_id, sku, consumed.units(quantity)) for pk, company_id, sku, quantity in rows]
+            products = dict(
+                ((company_id, sku), pk)
+                for company_id, sku, pk in InventoryProduct.objects.filter(
+                    company_id__in={record[1] for record in records},
+                    sku__in={record[2] for record in records},
+                ).values_list('company_id', 'sku', 'pk')
+            )
+            for pk, company_id, sku, units in records:
+                product_id = products.get((company_id, sku))
+                if product_id and units:
+                    wanted[(pk, company_id, product_id)] -= units
+
+        recorded = StockMovement.objects.filter(**{f'{consumed.link}__in': pks}) \
+            .order_by().values_list(consumed.link, 'company', 'product').annotate(total=Sum('quantity'))
+        for pk, company_id, product_id, total in recorded:
+            wanted[(pk, company_id, product_id)] -= total
+
+        movements = defaultdict(list)
+        for (pk, company_id, product_id), quantity in wanted.items():
+            if quantity:
+                movements[company_id].append(StockMovement(
+                    product_id=product_id,
+                    kind=MovementKind.CONSUMPTION,
+                    quantity=quantity,
+                    note='Returned' if quantity > 0 else '',
+                    **{f'{consumed.link}_id': pk},
+                ))
+        companies = Company.objects.in_bulk(movements)
+        for company_id, company_movements in movements.items():
+            apply_movements(companies[company_id], company_movements, user)
+    return sum(len(company_movements) for company_movements in movements.values())
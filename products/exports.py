@@ -0,0 +1,238 @@
+"""
+Streaming CSV and XLSX exports.
+
+Rows are fetched with ``values_list(...).iterator(chunk_size=...)``. Related
+columns are joined in the same query, so no row costs an extra query. Output
+is produced in bounded chunks, so memory use does not depend on how many
+rows a company has.
+"""
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from products.models import (
+    ChickBatch, FeedSchedule, HealthCheck, InventoryProduct, TreatmentRecord
+)
+
+CSV = 'csv'
+XLSX = 'xlsx'
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+
+class Dataset:
+    """A company-scoped export: a model, a company lookup and ordered columns"""
+
+    def __init__(self, model, columns, company_lookup='company'):
+        self.model = model
+        self.columns = columns
+        self.company_lookup = company_lookup
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, company):
+        return self.model.objects.filter(**{self.company_lookup: company}).order_by('pk')
+
+    def rows(self, company, chunk_size=CHUNK_SIZE):
+        lookups = [lookup for _, lookup in self.columns]
+        return self.queryset(company).values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+DATASETS = {
+    'batches': Dataset(ChickBatch, [
+        ('id', 'id'),
+        ('breeder_type', 'breeder_type'),
+        ('hatch_date', 'hatch_date'),
+        ('initial_count', 'initial_count'),
+        ('current_count', 'current_count'),
+        ('farm_location', 'farm_location'),
+        ('source', 'source'),
+        ('status', 'status'),
+        ('notes', 'notes'),
+        ('created_at', 'created_at'),
+    ]),
+    'health_checks': Dataset(HealthCheck, [
+        ('id', 'id'),
+        ('batch', 'batch_id'),
+        ('farm_location', 'batch__farm_location'),
+        ('check_date', 'check_date'),
+        ('diseased_count', 'diseased_count'),
+        ('mortality_count', 'mortality_count'),
+        ('average_weight_g', 'average_weight_g'),
+        ('notes', 'notes'),
+    ]),
+    'feed_schedules': Dataset(FeedSchedule, [
+        ('id', 'id'),
+        ('batch', 'batch_id'),
+        ('formula', 'formula__name'),
+        ('date', 'date'),
+        ('quantity_kg', 'quantity_kg'),
+    ]),
+    'treatments': Dataset(TreatmentRecord, [
+        ('id', 'id'),
+        ('batch', 'batch_id'),
+        ('medicine', 'medicine__name'),
+        ('date_administered', 'date_administered'),
+        ('dosage', 'dosage'),
+        ('administered_by', 'administered_by__username'),
+        ('purpose', 'purpose'),
+        ('notes', 'notes'),
+    ]),
+    'inventory': Dataset(InventoryProduct, [
+        ('sku', 'sku'),
+        ('name', 'name'),
+        ('category', 'category'),
+        ('breeder_type', 'breeder_type'),
+        ('unit', 'unit'),
+        ('stock_on_hand', 'stock_on_hand'),
+        ('reorder_point', 'reorder_point'),
+        ('cost_price', 'cost_price'),
+        ('sale_price', 'sale_price'),
+        ('is_active', 'is_active'),
+    ]),
+}
+
+
+class StreamBuffer:
+    """Write-only file object whose contents are drained as they are produced"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts, self.size = [], 0
+        return data
+
+
+# ---------------------------------------------------------------------------
+# CSV
+# ---------------------------------------------------------------------------
+class _TextBuffer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+
+def stream_csv(headers, rows, flush_bytes=FLUSH_BYTES):
+    buffer = _TextBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    size = 0
+    for row in rows:
+        writer.writerow(row)
+        size += len(buffer.parts[-1])
+        if size >= flush_bytes:
+            yield ''.join(buffer.parts).encode('utf-8')
+            buffer.parts, size = [], 0
+    if buffer.parts:
+        yield ''.join(buffer.parts).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# XLSX (SpreadsheetML written straight into a streamed zip)
+# ---------------------------------------------------------------------------
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(headers, rows, sheet_name='Export', flush_bytes=FLUSH_BYTES):
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name[:31])))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_START.encode('utf-8'))
+            sheet.write(_xlsx_row(headers).encode('utf-8'))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if buffer.size >= flush_bytes:
+                    yield buffer.drain()
+            sheet.write(_SHEET_END.encode('utf-8'))
+    yield buffer.drain()
+
+
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def stream_export(dataset_name, company, fmt=CSV, chunk_size=CHUNK_SIZE):
+    """Byte chunks of a company's dataset in ``fmt``"""
+    dataset = DATASETS[dataset_name]
+    rows = dataset.rows(company, chunk_size=chunk_size)
+    if fmt == XLSX:
+        return stream_xlsx(dataset.headers, rows, sheet_name=dataset_name)
+    return stream_csv(dataset.headers, rows)
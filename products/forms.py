@@ -1,20 +1,23 @@
 from django import forms
+from django.forms.utils import ErrorDict
+from products.stock import StockError, signed_quantity
 from products.models import (
     ChickBatch, HealthCheck, FeedFormula, FeedSchedule,
     MedicineProduct, TreatmentRecord, DiseaseCatalog, DiseaseCase,
-    InventoryProduct, BreederType, InventoryCategory, DiseaseCaseStatus, ChickStatus
+    InventoryProduct, BreederType, InventoryCategory, DiseaseCaseStatus, ChickStatus, MovementKind
 )
 
 # --- Batch & Health -------------------------------------------------------
 class ChickBatchForm(forms.ModelForm):
+    # current_count is not edited here: health checks move it (products.mortality)
+    # and recompute_live_counts corrects it
     class Meta:
         model = ChickBatch
-        fields = ['breeder_type', 'hatch_date', 'initial_count', 'current_count', 'farm_location', 'source', 'status', 'notes']
+        fields = ['breeder_type', 'hatch_date', 'initial_count', 'farm_location', 'source', 'status', 'notes']
         widgets = {
             'breeder_type': forms.Select(attrs={'class': 'form-select'}),
             'hatch_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'initial_count': forms.NumberInput(attrs={'class': 'form-control'}),
-            'current_count': forms.NumberInput(attrs={'class': 'form-control'}),
             'farm_location': forms.TextInput(attrs={'class': 'form-control'}),
             'source': forms.TextInput(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
@@ -33,13 +36,50 @@ class HealthCheckForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
 
+class HealthCheckImportForm(HealthCheckForm):
+    """Validates one imported health check row; the batch is checked per chunk"""
+    batch = forms.IntegerField(min_value=1)
+
+class DailyRoundForm(HealthCheckForm):
+    """One batch's row of a daily round; unticked rows are left out and not validated"""
+    batch = forms.IntegerField(min_value=1, widget=forms.HiddenInput)
+    include = forms.BooleanField(required=False, initial=True, widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+
+    class Meta(HealthCheckForm.Meta):
+        fields = ['diseased_count', 'mortality_count', 'average_weight_g', 'notes']
+        widgets = {
+            'diseased_count': forms.NumberInput(attrs={'class': 'form-control form-control-sm'}),
+            'mortality_count': forms.NumberInput(attrs={'class': 'form-control form-control-sm'}),
+            'average_weight_g': forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.01'}),
+            'notes': forms.TextInput(attrs={'class': 'form-control form-control-sm'}),
+        }
+
+    @property
+    def included(self):
+        if not self.is_bound:
+            return self.fields['include'].initial
+        return self.fields['include'].widget.value_from_datadict(self.data, self.files, self.add_prefix('include'))
+
+    def full_clean(self):
+        if self.is_bound and not self.included:
+            self._errors = ErrorDict()
+            self.cleaned_data = {'include': False}
+            return
+        super().full_clean()
+
+DailyRoundFormSet = forms.formset_factory(DailyRoundForm, extra=0, max_num=1000)
+
+class RoundDateForm(forms.Form):
+    check_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+
 # --- Feed -----------------------------------------------------------------
 class FeedFormulaForm(forms.ModelForm):
     class Meta:
         model = FeedFormula
-        fields = ['name', 'breeder_type', 'description']
+        fields = ['name', 'breeder_type', 'sku', 'description']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
+            'sku': forms.TextInput(attrs={'class': 'form-control'}),
             'breeder_type': forms.Select(attrs={'class': 'form-select'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
@@ -54,13 +94,25 @@ class FeedScheduleForm(forms.ModelForm):
             'quantity_kg': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
         }
 
+class FeedScheduleImportForm(FeedScheduleForm):
+    """
+    Validates one imported feed schedule row. ``formula`` may be a formula id
+    or name and, like ``batch``, is resolved for a whole chunk at once.
+    """
+    batch = forms.IntegerField(min_value=1)
+    formula = forms.CharField(max_length=120)
+
+    class Meta(FeedScheduleForm.Meta):
+        fields = ['date', 'quantity_kg']
+
 # --- Medicine & Treatment -------------------------------------------------
 class MedicineProductForm(forms.ModelForm):
     class Meta:
         model = MedicineProduct
-        fields = ['name', 'breeder_type', 'description']
+        fields = ['name', 'breeder_type', 'sku', 'description']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
+            'sku': forms.TextInput(attrs={'class': 'form-control'}),
             'breeder_type': forms.Select(attrs={'class': 'form-select'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
@@ -68,11 +120,12 @@ class MedicineProductForm(forms.ModelForm):
 class TreatmentRecordForm(forms.ModelForm):
     class Meta:
         model = TreatmentRecord
-        fields = ['medicine', 'date_administered', 'dosage', 'administered_by', 'purpose', 'notes']
+        fields = ['medicine', 'date_administered', 'dosage', 'quantity_used', 'administered_by', 'purpose', 'notes']
         widgets = {
             'medicine': forms.Select(attrs={'class': 'form-select'}),
             'date_administered': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'dosage': forms.TextInput(attrs={'class': 'form-control'}),
+            'quantity_used': forms.NumberInput(attrs={'class': 'form-control'}),
             'administered_by': forms.Select(attrs={'class': 'form-select'}),
             'purpose': forms.TextInput(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
@@ -105,6 +158,15 @@ class DiseaseCaseForm(forms.ModelForm):
 
 # --- Inventory ----------------------------------------------------
 class InventoryProductForm(forms.ModelForm):
+    # Stock shown when the form was rendered; the edit is applied as the
+    # difference from it, so adjustments made meanwhile are kept
+    expected_stock = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['expected_stock'].initial = self.instance.stock_on_hand
+
     class Meta:
         model = InventoryProduct
         fields = ['sku', 'name', 'category', 'breeder_type', 'unit', 'stock_on_hand', 'reorder_point', 'cost_price', 'sale_price', 'is_active']
@@ -121,6 +183,42 @@ class InventoryProductForm(forms.ModelForm):
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+class StockMovementForm(forms.Form):
+    """One movement of a bulk stock adjustment; ``product`` is an id, or give ``sku``"""
+    product = forms.IntegerField(required=False, min_value=1)
+    sku = forms.CharField(required=False, max_length=40)
+    kind = forms.ChoiceField(choices=MovementKind.choices)
+    quantity = forms.IntegerField(help_text="Positive; signed for adjustments")
+    reference = forms.CharField(required=False, max_length=80)
+    note = forms.CharField(required=False, max_length=255)
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get('product') and not cleaned.get('sku'):
+            raise forms.ValidationError("Give a product id or sku.")
+        if cleaned.get('kind') and cleaned.get('quantity') is not None:
+            try:
+                cleaned['quantity'] = signed_quantity(cleaned['kind'], cleaned['quantity'])
+            except StockError as e:
+                raise forms.ValidationError(str(e))
+        return cleaned
+
+# --- Bulk import ----------------------------------------------------------
+class BulkImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('health_checks', 'Health checks'),
+        ('feed_schedules', 'Feed schedules'),
+    ]
+    FORMAT_CHOICES = [
+        ('', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('json', 'JSON / JSON Lines'),
+    ]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control'}))
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+
 # ---------------------------------------------------------------------------
 # NOTE: Removed forms for deleted models (Stock, Vendor, PurchaseOrder, RFID)
 # ---------------------------------------------------------------------------
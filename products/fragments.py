@@ -0,0 +1,144 @@
+"""
+Versioned caching of rendered template fragments.
+
+The batch detail tabs are cached per ``(company_id, batch_id, section,
+version)``, where the version belongs to ``(batch_id, section)`` and is bumped
+by products.signals whenever a row of that section is written. Sections that
+show a catalog name (formula, medicine, disease) also carry the catalog's
+version, so renaming a formula invalidates them everywhere. The inventory
+rows reuse the company's inventory version (see products.stats).
+
+Everything goes through the default cache with get/set/incr only, so any
+backend works; with a per-process one such as locmem each worker keeps its
+own fragments and counters. Hits and misses are counted per section in the
+cache itself (see the fragment_cache_stats command).
+"""
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from products.caching import bump_version, get_version, versioned_key
+from products.models import (
+    DiseaseCase, DiseaseCatalog, FeedFormula, FeedSchedule, HealthCheck, MedicineProduct, TreatmentRecord
+)
+from products.stats import INVENTORY_NAMESPACE
+
+FRAGMENT_NAMESPACE = 'fragment'
+CATALOG_NAMESPACE = 'fragment-catalog'
+STATS_KEY = 'fragment:stats:{section}:{outcome}'
+FRAGMENT_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+HITS = 'hits'
+MISSES = 'misses'
+
+# Batch detail sections, named like their template context variables
+SECTION_BY_MODEL = {
+    HealthCheck: 'health_checks',
+    FeedSchedule: 'feed_schedules',
+    TreatmentRecord: 'treatments',
+    DiseaseCase: 'disease_cases',
+}
+BATCH_SECTIONS = tuple(SECTION_BY_MODEL.values())
+
+# Catalogs whose names a batch section shows
+SECTION_CATALOGS = {
+    'feed_schedules': FeedFormula,
+    'treatments': MedicineProduct,
+    'disease_cases': DiseaseCatalog,
+}
+CATALOGS = tuple(SECTION_CATALOGS.values())
+
+INVENTORY_SECTION = 'inventory'
+SECTIONS = (*BATCH_SECTIONS, INVENTORY_SECTION)
+
+
+def _vary_suffix(vary):
+    """Digest of extra key parts, e.g. the query string of a filtered list"""
+    if not vary:
+        return ''
+    return hashlib.sha1('|'.join(str(part) for part in vary).encode()).hexdigest()[:16]
+
+
+def batch_fragment_key(batch, section, *vary):
+    version = get_version(FRAGMENT_NAMESPACE, batch.pk, section)
+    key = f'{FRAGMENT_NAMESPACE}:{batch.company_id}:{batch.pk}:{section}:v{version}'
+    catalog = SECTION_CATALOGS.get(section)
+    if catalog:
+        key += f':c{get_version(CATALOG_NAMESPACE, catalog._meta.label_lower)}'
+    suffix = _vary_suffix(vary)
+    return f'{key}:{suffix}' if suffix else key
+
+
+def inventory_fragment_key(company, *vary):
+    return versioned_key(INVENTORY_NAMESPACE, company.pk, suffix=f'fragment:{_vary_suffix(vary)}')
+
+
+def fragment_key(section, obj, *vary):
+    """Cache key of ``section`` for ``obj`` (a batch, or the company for inventory)"""
+    if section in BATCH_SECTIONS:
+        return batch_fragment_key(obj, section, *vary)
+    if section == INVENTORY_SECTION:
+        return inventory_fragment_key(obj, *vary)
+    raise ValueError(f"Unknown fragment section '{section}'")
+
+
+def count(section, outcome):
+    key = STATS_KEY.format(section=section, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_or_render(section, obj, render, *vary):
+    """The cached fragment, or ``render()`` cached for next time"""
+    key = fragment_key(section, obj, *vary)
+    content = cache.get(key)
+    if content is not None:
+        count(section, HITS)
+        return content
+    count(section, MISSES)
+    content = render()
+    cache.set(key, content, FRAGMENT_TIMEOUT)
+    return content
+
+
+def stats():
+    """Hit and miss counts by section, as recorded in the cache"""
+    keys = {
+        (section, outcome): STATS_KEY.format(section=section, outcome=outcome)
+        for section in SECTIONS for outcome in (HITS, MISSES)
+    }
+    values = cache.get_many(keys.values())
+    return {
+        section: {outcome: values.get(keys[section, outcome], 0) for outcome in (HITS, MISSES)}
+        for section in SECTIONS
+    }
+
+
+def reset_stats():
+    cache.delete_many([
+        STATS_KEY.format(section=section, outcome=outcome)
+        for section in SECTIONS for outcome in (HITS, MISSES)
+    ])
+
+
+def _bump_sections(batch_ids, section):
+    for batch_id in batch_ids:
+        bump_version(FRAGMENT_NAMESPACE, batch_id, section)
+
+
+def invalidate_batches(batch_ids, section):
+    """
+    Invalidate ``section`` of the given batches once the current transaction
+    commits; bumping earlier would let a reader cache the old rows under the
+    new version.
+    """
+    transaction.on_commit(partial(_bump_sections, set(batch_ids), section))
+
+
+def invalidate_catalog(model):
+    transaction.on_commit(partial(bump_version, CATALOG_NAMESPACE, model._meta.label_lower))
@@ -0,0 +1,345 @@
+"""
+Streaming bulk import of health checks and feed schedules.
+
+Rows are read incrementally from CSV, JSON arrays or JSON Lines, validated
+with the same rules as the single-record forms and written in chunks: batch
+ownership (and feed formulas) are checked with one query per chunk, and each
+chunk is written with ``bulk_create`` inside its own transaction. Invalid rows
+are reported individually and never abort the rest of the file.
+"""
+import csv
+import io
+import itertools
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from products import consumption, fragments, mortality
+from products.forms import FeedScheduleImportForm, HealthCheckImportForm
+from products.models import ChickBatch, FeedFormula, FeedSchedule, HealthCheck
+from products.rollups import rebuild_rollups
+from products.stock import StockError
+
+CSV = 'csv'
+JSON = 'json'
+DEFAULT_CHUNK_SIZE = getattr(settings, 'BULK_IMPORT_CHUNK_SIZE', 500)
+READ_SIZE = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """The file could not be parsed at all"""
+
+
+# ---------------------------------------------------------------------------
+# Incremental readers
+# ---------------------------------------------------------------------------
+def open_text(binary_file, encoding='utf-8-sig'):
+    """Wrap an uploaded or opened binary file for incremental text reads"""
+    return io.TextIOWrapper(binary_file, encoding=encoding, newline='')
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return CSV
+    if name.endswith(('.json', '.jsonl', '.ndjson')):
+        return JSON
+    raise ImportFormatError(f"Cannot detect the format of '{filename}'; choose CSV or JSON.")
+
+
+def iter_csv_rows(stream):
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            yield {key.strip(): (value or '').strip() for key, value in row.items() if key}
+    except csv.Error as exc:
+        raise ImportFormatError(f"Invalid CSV after line {reader.line_num}: {exc}")
+
+
+def iter_json_rows(stream, read_size=READ_SIZE):
+    """Yield objects from a top-level JSON array or from JSON Lines"""
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if not first:
+        return
+    if first == '[':
+        yield from _iter_json_array(stream, read_size)
+        return
+
+    lines = itertools.chain([first + stream.readline()], stream)
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f"Invalid JSON on line {line_number}: {exc.msg}")
+
+
+def _iter_json_array(stream, read_size):
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ImportFormatError(f"Invalid JSON array: {exc.msg}")
+            else:
+                # A value ending exactly at the buffer edge may be truncated
+                if end < len(buffer) or eof:
+                    yield obj
+                    buffer = buffer[end:]
+                    continue
+        if eof:
+            raise ImportFormatError("Invalid JSON array: missing closing bracket")
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_rows(stream, fmt):
+    if fmt == CSV:
+        return _decoded(iter_csv_rows(stream))
+    if fmt == JSON:
+        return _decoded(iter_json_rows(stream))
+    raise ImportFormatError(f"Unsupported format: {fmt}")
+
+
+def _decoded(rows):
+    # The text is decoded as it is read, so bad bytes surface mid-file
+    try:
+        yield from rows
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError(f"The file is not {exc.encoding.upper()} text; save it as UTF-8 and upload it again.")
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+class ImportResult:
+    """Running totals and per-row errors for one import"""
+
+    def __init__(self, max_errors=None):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.fatal_error = None
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append((row_number, message))
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+def format_errors(form):
+    return '; '.join(
+        f"{field}: {' '.join(messages)}" if field != '__all__' else ' '.join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+# ---------------------------------------------------------------------------
+# Importers
+# ---------------------------------------------------------------------------
+class BaseImporter:
+    form_class = None
+    # Batch detail fragment the imported rows appear in (see products.fragments)
+    section = None
+
+    def __init__(self, company, chunk_size=DEFAULT_CHUNK_SIZE, max_errors=None):
+        self.company = company
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def run(self, rows):
+        result = ImportResult(self.max_errors)
+        chunk = []
+        try:
+            for numbered_row in enumerate(rows, 1):
+                chunk.append(numbered_row)
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk, result)
+                    chunk = []
+        except ImportFormatError as exc:
+            # Rows read before the malformed part are still imported
+            result.fatal_error = str(exc)
+        if chunk:
+            self.import_chunk(chunk, result)
+        return result
+
+    def import_chunk(self, chunk, result):
+        result.rows += len(chunk)
+        valid = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                result.add_error(row_number, 'Row must be an object with named fields.')
+                continue
+            form = self.form_class(data=row)
+            if form.is_valid():
+                valid.append((row_number, form.cleaned_data))
+            else:
+                result.add_error(row_number, format_errors(form))
+        if not valid:
+            return
+
+        # Batch ownership for the whole chunk in one query
+        owned = set(ChickBatch.objects.filter(
+            company=self.company,
+            pk__in={data['batch'] for _, data in valid},
+        ).values_list('pk', flat=True))
+        for row_number, data in valid:
+            if data['batch'] not in owned:
+                result.add_error(row_number, f"batch: Batch {data['batch']} does not belong to your company.")
+        valid = [(row_number, data) for row_number, data in valid if data['batch'] in owned]
+
+        rows = self.build(valid, result)
+        if not rows:
+            return
+        objects = [obj for _, obj in rows]
+        try:
+            with transaction.atomic():
+                created, updated = self.write(objects)
+                rebuild_rollups({obj.batch_id for obj in objects})
+                fragments.invalidate_batches({obj.batch_id for obj in objects}, self.section)
+        except (DatabaseError, StockError) as exc:
+            for row_number, _ in rows:
+                result.add_error(row_number, f"Not saved, chunk failed: {exc}")
+            return
+        result.created += created
+        result.updated += updated
+
+    def build(self, valid, result):
+        """(row number, unsaved object) pairs to write for the valid rows"""
+        raise NotImplementedError
+
+    def write(self, objects):
+        raise NotImplementedError
+
+
+class HealthCheckImporter(BaseImporter):
+    """Upserts health checks on the (batch, check_date) unique constraint"""
+    form_class = HealthCheckImportForm
+    section = 'health_checks'
+    update_fields = ['diseased_count', 'mortality_count', 'average_weight_g', 'notes', 'updated_at']
+
+    def build(self, valid, result):
+        # Later rows for the same batch and day replace earlier ones
+        objects = {}
+        for row_number, data in valid:
+            objects[(data['batch'], data['check_date'])] = row_number, HealthCheck(
+                batch_id=data['batch'],
+                company_id=self.company.pk,
+                check_date=data['check_date'],
+                diseased_count=data['diseased_count'],
+                mortality_count=data['mortality_count'],
+                average_weight_g=data['average_weight_g'],
+                notes=data['notes'],
+            )
+        return self.within_live_counts(list(objects.values()), result)
+
+    def within_live_counts(self, rows, result):
+        """Reject rows recording more new deaths than their batch has live birds left, as the daily round does"""
+        existing = self.existing_deaths([obj for _, obj in rows])
+        live = mortality.live_counts({obj.batch_id for _, obj in rows})
+        kept = []
+        for row_number, obj in rows:
+            deaths = obj.mortality_count - existing.get((obj.batch_id, obj.check_date), 0)
+            if deaths > live[obj.batch_id]:
+                result.add_error(row_number, f"mortality_count: Batch #{obj.batch_id} has only {live[obj.batch_id]} live birds.")
+                continue
+            live[obj.batch_id] -= deaths
+            kept.append((row_number, obj))
+        return kept
+
+    def write(self, objects):
+        existing = self.existing_deaths(objects)
+        HealthCheck.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['batch', 'check_date'],
+            update_fields=self.update_fields,
+        )
+        # bulk_create sends no signals; replaced checks only move the difference
+        deaths = defaultdict(int)
+        for obj in objects:
+            deaths[obj.batch_id] += obj.mortality_count - existing.get((obj.batch_id, obj.check_date), 0)
+        mortality.take_deaths(deaths)
+        mortality.evaluate_alerts(deaths)
+        updated = sum(1 for obj in objects if (obj.batch_id, obj.check_date) in existing)
+        return len(objects) - updated, updated
+
+    def existing_deaths(self, objects):
+        """Deaths of the checks already recorded, keyed like ``objects``"""
+        rows = HealthCheck.objects.filter(
+            batch_id__in={obj.batch_id for obj in objects},
+            check_date__in={obj.check_date for obj in objects},
+        ).values_list('batch_id', 'check_date', 'mortality_count')
+        return {(batch_id, check_date): count for batch_id, check_date, count in rows}
+
+
+class FeedScheduleImporter(BaseImporter):
+    form_class = FeedScheduleImportForm
+    section = 'feed_schedules'
+
+    def build(self, valid, result):
+        formulas = self.resolve_formulas({data['formula'] for _, data in valid})
+        objects = []
+        for row_number, data in valid:
+            formula_id = formulas.get(data['formula'])
+            if formula_id is None:
+                result.add_error(row_number, f"formula: Unknown feed formula '{data['formula']}'.")
+                continue
+            objects.append((row_number, FeedSchedule(
+                batch_id=data['batch'],
+                company_id=self.company.pk,
+                formula_id=formula_id,
+                date=data['date'],
+                quantity_kg=data['quantity_kg'],
+            )))
+        return objects
+
+    def resolve_formulas(self, references):
+        """Map formula ids and names to primary keys with one query"""
+        ids = {int(ref) for ref in references if ref.isdigit()}
+        names = {ref for ref in references if not ref.isdigit()}
+        mapping = {}
+        for pk, name in FeedFormula.objects.filter(Q(pk__in=ids) | Q(name__in=names)).values_list('pk', 'name'):
+            mapping[str(pk)] = pk
+            mapping[name] = pk
+        return mapping
+
+    def write(self, objects):
+        FeedSchedule.objects.bulk_create(objects)
+        # bulk_create sends no signals; draw the feed from inventory here
+        consumption.sync(FeedSchedule, [obj.pk for obj in objects])
+        return len(objects), 0
+
+
+IMPORTERS = {
+    'health_checks': HealthCheckImporter,
+    'feed_schedules': FeedScheduleImporter,
+}
+
+
+def import_file(kind, stream, fmt, company, chunk_size=DEFAULT_CHUNK_SIZE, max_errors=None):
+    """Import a text stream of ``kind`` rows for ``company`` and return an ImportResult"""
+    importer = IMPORTERS[kind](company, chunk_size=chunk_size, max_errors=max_errors)
+    return importer.run(iter_rows(stream, fmt))
@@ -0,0 +1,104 @@
+"""
+Full table scans and unindexed sorts in the queries of every view.
+
+``advise`` requests each benchmark case (see products.view_benchmarks) once
+as the farm's owner, captures its queries and asks the database for their
+plans: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL. A plan step that
+reads a whole table instead of searching an index is a full scan. On SQLite
+that includes walking a whole index in order (SCAN ... USING INDEX), unless
+the query has a LIMIT to stop the walk early. A step that sorts rows no index
+returned in order (USE TEMP B-TREE, Sort) is reported against the table the
+query selects from.
+
+PostgreSQL prefers sequential scans on small tables whatever the indexes, so
+the plans are taken with enable_seqscan off: a Seq Scan left in them has no
+index to use. Catalog and account tables stay small and are listed in full
+by their own pages, so their scans are left out unless asked for.
+"""
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from products.view_benchmarks import build_cases
+
+SMALL_TABLES = {
+    'products_feedformula', 'products_medicineproduct', 'products_diseasecatalog',
+    'company_company', 'company_companymembership', 'auth_user', 'django_session',
+}
+
+# Django's table aliases: "products_healthcheck" U0, INNER JOIN "products_chickbatch" T3
+ALIAS = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)"?\b')
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$')
+LIMIT = re.compile(r'\bLIMIT \d+')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)$')
+POSTGRES_SORT = re.compile(r'^(?:->\s*)?Sort\s+\(')
+MAIN_TABLE = re.compile(r'\bFROM "(\w+)"')
+SCAN = 'full scan'
+SORT = 'sort'
+
+
+
+def explain(sql):
+    """Plan lines of ``sql``"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[3] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            lines = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SET LOCAL enable_seqscan = on')
+            return lines
+    raise NotImplementedError(f"No query plans for the {connection.vendor} backend")
+
+
+def findings(sql, plan):
+    """(kind, table) of the full scans and sorts in ``plan``"""
+    sqlite = connection.vendor == 'sqlite'
+    scan, sort = (SQLITE_SCAN, SQLITE_SORT) if sqlite else (POSTGRES_SCAN, POSTGRES_SORT)
+    limited = LIMIT.search(sql) is not None
+    aliases = dict((alias, table) for table, alias in ALIAS.findall(sql))
+    main_table = MAIN_TABLE.search(sql)
+    found = set()
+    for line in plan:
+        line = line.strip()
+        match = scan.search(line)
+        if match and not (limited and 'INDEX' in line):
+            found.add((SCAN, aliases.get(match.group(1), match.group(1))))
+        elif sort.search(line) and main_table:
+            found.add((SORT, main_table.group(1)))
+    return found
+
+
+def advise(farm, all_tables=False):
+    """
+    Full scans and sorts of every view for ``farm``, as
+    {case name: [(kind, table, sql)]}. Views without any are left out.
+    """
+    client = Client()
+    report = defaultdict(list)
+    # The test client's host is only allowed automatically under the test runner
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for case in build_cases(farm):
+            # Log in again every time: the logout view ends the session
+            client.force_login(farm.company.owner)
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(case.url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            seen = set()
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')) or sql in seen:
+                    continue
+                seen.add(sql)
+                for kind, table in sorted(findings(sql, explain(sql))):
+                    if all_tables or table not in SMALL_TABLES:
+                        report[case.name].append((kind, table, sql))
+    return dict(report)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_ROOT, CHUNK_SIZE, archive
+
+
+class Command(BaseCommand):
+    help = "Move closed batches and their records out of the live tables into per-company archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='Archive batches closed more than this many days ago')
+        parser.add_argument('--company', type=int, help='Only archive this company id')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Batches written and deleted at a time')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the batches that would be archived')
+
+    def handle(self, *args, **options):
+        company_ids = None
+        if options['company'] is not None:
+            if not Company.objects.filter(pk=options['company']).exists():
+                raise CommandError(f"Company {options['company']} does not exist")
+            company_ids = [options['company']]
+
+        counts = archive(options['days'], company_ids, options['chunk_size'], options['dry_run'])
+        verb = 'would be archived' if options['dry_run'] else 'archived'
+        for company_id, count in counts.items():
+            self.stdout.write(f"company {company_id}: {count} batches {verb}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(counts.values())} batches {verb} under {ARCHIVE_ROOT}"))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.analytics import compute_metrics, load_series, summaries
+from products.benchmarks import (
+    create_company, measure, rollback_after, seed_batches, seed_feed_schedules, seed_health_checks
+)
+from products.models import ChickBatch, ChickStatus
+
+
+class Command(BaseCommand):
+    help = "Benchmark loading and computing FCR, ADG and mortality curves for every active batch of a company"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=10_000, help='Batches to seed')
+        parser.add_argument('--days', type=int, default=60, help='Daily health checks and feeds per batch')
+
+    def handle(self, *args, **options):
+        with rollback_after():
+            company = create_company()
+            batches = seed_batches(company, options['batches'])
+            checks = seed_health_checks(batches, options['days'])
+            feeds = seed_feed_schedules(batches, options['days'])
+
+            active = ChickBatch.objects.filter(company=company, status=ChickStatus.ACTIVE)
+            with measure() as load:
+                series = load_series(active)
+            start = time.perf_counter()
+            metrics = compute_metrics(series)
+            results = summaries(metrics)
+            compute_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f"Seeded {len(batches)} batches, {checks} health checks, {feeds} feed schedules")
+        self.stdout.write(
+            f"Load: {load['queries']} queries / {load['sql_ms']:.0f} ms SQL / {load['total_ms']:.0f} ms total "
+            f"into a {series.weight.shape[0]} x {series.weight.shape[1]} grid"
+        )
+        self.stdout.write(f"Compute: {compute_ms:.0f} ms for {len(results)} active batches")
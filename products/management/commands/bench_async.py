@@ -0,0 +1,111 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from products.benchmarks import seed_farm
+
+# Sync and async variants of each page, as (label, sync URL name, async URL name, kwargs)
+PAGES = (
+    ('dashboard', 'company:dashboard', 'company:dashboard_async', lambda farm: {}),
+    ('batch detail', 'products:batch_detail', 'products:batch_detail_async', lambda farm: {'pk': farm.batch.pk}),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare latency of the sync (WSGI) and async (ASGI) dashboard and batch detail views"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=500, help='Batches to seed')
+        parser.add_argument('--days', type=int, default=60, help='Daily health checks and feeds per batch')
+        parser.add_argument('--inventory', type=int, default=1000, help='Inventory products to seed')
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client and page')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("The benchmark needs a file-backed database shared by all threads")
+
+        # Committed, not rolled back: the async views read on their own connections
+        farm = seed_farm(options['batches'], options['days'], options['inventory'])
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for label, sync_name, async_name, kwargs in PAGES:
+                    for mode, name, run in (('sync', sync_name, self.run_sync), ('async', async_name, self.run_async)):
+                        url = reverse(name, kwargs=kwargs(farm))
+                        cache.clear()
+                        result = run(farm.company.owner, url, options['clients'], options['requests'])
+                        self.report(label, mode, result)
+        finally:
+            company = farm.company
+            company.delete()
+            company.owner.delete()
+            farm.formula.delete()
+            farm.medicine.delete()
+            farm.disease.delete()
+
+    def run_sync(self, user, url, clients, requests):
+        """``clients`` threads, each with a test client going through the WSGI handler"""
+        latencies = []
+        statuses = set()
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            client.force_login(user)
+            client.get(url)  # warm up
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses.add(response.status_code)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {'elapsed': time.perf_counter() - start, 'latencies': latencies, 'statuses': statuses}
+
+    def run_async(self, user, url, clients, requests):
+        """``clients`` coroutines, each with an async client going through the ASGI handler"""
+        latencies = []
+        statuses = set()
+
+        async def worker():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            await client.get(url)  # warm up
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses.add(response.status_code)
+
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        return {'elapsed': time.perf_counter() - start, 'latencies': latencies, 'statuses': statuses}
+
+    def report(self, label, mode, result):
+        latencies = sorted(result['latencies'])
+        p50 = statistics.median(latencies)
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f"{label:<14} {mode:<6} p50 {p50:>8.1f} ms  p99 {p99:>8.1f} ms  "
+            f"{len(latencies) / result['elapsed']:>7.1f} req/s  HTTP {','.join(map(str, sorted(result['statuses'])))}"
+        )
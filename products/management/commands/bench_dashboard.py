@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmarks import create_company, measure, rollback_after, seed_batches, seed_inventory
+from products.stats import compute_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = "Benchmark dashboard statistics and assert a constant query count as batches grow"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, nargs='+', default=[10, 1000, 20000],
+                            help='Batch counts to seed for each run')
+        parser.add_argument('--inventory', type=int, default=200, help='Inventory products to seed')
+
+    def handle(self, *args, **options):
+        results = []
+        for count in options['batches']:
+            with rollback_after():
+                company = create_company()
+                seed_batches(company, count)
+                seed_inventory(company, options['inventory'])
+                with measure() as result:
+                    compute_dashboard_stats(company)
+            results.append((count, result))
+            self.stdout.write(
+                f"{count:>8} batches: {result['queries']} queries, "
+                f"{result['sql_ms']:.1f} ms SQL, {result['total_ms']:.1f} ms total"
+            )
+
+        query_counts = {result['queries'] for _, result in results}
+        if len(query_counts) != 1:
+            raise CommandError(f"Query count varies with batch count: {sorted(query_counts)}")
+        self.stdout.write(self.style.SUCCESS(f"Constant query count: {query_counts.pop()}"))
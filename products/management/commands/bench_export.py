@@ -0,0 +1,44 @@
+import math
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmarks import create_company, rollback_after, seed_batches, seed_health_checks
+from products.exports import CONTENT_TYPES, CSV, stream_export
+
+
+class Command(BaseCommand):
+    help = "Benchmark streaming health check export and assert memory stays bounded as rows grow"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Health check rows in the large run')
+        parser.add_argument('--days', type=int, default=60, help='Health checks per batch')
+        parser.add_argument('--format', choices=sorted(CONTENT_TYPES), default=CSV)
+        parser.add_argument('--max-growth', type=float, default=2.0,
+                            help='Allowed ratio of peak memory between the large and the small run')
+
+    def handle(self, *args, **options):
+        peaks = []
+        for rows in (max(options['rows'] // 10, options['days']), options['rows']):
+            with rollback_after():
+                company = create_company()
+                batches = seed_batches(company, math.ceil(rows / options['days']))
+                seeded = seed_health_checks(batches, options['days'])
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                size = sum(len(chunk) for chunk in stream_export('health_checks', company, options['format']))
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            peaks.append(peak)
+            self.stdout.write(
+                f"{seeded:>9} rows: {size / 1e6:.1f} MB {options['format']} in {elapsed:.1f} s, "
+                f"peak Python memory {peak / 1e6:.2f} MB"
+            )
+
+        if peaks[1] > peaks[0] * options['max_growth']:
+            raise CommandError(f"Export memory grew with row count: {peaks[0]} -> {peaks[1]} bytes")
+        self.stdout.write(self.style.SUCCESS("Export memory stayed bounded"))
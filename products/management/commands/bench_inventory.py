@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from products.benchmarks import create_company, measure, rollback_after, seed_inventory
+from products.stats import get_inventory_summary
+
+
+class Command(BaseCommand):
+    help = "Benchmark the inventory summary (cold aggregate and cached read) across SKU counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skus', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                            help='SKU counts to seed for each run')
+        parser.add_argument('--repeat', type=int, default=50, help='Cached reads to average')
+
+    def handle(self, *args, **options):
+        for count in options['skus']:
+            with rollback_after():
+                company = create_company()
+                seed_inventory(company, count)
+                cache.clear()
+                with measure() as cold:
+                    get_inventory_summary(company)
+                with measure() as warm:
+                    for _ in range(options['repeat']):
+                        get_inventory_summary(company)
+            self.stdout.write(
+                f"{count:>8} SKUs: cold {cold['queries']} queries / {cold['total_ms']:.2f} ms, "
+                f"cached {warm['queries']} queries / {warm['total_ms'] / options['repeat']:.3f} ms"
+            )
@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmarks import rollback_after, seed_farm
+from products.view_benchmarks import (
+    DEFAULT_LATENCY_BUDGET_MS, load_baseline, run_benchmarks, write_baseline
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark query count, SQL time, latency and size of every company and products view"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=200, help='Batches to seed')
+        parser.add_argument('--days', type=int, default=30, help='Daily health checks and feeds per batch')
+        parser.add_argument('--inventory', type=int, default=500, help='Inventory products to seed')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data generator')
+        parser.add_argument('--repeat', type=int, default=3, help='Measured requests per view')
+        parser.add_argument('--latency-budget', type=float, default=DEFAULT_LATENCY_BUDGET_MS,
+                            help='Median milliseconds allowed per view')
+        parser.add_argument('--output', default='view_benchmarks.json', help='Write results to this JSON file')
+        parser.add_argument('--baseline', help='Also fail when a view needs more queries than in this file')
+
+    def handle(self, *args, **options):
+        baseline = load_baseline(options['baseline']) if options['baseline'] else None
+        with rollback_after():
+            farm = seed_farm(options['batches'], options['days'], options['inventory'], options['seed'])
+            cache.clear()
+            results, problems = run_benchmarks(
+                farm, options['repeat'], options['latency_budget'], baseline,
+            )
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<45} {result['status']} {result['queries']:>3} queries "
+                f"{result['sql_ms']:>8.1f} ms SQL {result['total_ms']:>8.1f} ms total {result['bytes']:>9} B"
+            )
+        write_baseline(
+            options['output'], results,
+            batches=options['batches'], days=options['days'], inventory=options['inventory'], seed=options['seed'],
+        )
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if problems:
+            raise CommandError("Budget exceeded:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS(f"All {len(results)} views within budget"))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from company.models import Company
+from products.models import InventoryProduct
+from products.stock import compact, drifted
+
+
+class Command(BaseCommand):
+    help = "Fold old stock movements into per-product snapshots and report products whose stock drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Keep movements newer than this many days')
+        parser.add_argument('--company', type=int, help='Only compact this company id')
+
+    def handle(self, *args, **options):
+        company_ids = None
+        if options['company'] is not None:
+            if not Company.objects.filter(pk=options['company']).exists():
+                raise CommandError(f"Company {options['company']} does not exist")
+            company_ids = [options['company']]
+
+        before = timezone.now() - timedelta(days=options['days'])
+        snapshots, deleted = compact(before, company_ids)
+        self.stdout.write(f"{snapshots} snapshots written, {deleted} movements folded")
+
+        products = InventoryProduct.objects.all()
+        if company_ids is not None:
+            products = products.filter(company_id__in=company_ids)
+        for product in drifted(products).order_by('pk')[:20]:
+            self.stdout.write(self.style.WARNING(
+                f"{product.sku}: stock_on_hand {product.stock_on_hand}, ledger {product.ledger_stock}"
+            ))
+        self.stdout.write(self.style.SUCCESS("Stock ledger compacted"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.outbreaks import evaluate
+
+
+class Command(BaseCommand):
+    help = "Detect disease outbreaks across batches, opening new ones and resolving cleared ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only detect outbreaks for this company id')
+
+    def handle(self, *args, **options):
+        company_ids = None
+        if options['company'] is not None:
+            if not Company.objects.filter(pk=options['company']).exists():
+                raise CommandError(f"Company {options['company']} does not exist")
+            company_ids = [options['company']]
+
+        opened, resolved = evaluate(company_ids)
+        self.stdout.write(f"{opened} opened, {resolved} resolved")
+        self.stdout.write(self.style.SUCCESS("Outbreak detection complete"))
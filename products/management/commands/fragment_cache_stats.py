@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products.fragments import HITS, MISSES, reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Report fragment cache hits and misses by section. Counters live in the "
+        "default cache, so a per-process backend (locmem) only shows this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting')
+
+    def handle(self, *args, **options):
+        for section, counts in stats().items():
+            total = counts[HITS] + counts[MISSES]
+            ratio = f"{counts[HITS] / total:.1%}" if total else "-"
+            self.stdout.write(f"{section:<16} {counts[HITS]:>8} hits {counts[MISSES]:>8} misses  hit ratio {ratio}")
+        if options['reset']:
+            reset_stats()
+            self.stdout.write("Counters reset")
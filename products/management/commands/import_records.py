@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.importers import (
+    DEFAULT_CHUNK_SIZE, IMPORTERS, ImportFormatError, detect_format, import_file, open_text
+)
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSON file of health checks or feed schedules into a company's batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='CSV, JSON array or JSON Lines file')
+        parser.add_argument('--company', type=int, required=True, help='Company id owning the batches')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows validated and written per transaction')
+        parser.add_argument('--max-errors', type=int, default=100, help='Row errors to print')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Company {options['company']} does not exist")
+
+        try:
+            fmt = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as handle:
+                result = import_file(
+                    options['kind'], open_text(handle), fmt, company,
+                    chunk_size=options['chunk_size'], max_errors=options['max_errors'],
+                )
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        for row_number, message in result.errors:
+            self.stderr.write(f"row {row_number}: {message}")
+        if result.fatal_error:
+            self.stderr.write(self.style.ERROR(f"Stopped early: {result.fatal_error}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.rows} rows read: {result.created} created, {result.updated} updated, "
+            f"{result.error_count} rejected"
+        ))
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmarks import rollback_after, seed_farm
+from products.index_advisor import SCAN, advise
+
+
+class Command(BaseCommand):
+    help = "Explain the queries of every company and products view against seeded data and report full scans and sorts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=200, help='Batches to seed')
+        parser.add_argument('--days', type=int, default=30, help='Daily health checks and feeds per batch')
+        parser.add_argument('--inventory', type=int, default=500, help='Inventory products to seed')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data generator')
+        parser.add_argument('--all-tables', action='store_true', help='Also report scans of small catalog tables')
+        parser.add_argument('--sql', action='store_true', help='Print each scanning query')
+        parser.add_argument('--strict', action='store_true', help='Fail when any view scans a table')
+
+    def handle(self, *args, **options):
+        with rollback_after():
+            farm = seed_farm(options['batches'], options['days'], options['inventory'], options['seed'])
+            cache.clear()
+            report = advise(farm, options['all_tables'])
+
+        totals = Counter()
+        for name, found in report.items():
+            self.stdout.write(self.style.WARNING(name))
+            for kind, table, sql in found:
+                totals[kind, table] += 1
+                self.stdout.write(f"  {kind} of {table}")
+                if options['sql']:
+                    self.stdout.write(f"    {sql}")
+        for (kind, table), count in totals.most_common():
+            self.stdout.write(f"{kind} of {table}: {count} queries")
+
+        scanning = [name for name, found in report.items() if any(kind == SCAN for kind, _, _ in found)]
+        if scanning and options['strict']:
+            raise CommandError(f"{len(scanning)} views scan whole tables")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(scanning)} views with full scans, {len(report) - len(scanning)} more with sorts only"
+        ))
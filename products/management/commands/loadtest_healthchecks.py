@@ -0,0 +1,131 @@
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+
+from products.benchmarks import create_company
+from products.models import BreederType, ChickBatch, HealthCheck
+
+# Connection overrides per backend. "baseline" approximates the untuned
+# defaults (a new connection per request, rollback journal); the other modes
+# are the production profiles from settings.
+MODES = {
+    'sqlite': {
+        'baseline': {
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL', 'timeout': 5},
+        },
+        'tuned': {},
+    },
+    'postgresql': {
+        'baseline': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+        'persistent': {'CONN_MAX_AGE': 600, 'OPTIONS': {}},
+        'pool': {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {'min_size': 2, 'max_size': 20}}},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Load test concurrent health check submissions and compare write throughput across connection modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--submissions', type=int, default=200, help='Health checks submitted per writer')
+        parser.add_argument('--modes', nargs='+', help='Modes to compare (default: all for the current backend)')
+
+    def handle(self, *args, **options):
+        modes = MODES.get(connection.vendor)
+        if modes is None:
+            raise CommandError(f"No load test modes for the {connection.vendor} backend")
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("The load test needs a file-backed SQLite database shared by all threads")
+        selected = options['modes'] or list(modes)
+        unknown = set(selected) - set(modes)
+        if unknown:
+            raise CommandError(f"Unknown modes for {connection.vendor}: {', '.join(sorted(unknown))}")
+
+        original = connections.settings['default']
+        company = create_company()
+        try:
+            for mode in selected:
+                self.use_settings(self.mode_settings(original, modes[mode]))
+                try:
+                    result = self.run_mode(company, mode, options['threads'], options['submissions'])
+                finally:
+                    close_pool = getattr(connections['default'], 'close_pool', None)
+                    if close_pool:
+                        close_pool()
+                    self.use_settings(original)
+                self.report(mode, result)
+        finally:
+            # Cascades to every batch and health check the run created
+            company.delete()
+            company.owner.delete()
+
+    def use_settings(self, settings_dict):
+        """Swap the default alias' settings; connections opened from now on use them"""
+        connections['default'].close()
+        connections.settings['default'] = settings_dict
+        # Drop this thread's wrapper, which keeps the settings it was built with
+        del connections['default']
+
+    def mode_settings(self, original, overrides):
+        # OPTIONS in an override replace the configured ones entirely
+        return {**original, **overrides}
+
+    def run_mode(self, company, mode, threads, submissions):
+        batches = ChickBatch.objects.bulk_create([
+            ChickBatch(
+                company=company, breeder_type=BreederType.BROILER, initial_count=1000, current_count=1000,
+                hatch_date=company.created_at.date() - timedelta(days=submissions), notes=f'loadtest {mode}',
+            )
+            for _ in range(threads)
+        ])
+        # An open connection here would block journal mode changes in the writers
+        connections['default'].close()
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer(batch):
+            for day in range(submissions):
+                start = time.perf_counter()
+                try:
+                    HealthCheck.objects.create(
+                        batch=batch, check_date=batch.hatch_date + timedelta(days=day),
+                        mortality_count=day % 3, average_weight_g=40 + day * 50,
+                    )
+                except OperationalError as e:
+                    with lock:
+                        errors.append(str(e))
+                else:
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                finally:
+                    # End of "request": honours CONN_MAX_AGE like the request_finished signal
+                    close_old_connections()
+            connections.close_all()
+
+        workers = [threading.Thread(target=writer, args=(batch,)) for batch in batches]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        return {'elapsed': elapsed, 'latencies': latencies, 'errors': errors}
+
+    def report(self, mode, result):
+        latencies = sorted(result['latencies'])
+        written = len(latencies)
+        p50 = statistics.median(latencies) if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+        self.stdout.write(
+            f"{mode:<12} {written:>6} writes in {result['elapsed']:.2f} s = {written / result['elapsed']:>8.1f}/s, "
+            f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, {len(result['errors'])} errors"
+        )
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(f"  first error: {result['errors'][0]}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.rollups import rebuild_company_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild BatchRollup rows in bulk from health, feed, treatment and disease records"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only rebuild batches of this company id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Batches recomputed per chunk')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company'] is not None:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Company {options['company']} does not exist")
+
+        written = rebuild_company_rollups(company, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} batch rollups"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from products.models import SearchKind
+from products.search import optimize, rebuild
+
+
+class Command(BaseCommand):
+    help = "Recreate the search documents from batches, diseases, medicines and inventory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=SearchKind.values,
+                            help='Only rebuild this kind (repeatable; default: all)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read and upserted at a time')
+
+    def handle(self, *args, **options):
+        counts = rebuild(options['kind'], options['chunk_size'])
+        optimize()
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count} documents")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
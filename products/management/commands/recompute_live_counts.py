@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from company.models import Company
+from products.models import ChickBatch
+from products.mortality import expected_counts, set_counts
+
+
+class Command(BaseCommand):
+    help = "Reset each batch's current_count to its initial count less the deaths its health checks record"
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, help='Company id')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the batches that disagree')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(pk=options['company']).first()
+        if company is None:
+            raise CommandError(f"Company {options['company']} does not exist")
+
+        with transaction.atomic():
+            # Deaths of every batch come from one grouped query
+            stale = expected_counts(ChickBatch.objects.filter(company=company))
+            for batch, expected in stale:
+                self.stdout.write(self.style.WARNING(
+                    f"Batch #{batch.pk}: current_count {batch.current_count}, health checks {expected}"
+                ))
+            if not options['dry_run']:
+                set_counts(stale)
+        verb = 'disagree with their health checks' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"{len(stale)} batches {verb}"))
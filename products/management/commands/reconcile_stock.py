@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.models import InventoryProduct
+from products.stock import drifted, reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute each product's expected stock from the ledger and report (or fix) the ones that disagree"
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, help='Company id')
+        parser.add_argument('--fix', action='store_true', help='Set stock_on_hand to the ledger balance')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(pk=options['company']).first()
+        if company is None:
+            raise CommandError(f"Company {options['company']} does not exist")
+
+        # Expected stock of every product comes from one grouped query
+        products = list(drifted(InventoryProduct.objects.filter(company=company)).order_by('sku'))
+        for product in products:
+            self.stdout.write(self.style.WARNING(
+                f"{product.sku}: stock_on_hand {product.stock_on_hand}, "
+                f"ledger {product.ledger_stock} ({product.stock_on_hand - product.ledger_stock:+})"
+            ))
+
+        if options['fix']:
+            fixed = len(reconcile(InventoryProduct.objects.filter(company=company)).get(company.pk, []))
+            self.stdout.write(f"{fixed} products fixed, {len(products) - fixed} left (negative ledger)")
+        self.stdout.write(self.style.SUCCESS(f"{len(products)} products disagree with the ledger"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.archive import restore
+from products.models import ArchivedBatch
+
+
+class Command(BaseCommand):
+    help = "Bring archived batches and their records back into the live tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('batch_ids', nargs='*', type=int, help='Archived batch ids')
+        parser.add_argument('--company', type=int, help='Restore every archived batch of this company id')
+
+    def handle(self, *args, **options):
+        batch_ids = set(options['batch_ids'])
+        if options['company'] is not None:
+            batch_ids.update(
+                ArchivedBatch.objects.filter(company_id=options['company']).values_list('batch_id', flat=True)
+            )
+        if not batch_ids:
+            raise CommandError("Give batch ids or --company")
+
+        try:
+            restored = restore(sorted(batch_ids))
+        except OSError as exc:
+            raise CommandError(f"Cannot read archive: {exc}")
+        missing = batch_ids - set(restored)
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Not archived: {', '.join(str(pk) for pk in sorted(missing))}"))
+        self.stdout.write(self.style.SUCCESS(f"{len(restored)} batches restored"))
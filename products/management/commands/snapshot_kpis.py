@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from products.snapshots import take
+
+
+class Command(BaseCommand):
+    help = "Write the daily KPI snapshot of every company (today, or a backfilled range of days)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Last day to snapshot (default: today)')
+        parser.add_argument('--backfill', type=int, default=0, metavar='DAYS',
+                            help='Also rebuild this many days before --date')
+
+    def handle(self, *args, **options):
+        until = options['date'] or timezone.localdate()
+        if until > timezone.localdate():
+            raise CommandError("Cannot snapshot a future day")
+        if options['backfill'] < 0:
+            raise CommandError("--backfill must not be negative")
+        since = until - timedelta(days=options['backfill'])
+
+        written = take(since, until)
+        self.stdout.write(self.style.SUCCESS(f"{written} snapshots written for {since} to {until}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from company.models import Company
+from products.alerts import sweep
+
+
+class Command(BaseCommand):
+    help = "Evaluate every alert rule, opening new alerts and resolving cleared ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only evaluate rules for this company id')
+
+    def handle(self, *args, **options):
+        company_ids = None
+        if options['company'] is not None:
+            if not Company.objects.filter(pk=options['company']).exists():
+                raise CommandError(f"Company {options['company']} does not exist")
+            company_ids = [options['company']]
+
+        for code, (opened, resolved) in sweep(company_ids).items():
+            self.stdout.write(f"{code}: {opened} opened, {resolved} resolved")
+        self.stdout.write(self.style.SUCCESS("Alert sweep complete"))
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_diseasecatalog_morality_rate_and_more'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='diseasecatalog',
+            old_name='morality_rate',
+            new_name='mortality_rate',
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    """A rollup row for every existing batch, one grouped query per section"""
+    ChickBatch = apps.get_model('products', 'ChickBatch')
+    BatchRollup = apps.get_model('products', 'BatchRollup')
+    HealthCheck = apps.get_model('products', 'HealthCheck')
+    rollups = {pk: BatchRollup(batch_id=pk) for pk in ChickBatch.objects.values_list('pk', flat=True)}
+
+    latest = HealthCheck.objects.filter(batch=models.OuterRef('batch')).order_by('-check_date')
+    checks = HealthCheck.objects.values('batch').annotate(
+        cumulative_mortality=models.Sum('mortality_count'),
+        cumulative_diseased=models.Sum('diseased_count'),
+        latest_check_date=models.Max('check_date'),
+        latest_check_id=models.Subquery(latest.values('pk')[:1]),
+    )
+    feed = apps.get_model('products', 'FeedSchedule').objects.values('batch') \
+        .annotate(total_feed_kg=models.Sum('quantity_kg'))
+    treatments = apps.get_model('products', 'TreatmentRecord').objects.values('batch') \
+        .annotate(last_treatment_date=models.Max('date_administered'))
+    cases = apps.get_model('products', 'DiseaseCase').objects.filter(status='ACTIVE').values('batch') \
+        .annotate(active_disease_cases=models.Count('id'))
+    for rows in [checks, feed, treatments, cases]:
+        for row in rows:
+            rollup = rollups[row.pop('batch')]
+            for name, value in row.items():
+                setattr(rollup, name, value)
+    BatchRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_rename_morality_rate_diseasecatalog_mortality_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchRollup',
+            fields=[
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='products.chickbatch')),
+                ('latest_check_date', models.DateField(blank=True, null=True)),
+                ('cumulative_mortality', models.PositiveIntegerField(default=0)),
+                ('cumulative_diseased', models.PositiveIntegerField(default=0)),
+                ('total_feed_kg', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_treatment_date', models.DateField(blank=True, null=True)),
+                ('active_disease_cases', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('latest_check', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.healthcheck')),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
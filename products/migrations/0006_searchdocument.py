@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FTS_TABLE = 'products_searchdocument_fts'
+
+SQLITE_CREATE = [
+    # External content: the FTS index reads title/body from the documents table
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body,
+        content='products_searchdocument', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER products_searchdocument_ai AFTER INSERT ON products_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER products_searchdocument_ad AFTER DELETE ON products_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER products_searchdocument_au AFTER UPDATE OF title, body ON products_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS products_searchdocument_au',
+    'DROP TRIGGER IF EXISTS products_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS products_searchdocument_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# Must match products.search.PG_VECTOR for the index to be used
+POSTGRESQL_CREATE = [
+    """CREATE INDEX products_searchdocument_tsv ON products_searchdocument USING GIN ((
+        setweight(to_tsvector('english'::regconfig, title), 'A') ||
+        setweight(to_tsvector('english'::regconfig, body), 'B')
+    ))""",
+]
+POSTGRESQL_DROP = ['DROP INDEX IF EXISTS products_searchdocument_tsv']
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0005_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('batch', 'Batch'), ('disease', 'Disease'), ('medicine', 'Medicine'), ('inventory', 'Inventory')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, help_text='Empty for shared catalog entries (diseases, medicines)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='company.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'kind'], name='products_se_company_ebf7cf_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            run_for_vendor({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
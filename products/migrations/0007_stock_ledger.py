@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def baseline_snapshots(apps, schema_editor):
+    """Existing stock becomes each product's opening ledger balance"""
+    InventoryProduct = apps.get_model('products', 'InventoryProduct')
+    StockSnapshot = apps.get_model('products', 'StockSnapshot')
+    StockSnapshot.objects.bulk_create(
+        (
+            StockSnapshot(product_id=pk, quantity=stock, last_movement_id=0)
+            for pk, stock in InventoryProduct.objects.values_list('pk', 'stock_on_hand').iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0006_searchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='products.inventoryproduct')),
+                ('quantity', models.IntegerField(default=0)),
+                ('last_movement_id', models.PositiveBigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('RECEIPT', 'Receipt'), ('ISSUE', 'Issue'), ('ADJUSTMENT', 'Adjustment'), ('CONSUMPTION', 'Consumption')], max_length=16)),
+                ('quantity', models.IntegerField(help_text='Signed change: positive adds stock, negative removes it')),
+                ('reference', models.CharField(blank=True, help_text='Delivery note, invoice or count sheet', max_length=80)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('feed_schedule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='products.feedschedule')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='products.inventoryproduct')),
+                ('treatment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='products.treatmentrecord')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='products_st_product_f44222_idx'), models.Index(fields=['company', 'created_at'], name='products_st_company_8433ac_idx')],
+            },
+        ),
+        migrations.RunPython(baseline_snapshots, migrations.RunPython.noop),
+    ]
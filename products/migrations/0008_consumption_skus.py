@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedformula',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Inventory SKU the feed is drawn from, stocked in kg', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='medicineproduct',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Inventory SKU the medicine is drawn from', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='treatmentrecord',
+            name='quantity_used',
+            field=models.PositiveIntegerField(default=0, help_text="Units drawn from the medicine's inventory SKU"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0008_consumption_skus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('batch_id', models.PositiveBigIntegerField(help_text='Primary key the batch had, and gets back on restore', unique=True)),
+                ('breeder_type', models.CharField(choices=[('BROILER', 'Broiler'), ('LAYER', 'Layer'), ('GOLDEN', 'Golden')], max_length=16)),
+                ('hatch_date', models.DateField()),
+                ('closed_on', models.DateField(help_text='Last change to the batch before it was archived')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('SOLD', 'Sold'), ('DECEASED', 'Deceased'), ('CULLED', 'Culled')], max_length=16)),
+                ('farm_location', models.CharField(blank=True, max_length=120)),
+                ('initial_count', models.PositiveIntegerField()),
+                ('final_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_mortality', models.PositiveIntegerField(default=0)),
+                ('total_feed_kg', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('treatments', models.PositiveIntegerField(default=0)),
+                ('disease_cases', models.PositiveIntegerField(default=0)),
+                ('archive_file', models.CharField(help_text='Path under ARCHIVE_ROOT', max_length=255)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived Batches',
+                'ordering': ['-closed_on'],
+                'indexes': [models.Index(fields=['company', 'closed_on'], name='products_ar_company_e7edbd_idx')],
+            },
+        ),
+    ]
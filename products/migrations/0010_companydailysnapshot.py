@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0009_archivedbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyDailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('active_batches', models.PositiveIntegerField(default=0)),
+                ('live_birds', models.IntegerField(default=0)),
+                ('mortality_rate', models.FloatField(blank=True, help_text="Percent of the active batches' birds lost", null=True)),
+                ('deaths', models.PositiveIntegerField(default=0, help_text='Deaths recorded that day')),
+                ('diseased', models.PositiveIntegerField(default=0, help_text='Diseased birds recorded that day')),
+                ('feed_kg', models.DecimalField(decimal_places=2, default=0, help_text='Feed given that day', max_digits=12)),
+                ('active_disease_cases', models.PositiveIntegerField(default=0)),
+                ('inventory_value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('low_stock_items', models.PositiveIntegerField(blank=True, help_text='Only known for days taken live', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_snapshots', to='company.company')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'date'), name='unique_company_daily_snapshot')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_companydailysnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='diseasecase',
+            name='date_detected',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='feedschedule',
+            name='date',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='healthcheck',
+            name='check_date',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='treatmentrecord',
+            name='date_administered',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
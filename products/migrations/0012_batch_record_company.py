@@ -0,0 +1,84 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_RECORDS = ['HealthCheck', 'FeedSchedule', 'TreatmentRecord', 'DiseaseCase']
+
+
+def copy_batch_company(apps, schema_editor):
+    """Every record takes its batch's company; one UPDATE per table"""
+    ChickBatch = apps.get_model('products', 'ChickBatch')
+    company = ChickBatch.objects.filter(pk=models.OuterRef('batch_id')).values('company_id')[:1]
+    for name in BATCH_RECORDS:
+        apps.get_model('products', name).objects.update(company_id=models.Subquery(company))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0011_admin_date_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diseasecase',
+            name='products_di_status_905ff8_idx',
+        ),
+        migrations.AddField(
+            model_name='diseasecase',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company'),
+        ),
+        migrations.AddField(
+            model_name='feedschedule',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company'),
+        ),
+        migrations.AddField(
+            model_name='healthcheck',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company'),
+        ),
+        migrations.AddField(
+            model_name='treatmentrecord',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company'),
+        ),
+        migrations.RunPython(copy_batch_company, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='diseasecase',
+            index=models.Index(fields=['batch', 'date_detected'], name='products_di_batch_i_88bbe9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diseasecase',
+            index=models.Index(fields=['company', 'date_detected'], name='products_di_company_7603bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diseasecase',
+            index=models.Index(fields=['company', 'status', 'date_detected'], name='products_di_company_216f77_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedschedule',
+            index=models.Index(fields=['batch', 'date'], name='products_fe_batch_i_2533bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedschedule',
+            index=models.Index(fields=['company', 'date'], name='products_fe_company_b728ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthcheck',
+            index=models.Index(fields=['company', 'check_date'], name='products_he_company_6536e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatmentrecord',
+            index=models.Index(fields=['batch', 'date_administered'], name='products_tr_batch_i_9dbf3d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatmentrecord',
+            index=models.Index(fields=['company', 'date_administered'], name='products_tr_company_9a31bc_idx'),
+        ),
+    ]
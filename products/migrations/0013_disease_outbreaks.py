@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0012_batch_record_company'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiseaseOutbreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('farm_location', models.CharField(blank=True, max_length=120)),
+                ('detected_on', models.DateField(help_text='Last day of the first window that reached the threshold')),
+                ('last_case_on', models.DateField()),
+                ('cases', models.PositiveIntegerField(default=0, help_text='Cases in the latest window')),
+                ('batches', models.PositiveIntegerField(default=0, help_text='Batches with cases in the latest window')),
+                ('affected', models.PositiveIntegerField(default=0, help_text='Birds affected in the latest window')),
+                ('score', models.FloatField(default=0, help_text='Cases in the latest window weighted by severity and mortality rate')),
+                ('peak_score', models.FloatField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='company.company')),
+                ('disease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbreaks', to='products.diseasecatalog')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['company', '-score'], name='active_outbreak_score')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('company', 'disease', 'farm_location'), name='unique_active_outbreak')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:49
+
+from django.db import migrations, models
+
+
+def date_closures(apps, schema_editor):
+    """Until now a closed batch's last change dated its closing"""
+    ChickBatch = apps.get_model('products', 'ChickBatch')
+    ChickBatch.objects.exclude(status='ACTIVE').update(closed_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0001_initial'),
+        ('products', '0013_disease_outbreaks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chickbatch',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the batch was sold, culled or died off', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='chickbatch',
+            index=models.Index(fields=['status', 'closed_at'], name='products_ch_status_32e816_idx'),
+        ),
+        migrations.RunPython(date_closures, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, NullIf, Round
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -34,6 +35,33 @@ class InventoryCategory(models.TextChoices):
     EQUIPMENT = "EQUIPMENT", "Equipment"
     OTHER = "OTHER", "Other"
 
+class AlertPriority(models.TextChoices):
+    HIGH = "high", "High"
+    MEDIUM = "medium", "Medium"
+    LOW = "low", "Low"
+
+class AlertStatus(models.TextChoices):
+    OPEN = "OPEN", "Open"
+    RESOLVED = "RESOLVED", "Resolved"
+
+class MovementKind(models.TextChoices):
+    RECEIPT = "RECEIPT", "Receipt"
+    ISSUE = "ISSUE", "Issue"
+    ADJUSTMENT = "ADJUSTMENT", "Adjustment"
+    CONSUMPTION = "CONSUMPTION", "Consumption"
+
+class SearchKind(models.TextChoices):
+    BATCH = "batch", "Batch"
+    DISEASE = "disease", "Disease"
+    MEDICINE = "medicine", "Medicine"
+    INVENTORY = "inventory", "Inventory"
+
+class HealthStatus(models.TextChoices):
+    EXCELLENT = "EXCELLENT", "Excellent"
+    GOOD = "GOOD", "Good"
+    FAIR = "FAIR", "Fair"
+    POOR = "POOR", "Poor"
+
 # ---------------------------------------------------------------------------
 # Abstract Base Models
 # ---------------------------------------------------------------------------
@@ -53,9 +81,77 @@ class CompanyScopedModel(TimeStampedModel):
     class Meta:
         abstract = True
 
+class BatchRecordModel(CompanyScopedModel):
+    """
+    Abstract base for the records of a batch. ``company`` repeats the batch's
+    company, so records are filtered and indexed per company without joining
+    the batch; save() copies it from the batch. Bulk writes set it themselves.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # The batch is cached when it was just assigned, so this costs no query
+        if self.batch_id is not None and (self.company_id is None or type(self).batch.is_cached(self)):
+            self.company_id = self.batch.company_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'batch', 'batch_id'} & set(update_fields):
+                kwargs['update_fields'] = [*update_fields, 'company']
+        super().save(*args, **kwargs)
+
+class ConsumingRecordModel(BatchRecordModel):
+    """
+    Abstract base for the records that draw stock (products.consumption).
+    The consumption is recorded by a post_save handler; save() runs in one
+    transaction with it, so a StockError leaves no row behind. clean()
+    checks the stock beforehand for forms.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def clean(self):
+        super().clean()
+        # products.consumption imports this module
+        from products.consumption import check_stock
+        check_stock(self)
+
 # ---------------------------------------------------------------------------
 # Chick Batch (manages group of chicks)
 # ---------------------------------------------------------------------------
+class ChickBatchQuerySet(models.QuerySet):
+    def with_list_metrics(self, today=None):
+        """
+        Annotate age, survival rate and latest health status in SQL so list
+        pages need no per-row queries. Health status is graded on the share of
+        live birds found diseased or dead at the latest check (via BatchRollup).
+        """
+        today = today or timezone.now().date()
+        live = Coalesce(models.F('current_count'), models.F('initial_count'))
+        latest_losses = (
+            models.F('rollup__latest_check__diseased_count') + models.F('rollup__latest_check__mortality_count')
+        ) * 100.0 / NullIf(live, 0)
+        return self.alias(latest_loss_pct=latest_losses).annotate(
+            age_interval=models.ExpressionWrapper(
+                models.Value(today, output_field=models.DateField()) - models.F('hatch_date'),
+                output_field=models.DurationField(),
+            ),
+            survival_rate=Round(live * 100.0 / models.F('initial_count'), 1, output_field=models.FloatField()),
+            health_status=models.Case(
+                models.When(rollup__latest_check__isnull=True, then=models.Value(None)),
+                models.When(latest_loss_pct__lt=1, then=models.Value(HealthStatus.EXCELLENT)),
+                models.When(latest_loss_pct__lt=3, then=models.Value(HealthStatus.GOOD)),
+                models.When(latest_loss_pct__lt=7, then=models.Value(HealthStatus.FAIR)),
+                default=models.Value(HealthStatus.POOR),
+                output_field=models.CharField(),
+            ),
+        )
+
 class ChickBatch(CompanyScopedModel):
     breeder_type = models.CharField(max_length=16, choices=BreederType.choices)
     hatch_date = models.DateField()
@@ -64,14 +160,35 @@ class ChickBatch(CompanyScopedModel):
     farm_location = models.CharField(max_length=120, blank=True)
     source = models.CharField(max_length=120, blank=True, help_text="Supplier or hatchery")
     status = models.CharField(max_length=16, choices=ChickStatus.choices, default=ChickStatus.ACTIVE)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False, help_text="When the batch was sold, culled or died off")
     notes = models.TextField(blank=True, max_length=1000)
 
+    objects = ChickBatchQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Closing is dated here, not by updated_at, which live-count updates move
+        closed = self.status != ChickStatus.ACTIVE
+        if closed != (self.closed_at is not None):
+            self.closed_at = timezone.now() if closed else None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'status' in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'closed_at']
+        super().save(*args, **kwargs)
+
     @property
     def age_days(self):
+        # Use the SQL-computed age when the row came from with_list_metrics()
+        if 'age_interval' in self.__dict__:
+            return self.age_interval.days
         return (timezone.now().date() - self.hatch_date).days
 
     @property
     def current_health(self):
+        # Prefer the precomputed rollup when it was loaded with select_related
+        if ChickBatch.rollup.is_cached(self):
+            rollup = ChickBatch.rollup.related.get_cached_value(self)
+            if rollup is not None:
+                return rollup.latest_check
         latest = self.health_checks.order_by('-check_date').first()
         return latest if latest else None
 
@@ -90,26 +207,43 @@ class ChickBatch(CompanyScopedModel):
             models.Index(fields=['company', 'breeder_type']),
             models.Index(fields=['company', 'hatch_date']),
             models.Index(fields=['company', 'status']),
+            models.Index(fields=['status', 'closed_at']),
         ]
         verbose_name_plural = "Chick Batches"
 
 # ---------------------------------------------------------------------------
 # Health Check Log per Batch
 # ---------------------------------------------------------------------------
-class HealthCheck(TimeStampedModel):
+class HealthCheck(BatchRecordModel):
     batch = models.ForeignKey(ChickBatch, on_delete=models.CASCADE, related_name='health_checks')
-    check_date = models.DateField(default=timezone.now)
+    check_date = models.DateField(default=timezone.now, db_index=True)
     diseased_count = models.PositiveIntegerField(default=0)
     mortality_count = models.PositiveIntegerField(default=0)
     average_weight_g = models.DecimalField(max_digits=7, decimal_places=2, validators=[MinValueValidator(0)])
     notes = models.TextField(blank=True, max_length=1000)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # As stored, so a save moves the batch's live count by the difference (products.mortality)
+        instance._recorded_deaths = (instance.__dict__.get('batch_id'), instance.__dict__.get('mortality_count'))
+        return instance
+
+    def clean(self):
+        super().clean()
+        # products.mortality imports this module
+        from products.mortality import check_deaths
+        check_deaths(self)
+
     def __str__(self):
         return f"HealthCheck {self.batch_id} {self.check_date}"
 
     class Meta:
         unique_together = ('batch', 'check_date')
         ordering = ['-check_date']
+        indexes = [
+            models.Index(fields=['company', 'check_date']),
+        ]
 
 # ---------------------------------------------------------------------------
 # Feed Related
@@ -118,14 +252,15 @@ class FeedFormula(TimeStampedModel):
     name = models.CharField(max_length=120, unique=True)
     breeder_type = models.CharField(max_length=16, choices=BreederType.choices)
     description = models.TextField(blank=True, max_length=1000)
+    sku = models.CharField(max_length=40, blank=True, help_text="Inventory SKU the feed is drawn from, stocked in kg")
 
     def __str__(self):
         return self.name
 
-class FeedSchedule(TimeStampedModel):
+class FeedSchedule(ConsumingRecordModel):
     batch = models.ForeignKey(ChickBatch, on_delete=models.CASCADE, related_name='feed_schedules')
     formula = models.ForeignKey(FeedFormula, on_delete=models.PROTECT, related_name='scheduled_feeds')
-    date = models.DateField(default=timezone.now)
+    date = models.DateField(default=timezone.now, db_index=True)
     quantity_kg = models.DecimalField(max_digits=8, decimal_places=2, validators=[MinValueValidator(0)])
 
     def __str__(self):
@@ -133,6 +268,10 @@ class FeedSchedule(TimeStampedModel):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['batch', 'date']),
+            models.Index(fields=['company', 'date']),
+        ]
 
 # ---------------------------------------------------------------------------
 # Medicine & Treatments
@@ -141,24 +280,30 @@ class MedicineProduct(TimeStampedModel):
     name = models.CharField(max_length=120, unique=True)
     breeder_type = models.CharField(max_length=16, choices=BreederType.choices, blank=True)
     description = models.TextField(blank=True, max_length=1000)
+    sku = models.CharField(max_length=40, blank=True, help_text="Inventory SKU the medicine is drawn from")
 
     def __str__(self):
         return self.name
 
-class TreatmentRecord(TimeStampedModel):
+class TreatmentRecord(ConsumingRecordModel):
     batch = models.ForeignKey(ChickBatch, on_delete=models.CASCADE, related_name='treatments')
     medicine = models.ForeignKey(MedicineProduct, on_delete=models.PROTECT, related_name='treatments')
-    date_administered = models.DateField(default=timezone.now)
+    date_administered = models.DateField(default=timezone.now, db_index=True)
     dosage = models.CharField(max_length=80, blank=True)
     administered_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     purpose = models.CharField(max_length=200, blank=True)
     notes = models.TextField(blank=True, max_length=1000)
+    quantity_used = models.PositiveIntegerField(default=0, help_text="Units drawn from the medicine's inventory SKU")
 
     def __str__(self):
         return f"Treatment {self.medicine_id} {self.date_administered}"
 
     class Meta:
         ordering = ['-date_administered']
+        indexes = [
+            models.Index(fields=['batch', 'date_administered']),
+            models.Index(fields=['company', 'date_administered']),
+        ]
 
 # ---------------------------------------------------------------------------
 # Disease Catalog & Cases
@@ -176,10 +321,10 @@ class DiseaseCatalog(TimeStampedModel):
     def __str__(self):
         return self.name
 
-class DiseaseCase(TimeStampedModel):
+class DiseaseCase(BatchRecordModel):
     batch = models.ForeignKey(ChickBatch, on_delete=models.CASCADE, related_name='disease_cases')
     disease = models.ForeignKey(DiseaseCatalog, on_delete=models.PROTECT, related_name='cases')
-    date_detected = models.DateField(default=timezone.now)
+    date_detected = models.DateField(default=timezone.now, db_index=True)
     affected_count = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=16, choices=DiseaseCaseStatus.choices, default=DiseaseCaseStatus.ACTIVE)
     notes = models.TextField(blank=True, max_length=1000)
@@ -190,12 +335,108 @@ class DiseaseCase(TimeStampedModel):
     class Meta:
         ordering = ['-date_detected']
         indexes = [
-            models.Index(fields=['status']),
+            models.Index(fields=['batch', 'date_detected']),
+            models.Index(fields=['company', 'date_detected']),
+            models.Index(fields=['company', 'status', 'date_detected']),
+        ]
+
+# ---------------------------------------------------------------------------
+# Disease outbreaks (found across batches by products.outbreaks)
+# ---------------------------------------------------------------------------
+class DiseaseOutbreak(CompanyScopedModel):
+    """One disease in several batches at one farm location within a few days"""
+    disease = models.ForeignKey(DiseaseCatalog, on_delete=models.CASCADE, related_name='outbreaks')
+    farm_location = models.CharField(max_length=120, blank=True)
+    detected_on = models.DateField(help_text="Last day of the first window that reached the threshold")
+    last_case_on = models.DateField()
+    cases = models.PositiveIntegerField(default=0, help_text="Cases in the latest window")
+    batches = models.PositiveIntegerField(default=0, help_text="Batches with cases in the latest window")
+    affected = models.PositiveIntegerField(default=0, help_text="Birds affected in the latest window")
+    score = models.FloatField(default=0, help_text="Cases in the latest window weighted by severity and mortality rate")
+    peak_score = models.FloatField(default=0)
+    is_active = models.BooleanField(default=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Outbreak of disease {self.disease_id} at {self.farm_location or 'no location'}"
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            # The dashboard's active outbreaks, worst first
+            models.Index(fields=['company', '-score'], condition=models.Q(is_active=True), name='active_outbreak_score'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'disease', 'farm_location'],
+                condition=models.Q(is_active=True),
+                name='unique_active_outbreak',
+            ),
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Batch Rollup (precomputed per-batch totals, see products.rollups)
+# ---------------------------------------------------------------------------
+class BatchRollup(models.Model):
+    batch = models.OneToOneField(ChickBatch, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    latest_check = models.ForeignKey(HealthCheck, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    latest_check_date = models.DateField(null=True, blank=True)
+    cumulative_mortality = models.PositiveIntegerField(default=0)
+    cumulative_diseased = models.PositiveIntegerField(default=0)
+    total_feed_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_treatment_date = models.DateField(null=True, blank=True)
+    active_disease_cases = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rollup {self.batch_id}"
+
+# ---------------------------------------------------------------------------
+# Archived batches (summary rows; the records live in files, see products.archive)
+# ---------------------------------------------------------------------------
+class ArchivedBatch(CompanyScopedModel):
+    batch_id = models.PositiveBigIntegerField(unique=True, help_text="Primary key the batch had, and gets back on restore")
+    breeder_type = models.CharField(max_length=16, choices=BreederType.choices)
+    hatch_date = models.DateField()
+    closed_on = models.DateField(help_text="Last change to the batch before it was archived")
+    status = models.CharField(max_length=16, choices=ChickStatus.choices)
+    farm_location = models.CharField(max_length=120, blank=True)
+    initial_count = models.PositiveIntegerField()
+    final_count = models.PositiveIntegerField(null=True, blank=True)
+    total_mortality = models.PositiveIntegerField(default=0)
+    total_feed_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    treatments = models.PositiveIntegerField(default=0)
+    disease_cases = models.PositiveIntegerField(default=0)
+    archive_file = models.CharField(max_length=255, help_text="Path under ARCHIVE_ROOT")
+
+    def __str__(self):
+        return f"Archived batch #{self.batch_id}"
+
+    class Meta:
+        ordering = ['-closed_on']
+        indexes = [
+            models.Index(fields=['company', 'closed_on']),
         ]
+        verbose_name_plural = "Archived Batches"
 
 # ---------------------------------------------------------------------------
 # Inventory
 # ---------------------------------------------------------------------------
+class InventoryProductQuerySet(models.QuerySet):
+    def with_margin(self):
+        """Annotate ``margin_percentage`` (markup over cost) in SQL"""
+        return self.annotate(
+            margin_percentage=models.Case(
+                models.When(
+                    sale_price__gt=0, cost_price__gt=0,
+                    then=(models.F('sale_price') - models.F('cost_price')) * 100 / models.F('cost_price'),
+                ),
+                default=models.Value(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
 class InventoryProduct(CompanyScopedModel):
     sku = models.CharField(max_length=40)
     name = models.CharField(max_length=120)
@@ -208,6 +449,8 @@ class InventoryProduct(CompanyScopedModel):
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)], default=0)
     is_active = models.BooleanField(default=True)
 
+    objects = InventoryProductQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
@@ -223,3 +466,123 @@ class InventoryProduct(CompanyScopedModel):
             models.Index(fields=['company', 'is_active']),
         ]
 
+# ---------------------------------------------------------------------------
+# Stock ledger (applied by products.stock)
+# ---------------------------------------------------------------------------
+class StockMovement(CompanyScopedModel):
+    """One signed change to a product's stock_on_hand"""
+    product = models.ForeignKey(InventoryProduct, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=16, choices=MovementKind.choices)
+    quantity = models.IntegerField(help_text="Signed change: positive adds stock, negative removes it")
+    reference = models.CharField(max_length=80, blank=True, help_text="Delivery note, invoice or count sheet")
+    note = models.CharField(max_length=255, blank=True)
+    feed_schedule = models.ForeignKey(FeedSchedule, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    treatment = models.ForeignKey(TreatmentRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+} of product {self.product_id}"
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['product', 'id']),
+            models.Index(fields=['company', 'created_at']),
+        ]
+
+class StockSnapshot(models.Model):
+    """
+    Stock of a product once every movement up to ``last_movement_id`` had been
+    applied; those movements are compacted away (see products.stock.compact).
+    """
+    product = models.OneToOneField(InventoryProduct, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    quantity = models.IntegerField(default=0)
+    last_movement_id = models.PositiveBigIntegerField(default=0)
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Snapshot {self.product_id}: {self.quantity}"
+
+# ---------------------------------------------------------------------------
+# Company KPI snapshots (one row per company per day, see products.snapshots)
+# ---------------------------------------------------------------------------
+class CompanyDailySnapshot(models.Model):
+    company = models.ForeignKey('company.Company', on_delete=models.CASCADE, related_name='daily_snapshots')
+    date = models.DateField()
+    active_batches = models.PositiveIntegerField(default=0)
+    live_birds = models.IntegerField(default=0)
+    mortality_rate = models.FloatField(null=True, blank=True, help_text="Percent of the active batches' birds lost")
+    deaths = models.PositiveIntegerField(default=0, help_text="Deaths recorded that day")
+    diseased = models.PositiveIntegerField(default=0, help_text="Diseased birds recorded that day")
+    feed_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Feed given that day")
+    active_disease_cases = models.PositiveIntegerField(default=0)
+    inventory_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    low_stock_items = models.PositiveIntegerField(null=True, blank=True, help_text="Only known for days taken live")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot {self.company_id} {self.date}"
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'date'], name='unique_company_daily_snapshot'),
+        ]
+
+# ---------------------------------------------------------------------------
+# Alerts (raised and resolved by the rules in products.alerts)
+# ---------------------------------------------------------------------------
+class Alert(CompanyScopedModel):
+    rule = models.CharField(max_length=40)
+    dedupe_key = models.CharField(max_length=120, help_text="Identifies the condition; one open alert per key")
+    priority = models.CharField(max_length=16, choices=AlertPriority.choices, default=AlertPriority.MEDIUM)
+    title = models.CharField(max_length=120)
+    message = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=AlertStatus.choices, default=AlertStatus.OPEN)
+    batch = models.ForeignKey(ChickBatch, on_delete=models.CASCADE, null=True, blank=True, related_name='alerts')
+    product = models.ForeignKey(InventoryProduct, on_delete=models.CASCADE, null=True, blank=True, related_name='alerts')
+    last_seen_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'status', 'created_at']),
+            models.Index(fields=['rule', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'dedupe_key'],
+                condition=models.Q(status='OPEN'),
+                name='unique_open_alert_per_key',
+            ),
+        ]
+
+# ---------------------------------------------------------------------------
+# Search documents (maintained by products.search; the full-text index over
+# title and body is created per backend in migration 0006)
+# ---------------------------------------------------------------------------
+class SearchDocument(models.Model):
+    company = models.ForeignKey(
+        'company.Company', on_delete=models.CASCADE, null=True, blank=True, related_name='search_documents',
+        help_text="Empty for shared catalog entries (diseases, medicines)",
+    )
+    kind = models.CharField(max_length=16, choices=SearchKind.choices)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'kind']),
+        ]
@@ -0,0 +1,150 @@
+"""
+Live counts kept in step with the deaths health checks record.
+
+A batch's current_count is its initial count less the mortality of its
+health checks. Creating, editing or deleting a check moves current_count by
+the change in deaths with one UPDATE on F('current_count'), so checks saved
+at the same time for one batch do not overwrite each other. The daily round
+and the importer write checks in bulk and move all their batches with one
+UPDATE over a CASE of batch ids, and re-evaluate the alerts of those
+batches themselves (``evaluate_alerts``). ``recompute`` resets batches
+from their checks, for counts entered by hand or before this was in place.
+
+current_count stays between zero and the initial count. Deaths past the live
+count are rejected before the write (``check_deaths``, the importer and the
+daily round): a clamped check would give back more birds than it took when
+later edited or deleted. Every update moves updated_at too, so the API's
+ETags (products.api) change with the count.
+"""
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, PositiveIntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from products import alerts
+from products.models import ChickBatch, HealthCheck
+from products.stats import live_count_expression
+
+# Fields whose change moves a batch's live count
+FIELDS = {'batch', 'mortality_count'}
+
+
+def take_deaths(deaths):
+    """Take ``deaths`` (batch id -> deaths, negative to give birds back) off the batches"""
+    deaths = {batch_id: count for batch_id, count in deaths.items() if count}
+    if not deaths:
+        return 0
+    if len(deaths) == 1:
+        (batch_id, count), = deaths.items()
+        return ChickBatch.objects.filter(pk=batch_id).update(
+            current_count=_live_after(Value(count)), updated_at=timezone.now(),
+        )
+    taken = Case(
+        *[When(pk=batch_id, then=Value(count)) for batch_id, count in deaths.items()],
+        output_field=IntegerField(),
+    )
+    return ChickBatch.objects.filter(pk__in=deaths).update(current_count=_live_after(taken), updated_at=timezone.now())
+
+
+def evaluate_alerts(batch_ids):
+    """Re-evaluate the rules fed by health checks (high mortality) for ``batch_ids`` once the write commits"""
+    transaction.on_commit(partial(alerts.evaluate_scopes, [
+        (rule, list(batch_ids)) for rule in alerts.RULES.values() if HealthCheck in rule.sources
+    ]))
+
+
+def _live_after(deaths):
+    return Greatest(
+        Least(live_count_expression() - deaths, F('initial_count')),
+        Value(0),
+        output_field=PositiveIntegerField(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Single checks (signal handlers)
+# ---------------------------------------------------------------------------
+def needs_sync(instance, update_fields=None):
+    if update_fields is None:
+        return True
+    return bool({name.removesuffix('_id') for name in update_fields} & FIELDS)
+
+
+def recorded_deaths(instance):
+    """
+    (batch id, deaths) a saved check holds in the database: as loaded
+    (HealthCheck.from_db), or read from the row when it was not loaded with
+    both fields.
+    """
+    recorded = getattr(instance, '_recorded_deaths', (None, None))
+    if None in recorded:
+        recorded = HealthCheck.objects.filter(pk=instance.pk).values_list('batch_id', 'mortality_count').first()
+    return recorded or (None, 0)
+
+
+def check_saved(instance, created):
+    """Move the live counts by what the save changed, from the state recorded_deaths noted before it"""
+    batch_id, count = (None, 0) if created else getattr(instance, '_recorded_deaths', (None, 0))
+    deaths = {batch_id: -count} if batch_id else {}
+    deaths[instance.batch_id] = deaths.get(instance.batch_id, 0) + instance.mortality_count
+    take_deaths(deaths)
+    instance._recorded_deaths = (instance.batch_id, instance.mortality_count)
+
+
+def check_deaths(instance):
+    """Raise ValidationError when a check records more new deaths than its batch has live birds"""
+    if instance.batch_id is None or instance.mortality_count is None:
+        return
+    batch_id, count = recorded_deaths(instance) if instance.pk is not None else (None, 0)
+    new = instance.mortality_count - (count if batch_id == instance.batch_id else 0)
+    live = live_counts([instance.batch_id]).get(instance.batch_id, 0)
+    if new > live:
+        raise ValidationError({'mortality_count': f"Batch #{instance.batch_id} has only {live} live birds."})
+
+
+def live_counts(batch_ids):
+    """Live count by batch id"""
+    return dict(
+        ChickBatch.objects.filter(pk__in=batch_ids).annotate(live=live_count_expression()).values_list('pk', 'live')
+    )
+
+
+def check_deleted(instance):
+    batch_id, count = getattr(instance, '_recorded_deaths', (None, None))
+    if None in (batch_id, count):
+        batch_id, count = instance.batch_id, instance.mortality_count
+    take_deaths({batch_id: -count})
+
+
+# ---------------------------------------------------------------------------
+# Repairs
+# ---------------------------------------------------------------------------
+def expected_counts(batches):
+    """(batch, live count its checks add up to) for ``batches`` whose current_count differs"""
+    rows = batches.order_by('pk').annotate(deaths=Coalesce(Sum('health_checks__mortality_count'), 0))
+    return [
+        (batch, expected)
+        for batch, expected in ((batch, max(batch.initial_count - batch.deaths, 0)) for batch in rows)
+        if batch.current_count != expected
+    ]
+
+
+def set_counts(stale, batch_size=1000):
+    """Write the (batch, live count) pairs of expected_counts with one bulk update"""
+    now = timezone.now()
+    batches = []
+    for batch, expected in stale:
+        batch.current_count = expected
+        batch.updated_at = now
+        batches.append(batch)
+    ChickBatch.objects.bulk_update(batches, ['current_count', 'updated_at'], batch_size=batch_size)
+    evaluate_alerts([batch.pk for batch in batches])
+    return len(batches)
+
+
+def recompute(batches, batch_size=1000):
+    """Set current_count of ``batches`` from their checks: one grouped query, one bulk update"""
+    return set_counts(expected_counts(batches), batch_size)
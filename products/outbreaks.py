@@ -0,0 +1,199 @@
+"""
+Disease outbreaks across batches.
+
+An outbreak is one catalog disease detected in at least MIN_BATCHES batches
+at the same farm location of a company within WINDOW_DAYS. ``detect`` reads
+the disease cases of the last LOOKBACK_DAYS (plus one window) as a single
+series and lays them out on a (disease/location/company, day) grid with
+NumPy. Rolling sums over that grid (products.analytics.rolling_sum) give, for
+every day, the cases, birds affected and distinct batches of the window
+ending that day. Each window's cases are weighted by the disease's severity
+and mortality rate into a score.
+
+``evaluate`` turns the detection into DiseaseOutbreak rows the way
+products.alerts handles alerts: a new outbreak is created, an ongoing one
+is updated, and one whose latest window fell below the threshold is
+resolved. Saving or deleting a disease case re-evaluates only its own
+disease and location, and those it was moved off, once the write commits;
+``detect_outbreaks`` sweeps everything (changed farm locations, archived
+batches, days passing). The dashboard reads the active outbreaks with one query on a partial (company,
+score) index over the active rows.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from functools import reduce
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from products.analytics import rolling_sum
+from products.models import DiseaseCase, DiseaseOutbreak
+
+WINDOW_DAYS = 7
+MIN_BATCHES = 2
+LOOKBACK_DAYS = 28
+DASHBOARD_LIMIT = 3
+
+# (company id, disease id, farm location)
+Key = namedtuple('Key', 'company_id disease_id farm_location')
+Finding = namedtuple('Finding', 'detected_on last_case_on cases batches affected score peak_score')
+
+
+def weight(severity, mortality_rate):
+    """How much one case counts: severity 1-5, raised by the disease's mortality rate"""
+    return severity * (1 + float(mortality_rate) / 100)
+
+
+def case_rows(since, until, company_ids=None, keys=None):
+    """The cases detected from ``since`` to ``until`` as (key, batch, day, affected, weight) rows"""
+    cases = DiseaseCase.objects.filter(company__isnull=False, date_detected__gte=since, date_detected__lte=until)
+    if company_ids is not None:
+        cases = cases.filter(company_id__in=company_ids)
+    if keys is not None:
+        cases = cases.filter(reduce(Q.__or__, (
+            Q(company_id=key.company_id, disease_id=key.disease_id, batch__farm_location=key.farm_location)
+            for key in keys
+        ), Q()))
+    rows = cases.order_by().values_list(
+        'company_id', 'disease_id', 'batch__farm_location', 'batch_id', 'date_detected', 'affected_count',
+        'disease__severity', 'disease__mortality_rate',
+    )
+    return [
+        (Key(company_id, disease_id, location), batch_id, (detected - since).days, affected, weight(severity, rate))
+        for company_id, disease_id, location, batch_id, detected, affected, severity, rate in rows
+    ]
+
+
+def detect(company_ids=None, keys=None, today=None):
+    """
+    Outbreaks whose window ending ``today`` reaches MIN_BATCHES, as
+    {Key: Finding}, for the given companies or keys (all when None)
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=LOOKBACK_DAYS + WINDOW_DAYS - 1)
+    rows = case_rows(since, today, company_ids, keys)
+    if not rows:
+        return {}
+
+    key_codes, pair_codes = {}, {}
+    key_index = np.array([key_codes.setdefault(key, len(key_codes)) for key, *_ in rows])
+    pair_index = np.array([pair_codes.setdefault((key, batch_id), len(pair_codes)) for key, batch_id, *_ in rows])
+    day = np.array([row[2] for row in rows])
+    affected = np.array([row[3] for row in rows])
+    weights = np.zeros(len(key_codes))
+    weights[key_index] = [row[4] for row in rows]
+    shape = (len(key_codes), (today - since).days + 1)
+
+    daily_cases = np.zeros(shape)
+    np.add.at(daily_cases, (key_index, day), 1)
+    daily_affected = np.zeros(shape)
+    np.add.at(daily_affected, (key_index, day), affected)
+    # A batch counts once per window however many cases it had in it
+    batch_days = np.zeros((len(pair_codes), shape[1]))
+    batch_days[pair_index, day] = 1
+    window_batches = np.zeros(shape)
+    np.add.at(window_batches, np.array([key_codes[key] for key, _ in pair_codes]),
+              rolling_sum(batch_days, WINDOW_DAYS) > 0)
+
+    window_cases = rolling_sum(daily_cases, WINDOW_DAYS)
+    window_affected = rolling_sum(daily_affected, WINDOW_DAYS)
+    scores = window_cases * weights[:, None]
+    breaching = window_batches >= MIN_BATCHES
+    # Days a case was seen, carried forward: the last case of each window
+    seen = np.where(daily_cases > 0, np.arange(shape[1]), -1)
+    last_case = np.maximum.accumulate(seen, axis=1)
+
+    findings = {}
+    for key, row in key_codes.items():
+        if not breaching[row, -1]:
+            continue
+        quiet = np.flatnonzero(~breaching[row])
+        first = quiet[-1] + 1 if len(quiet) else 0
+        findings[key] = Finding(
+            detected_on=since + timedelta(days=int(first)),
+            last_case_on=since + timedelta(days=int(last_case[row, -1])),
+            cases=int(window_cases[row, -1]),
+            batches=int(window_batches[row, -1]),
+            affected=int(window_affected[row, -1]),
+            score=round(float(scores[row, -1]), 2),
+            peak_score=round(float(scores[row, first:].max()), 2),
+        )
+    return findings
+
+
+def _key(outbreak):
+    return Key(outbreak.company_id, outbreak.disease_id, outbreak.farm_location)
+
+
+def evaluate(company_ids=None, keys=None, today=None):
+    """
+    Reconcile the detected outbreaks with the active DiseaseOutbreak rows of
+    the given companies or keys (all when None). Returns (opened, resolved).
+    """
+    now = timezone.now()
+    findings = detect(company_ids, keys, today)
+    active = DiseaseOutbreak.objects.filter(is_active=True)
+    if company_ids is not None:
+        active = active.filter(company_id__in=company_ids)
+    if keys is not None:
+        active = active.filter(reduce(Q.__or__, (
+            Q(company_id=key.company_id, disease_id=key.disease_id, farm_location=key.farm_location) for key in keys
+        ), Q()))
+    existing = {_key(outbreak): outbreak for outbreak in active}
+
+    with transaction.atomic():
+        new = [
+            DiseaseOutbreak(
+                company_id=key.company_id, disease_id=key.disease_id, farm_location=key.farm_location,
+                **finding._asdict(),
+            )
+            for key, finding in findings.items() if key not in existing
+        ]
+        DiseaseOutbreak.objects.bulk_create(new, ignore_conflicts=True)
+
+        ongoing = []
+        for key, outbreak in existing.items():
+            if key in findings:
+                finding = findings[key]
+                # The first detection stands; the lookback may no longer reach it
+                for name in ['last_case_on', 'cases', 'batches', 'affected', 'score']:
+                    setattr(outbreak, name, getattr(finding, name))
+                outbreak.peak_score = max(outbreak.peak_score, finding.peak_score)
+                outbreak.updated_at = now
+                ongoing.append(outbreak)
+        DiseaseOutbreak.objects.bulk_update(
+            ongoing, ['last_case_on', 'cases', 'batches', 'affected', 'score', 'peak_score', 'updated_at'],
+        )
+
+        cleared = [outbreak.pk for key, outbreak in existing.items() if key not in findings]
+        if cleared:
+            DiseaseOutbreak.objects.filter(pk__in=cleared).update(is_active=False, resolved_at=now, updated_at=now)
+    return len(new), len(cleared)
+
+
+def saved_key(instance):
+    """The Key of a case as saved in the database, read before it is saved again (None if unsaved)"""
+    row = DiseaseCase.objects.filter(pk=instance.pk, company__isnull=False) \
+        .values_list('company_id', 'disease_id', 'batch__farm_location').first()
+    return Key(*row) if row else None
+
+
+def case_changed(instance):
+    """
+    Re-evaluate the disease and location of a saved or deleted case once the
+    write commits, and those it was saved under before (noted by saved_key)
+    """
+    keys = {getattr(instance, '_saved_key', None)}
+    if instance.company_id is not None:
+        keys.add(Key(instance.company_id, instance.disease_id, instance.batch.farm_location))
+    keys.discard(None)
+    if keys:
+        transaction.on_commit(lambda: evaluate(keys=list(keys)))
+
+
+def active_outbreaks(company):
+    """Active outbreaks for the dashboard, worst first (reads the active_outbreak_score index)"""
+    return DiseaseOutbreak.objects.filter(company=company, is_active=True) \
+        .select_related('disease').order_by('-score')[:DASHBOARD_LIMIT]
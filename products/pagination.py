@@ -0,0 +1,209 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are located with a WHERE clause on the ordering columns instead of an
+OFFSET, and no COUNT query is issued, so fetching page N costs the same as
+fetching page 1. The ordering must end in a unique column (normally ``id``).
+
+``EstimatedCountPaginator`` keeps page numbers (for the admin) but estimates
+the size of large unfiltered tables instead of running a full COUNT(*).
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connection
+from django.db.models import AutoField, BigAutoField, Max, Q
+from django.utils.functional import cached_property
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move either way"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` on ``ordering`` (e.g. ``('-hatch_date', '-id')``).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-id',)):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    # -- cursors -----------------------------------------------------------
+    def encode_cursor(self, obj):
+        if isinstance(obj, dict):
+            # Rows from values() must include the ordering columns
+            values = [obj[field] for field in self.fields]
+        else:
+            values = [getattr(obj, field) for field in self.fields]
+        payload = json.dumps([None if v is None else str(v) for v in values])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(raw, list) or len(raw) != len(self.fields):
+                raise ValueError
+            model = self.queryset.model
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, raw)
+            ]
+        except (ValueError, TypeError, ValidationError, UnicodeDecodeError):
+            raise InvalidCursor(cursor)
+
+    # -- filtering ---------------------------------------------------------
+    def _after(self, values, reverse=False):
+        """Rows strictly after ``values`` in the (optionally reversed) ordering"""
+        condition = Q()
+        for i in reversed(range(len(self.fields))):
+            descending = self.descending[i] != reverse
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{self.fields[i]}__{lookup}': values[i]})
+            if i < len(self.fields) - 1:
+                step |= Q(**{self.fields[i]: values[i]}) & condition
+            condition = step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            field if descending else f'-{field}'
+            for field, descending in zip(self.fields, self.descending)
+        ]
+
+    def page(self, cursor=None, direction=NEXT):
+        """Fetch a page with a single query (``per_page + 1`` rows)"""
+        qs = self.queryset
+        backwards = direction == PREVIOUS and cursor is not None
+        if cursor is not None:
+            values = self.decode_cursor(cursor)
+            qs = qs.filter(self._after(values, reverse=backwards))
+        qs = qs.order_by(*(self._reversed_ordering() if backwards else self.ordering))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if backwards:
+            next_cursor = self.encode_cursor(rows[-1])
+            previous_cursor = self.encode_cursor(rows[0]) if has_more else None
+        else:
+            next_cursor = self.encode_cursor(rows[-1]) if has_more else None
+            previous_cursor = self.encode_cursor(rows[0]) if cursor is not None else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class ProbedPage(Page):
+    """A page whose successor was found by fetching one row past it, not from the count"""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Page-number paginator for large tables that avoids a full COUNT(*) of
+    them. A filtered queryset, or a table of up to COUNT_LIMIT rows, is
+    counted exactly. A larger unfiltered table is counted from an estimate:
+    the planner's row count on PostgreSQL, the highest primary key elsewhere.
+    The estimate only sizes the page links; a page exists when it has rows,
+    found by fetching one row past it.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def estimate(self):
+        """Estimated rows of an unfiltered table over COUNT_LIMIT, else None"""
+        queryset = self.object_list.order_by()
+        if queryset.query.where:
+            return None
+        estimate = estimated_rows(queryset.model)
+        return estimate if estimate is not None and estimate > self.COUNT_LIMIT else None
+
+    @cached_property
+    def count(self):
+        if self.estimate is not None:
+            return self.estimate
+        return self.object_list.order_by().count()
+
+    def validate_number(self, number):
+        if self.estimate is None:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if self.estimate is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return ProbedPage(rows[:self.per_page], number, self, more=len(rows) > self.per_page)
+
+
+def estimated_rows(model):
+    """Rows in ``model``'s table, estimated without scanning it (None if unknown)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table was first analyzed
+        return row[0] if row and row[0] >= 0 else None
+    if isinstance(model._meta.pk, (AutoField, BigAutoField)):
+        return model.objects.aggregate(highest=Max('pk'))['highest'] or 0
+    return None
@@ -0,0 +1,190 @@
+"""
+Maintenance of BatchRollup rows.
+
+Creating a health check, feed schedule, treatment or disease case adjusts the
+batch's rollup in place with a single UPDATE. Edits and deletes recompute only
+the affected section for that one batch (and for the batch a record was moved
+from). ``rebuild_rollups`` recomputes rows in
+bulk with one grouped query per section, for backfills and repairs.
+"""
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from products.models import (
+    BatchRollup, ChickBatch, DiseaseCase, DiseaseCaseStatus, FeedSchedule,
+    HealthCheck, TreatmentRecord
+)
+
+HEALTH = 'health'
+FEED = 'feed'
+TREATMENT = 'treatment'
+DISEASE = 'disease'
+
+SECTION_FIELDS = {
+    HEALTH: ['latest_check', 'latest_check_date', 'cumulative_mortality', 'cumulative_diseased'],
+    FEED: ['total_feed_kg'],
+    TREATMENT: ['last_treatment_date'],
+    DISEASE: ['active_disease_cases'],
+}
+
+SECTION_BY_MODEL = {
+    HealthCheck: HEALTH,
+    FeedSchedule: FEED,
+    TreatmentRecord: TREATMENT,
+    DiseaseCase: DISEASE,
+}
+
+
+def section_values(section, batch_ids):
+    """Recompute one section for many batches with a single grouped query"""
+    if section == HEALTH:
+        latest = HealthCheck.objects.filter(batch=OuterRef('batch')).order_by('-check_date')
+        rows = HealthCheck.objects.filter(batch_id__in=batch_ids).values('batch').annotate(
+            cumulative_mortality=Sum('mortality_count'),
+            cumulative_diseased=Sum('diseased_count'),
+            latest_check_date=Max('check_date'),
+            latest_check_id=Subquery(latest.values('pk')[:1]),
+        )
+        return {
+            row['batch']: {
+                'latest_check_id': row['latest_check_id'],
+                'latest_check_date': row['latest_check_date'],
+                'cumulative_mortality': row['cumulative_mortality'],
+                'cumulative_diseased': row['cumulative_diseased'],
+            }
+            for row in rows
+        }
+    if section == FEED:
+        rows = FeedSchedule.objects.filter(batch_id__in=batch_ids).values('batch').annotate(
+            total=Sum('quantity_kg'),
+        )
+        return {row['batch']: {'total_feed_kg': row['total']} for row in rows}
+    if section == TREATMENT:
+        rows = TreatmentRecord.objects.filter(batch_id__in=batch_ids).values('batch').annotate(
+            last=Max('date_administered'),
+        )
+        return {row['batch']: {'last_treatment_date': row['last']} for row in rows}
+    if section == DISEASE:
+        rows = DiseaseCase.objects.filter(
+            batch_id__in=batch_ids,
+            status=DiseaseCaseStatus.ACTIVE
+        ).values('batch').annotate(active=Count('id'))
+        return {row['batch']: {'active_disease_cases': row['active']} for row in rows}
+    raise ValueError(f"Unknown rollup section: {section}")
+
+
+def empty_values(section):
+    defaults = {
+        'latest_check_id': None,
+        'latest_check_date': None,
+        'cumulative_mortality': 0,
+        'cumulative_diseased': 0,
+        'total_feed_kg': 0,
+        'last_treatment_date': None,
+        'active_disease_cases': 0,
+    }
+    if section is None:
+        return defaults
+    return {
+        key: value for key, value in defaults.items()
+        if key.removesuffix('_id') in SECTION_FIELDS[section]
+    }
+
+
+def rebuild_rollups(batch_ids, batch_size=500):
+    """Recompute and upsert rollups for ``batch_ids`` (4 queries + 1 write per chunk)"""
+    batch_ids = list(batch_ids)
+    written = 0
+    for start in range(0, len(batch_ids), batch_size):
+        chunk = batch_ids[start:start + batch_size]
+        values = {batch_id: empty_values(None) for batch_id in chunk}
+        for section in SECTION_FIELDS:
+            for batch_id, section_row in section_values(section, chunk).items():
+                values[batch_id].update(section_row)
+
+        rollups = [BatchRollup(batch_id=batch_id, **row) for batch_id, row in values.items()]
+        BatchRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['batch'],
+            update_fields=[field for fields in SECTION_FIELDS.values() for field in fields] + ['updated_at'],
+        )
+        written += len(rollups)
+    return written
+
+
+def rebuild_company_rollups(company=None, batch_size=500):
+    batches = ChickBatch.objects.all()
+    if company is not None:
+        batches = batches.filter(company=company)
+    return rebuild_rollups(batches.values_list('pk', flat=True).iterator(), batch_size)
+
+
+def refresh_section(batch_id, section):
+    """Recompute one section of an existing rollup row (never inserts)"""
+    row = section_values(section, [batch_id]).get(batch_id, empty_values(section))
+    BatchRollup.objects.filter(batch_id=batch_id).update(updated_at=timezone.now(), **row)
+
+
+def _apply_or_rebuild(batch_id, **changes):
+    updated = BatchRollup.objects.filter(batch_id=batch_id).update(updated_at=timezone.now(), **changes)
+    if not updated:
+        rebuild_rollups([batch_id])
+
+
+def _is_newer(field, value):
+    return Q(**{f'{field}__isnull': True}) | Q(**{f'{field}__lte': value})
+
+
+def record_created(instance):
+    """Apply a newly created child row to its batch rollup with one UPDATE"""
+    if isinstance(instance, HealthCheck):
+        newer = _is_newer('latest_check_date', instance.check_date)
+        _apply_or_rebuild(
+            instance.batch_id,
+            cumulative_mortality=F('cumulative_mortality') + instance.mortality_count,
+            cumulative_diseased=F('cumulative_diseased') + instance.diseased_count,
+            latest_check=Case(
+                When(newer, then=Value(instance.pk)),
+                default=F('latest_check'),
+                output_field=BatchRollup._meta.get_field('latest_check'),
+            ),
+            latest_check_date=Case(When(newer, then=Value(instance.check_date)), default=F('latest_check_date')),
+        )
+    elif isinstance(instance, FeedSchedule):
+        _apply_or_rebuild(
+            instance.batch_id,
+            total_feed_kg=F('total_feed_kg') + instance.quantity_kg,
+        )
+    elif isinstance(instance, TreatmentRecord):
+        newer = _is_newer('last_treatment_date', instance.date_administered)
+        _apply_or_rebuild(
+            instance.batch_id,
+            last_treatment_date=Case(
+                When(newer, then=Value(instance.date_administered)),
+                default=F('last_treatment_date'),
+            ),
+        )
+    elif isinstance(instance, DiseaseCase):
+        if instance.status == DiseaseCaseStatus.ACTIVE:
+            _apply_or_rebuild(
+                instance.batch_id,
+                active_disease_cases=F('active_disease_cases') + 1,
+            )
+        else:
+            _apply_or_rebuild(instance.batch_id)
+
+
+def saved_batch_id(instance):
+    """The batch a saved child row belongs to in the database, before it is saved again"""
+    return type(instance).objects.filter(pk=instance.pk).values_list('batch_id', flat=True).first()
+
+
+def record_changed(instance):
+    """
+    Recompute the section affected by an edited or deleted child row, for
+    its batch and for the batch it was moved from (noted by saved_batch_id)
+    """
+    section = SECTION_BY_MODEL[type(instance)]
+    for batch_id in {instance.batch_id, getattr(instance, '_saved_batch_id', None)} - {None}:
+        refresh_section(batch_id, section)
@@ -0,0 +1,85 @@
+"""
+Daily rounds: one health check for each of a company's active batches,
+entered on one page and written together.
+
+``round_batches`` loads the batches with the day's existing check (if the
+round was already entered) and the latest weight in one query. ``record_round``
+upserts every check with one ``bulk_create`` and takes the deaths off the
+batches' live counts with one UPDATE (products.mortality), in one
+transaction. Entering a round again for the same day only moves the
+difference in deaths.
+"""
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q
+
+from products import fragments, mortality
+from products.models import ChickBatch, ChickStatus, HealthCheck
+from products.rollups import rebuild_rollups
+
+FIELDS = ['diseased_count', 'mortality_count', 'average_weight_g', 'notes']
+
+
+def round_batches(company, day):
+    """Active batches, each annotated with the day's check (``recorded_*``) and ``last_weight``"""
+    return list(
+        ChickBatch.objects.filter(company=company, status=ChickStatus.ACTIVE)
+        .annotate(day_check=FilteredRelation('health_checks', condition=Q(health_checks__check_date=day)))
+        .annotate(
+            recorded_id=F('day_check__id'),
+            last_weight=F('rollup__latest_check__average_weight_g'),
+            **{f'recorded_{name}': F(f'day_check__{name}') for name in FIELDS},
+        )
+        .order_by('farm_location', 'pk')
+    )
+
+
+def initial_row(batch):
+    """Form values for a batch: the day's check when recorded, else no losses at the last weight"""
+    if batch.recorded_id is not None:
+        return {'batch': batch.pk, **{name: getattr(batch, f'recorded_{name}') for name in FIELDS}}
+    return {'batch': batch.pk, 'diseased_count': 0, 'mortality_count': 0, 'average_weight_g': batch.last_weight}
+
+
+def live_count(batch):
+    return batch.initial_count if batch.current_count is None else batch.current_count
+
+
+def new_deaths(batch, mortality_count):
+    """Deaths to take off the batch, net of what the day's check already took"""
+    return mortality_count - (batch.recorded_mortality_count or 0)
+
+
+def record_round(day, rows, batches):
+    """
+    Upsert the health checks of ``day`` for ``rows`` (cleaned form data with
+    a ``batch`` id), given ``batches`` by id from ``round_batches``, and take
+    the new deaths off each batch. Returns (created, updated).
+    """
+    checks = [
+        HealthCheck(
+            batch_id=row['batch'], company_id=batches[row['batch']].company_id, check_date=day,
+            **{name: row[name] for name in FIELDS},
+        )
+        for row in rows
+    ]
+    deaths = {
+        row['batch']: new_deaths(batches[row['batch']], row['mortality_count'])
+        for row in rows
+    }
+    batch_ids = [row['batch'] for row in rows]
+
+    with transaction.atomic():
+        HealthCheck.objects.bulk_create(
+            checks,
+            update_conflicts=True,
+            unique_fields=['batch', 'check_date'],
+            update_fields=FIELDS + ['updated_at'],
+        )
+        # bulk_create sends no signals
+        mortality.take_deaths(deaths)
+        rebuild_rollups(batch_ids)
+        fragments.invalidate_batches(batch_ids, 'health_checks')
+        mortality.evaluate_alerts(batch_ids)
+
+    updated = sum(1 for row in rows if batches[row['batch']].recorded_id is not None)
+    return len(checks) - updated, updated
@@ -0,0 +1,260 @@
+"""
+Full-text search over batches, the disease catalog, medicines and inventory.
+
+Every searchable row is mirrored into a SearchDocument (a title and a body of
+text) by the signal handlers in products.signals; ``rebuild`` refills them in
+bulk. The database indexes the documents: on SQLite an FTS5 external-content
+table kept in sync by triggers, on PostgreSQL a GIN index over a weighted
+tsvector (both created in migration 0006). Other backends fall back to
+unranked LIKE matching.
+
+Each search term matches as a prefix, so partial SKUs and words are found.
+Titles weigh more than bodies in the ranking.
+
+On SQLite, a migration that rebuilds the products_searchdocument table drops
+its triggers; recreate them there and run ``rebuild_search_index``.
+"""
+import re
+from dataclasses import dataclass
+from functools import reduce
+from operator import and_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+
+from products.models import ChickBatch, DiseaseCatalog, InventoryProduct, MedicineProduct, SearchDocument, SearchKind
+
+FTS_TABLE = 'products_searchdocument_fts'
+PG_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, d.title), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, d.body), 'B')"
+)
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+
+_TERM = re.compile(r'\w+')
+
+
+# ---------------------------------------------------------------------------
+# Indexing
+# ---------------------------------------------------------------------------
+class Indexed:
+    """How one model becomes search documents"""
+
+    def __init__(self, kind, fields, document, url_name):
+        self.kind = kind
+        self.fields = set(fields)
+        self.document = document
+        self.url_name = url_name
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+INDEXED = {
+    ChickBatch: Indexed(
+        SearchKind.BATCH,
+        ['breeder_type', 'farm_location', 'source', 'notes'],
+        lambda batch: (
+            batch.company_id,
+            f'Batch #{batch.pk}',
+            _join(batch.get_breeder_type_display(), batch.farm_location, batch.source, batch.notes),
+        ),
+        'products:batch_detail',
+    ),
+    DiseaseCatalog: Indexed(
+        SearchKind.DISEASE,
+        ['name', 'symptoms', 'treatment', 'prevention', 'description'],
+        lambda disease: (
+            None,
+            disease.name,
+            _join(disease.symptoms, disease.treatment, disease.prevention, disease.description),
+        ),
+        'products:disease_catalog_update',
+    ),
+    MedicineProduct: Indexed(
+        SearchKind.MEDICINE,
+        ['name', 'breeder_type', 'description'],
+        lambda medicine: (None, medicine.name, _join(medicine.get_breeder_type_display(), medicine.description)),
+        'products:medicine_update',
+    ),
+    InventoryProduct: Indexed(
+        SearchKind.INVENTORY,
+        ['company', 'sku', 'name', 'category'],
+        lambda product: (
+            product.company_id,
+            f'{product.sku} {product.name}',
+            _join(product.sku, product.get_category_display(), product.unit),
+        ),
+        'products:inventory_update',
+    ),
+}
+URL_NAMES = {indexed.kind: indexed.url_name for indexed in INDEXED.values()}
+
+
+def build_document(instance):
+    indexed = INDEXED[type(instance)]
+    company_id, title, body = indexed.document(instance)
+    return SearchDocument(
+        company_id=company_id, kind=indexed.kind, object_id=instance.pk, title=title[:200], body=body,
+    )
+
+
+def needs_indexing(instance, update_fields=None):
+    """False for saves that only touched fields the document does not use"""
+    if update_fields is None:
+        return True
+    return bool({name.removesuffix('_id') for name in update_fields} & INDEXED[type(instance)].fields)
+
+
+def index_instances(instances):
+    """Insert or refresh the documents of ``instances`` with one upsert"""
+    documents = [build_document(instance) for instance in instances]
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['company', 'title', 'body', 'updated_at'],
+        )
+    return len(documents)
+
+
+def unindex(instance):
+    SearchDocument.objects.filter(kind=INDEXED[type(instance)].kind, object_id=instance.pk).delete()
+
+
+def rebuild(kinds=None, chunk_size=2000):
+    """Recreate the documents of ``kinds`` (all when None); returns counts by kind"""
+    counts = {}
+    for model, indexed in INDEXED.items():
+        if kinds and indexed.kind not in kinds:
+            continue
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=indexed.kind).delete()
+            counts[indexed.kind] = 0
+            chunk = []
+            for instance in model.objects.order_by('pk').iterator(chunk_size=chunk_size):
+                chunk.append(instance)
+                if len(chunk) >= chunk_size:
+                    counts[indexed.kind] += index_instances(chunk)
+                    chunk = []
+            counts[indexed.kind] += index_instances(chunk)
+    return counts
+
+
+def optimize():
+    """Merge the FTS5 index segments (SQLite only)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class SearchResult:
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+    score: float | None
+
+    @property
+    def url(self):
+        return reverse(URL_NAMES[self.kind], kwargs={'pk': self.object_id})
+
+    def as_dict(self):
+        return {
+            'kind': self.kind, 'id': self.object_id, 'title': self.title,
+            'snippet': self.snippet, 'score': self.score, 'url': self.url,
+        }
+
+
+def terms(query):
+    """Lower-cased words of a user query; punctuation only separates them"""
+    return _TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def _scope_sql(company, kinds):
+    sql = '(d.company_id = %s OR d.company_id IS NULL)'
+    params = [company.pk if company else None]
+    if kinds:
+        sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+        params += list(kinds)
+    return sql, params
+
+
+def _sqlite_search(words, company, kinds, limit, offset):
+    match = ' '.join(f'"{word}"*' for word in words)
+    scope, params = _scope_sql(company, kinds)
+    sql = f"""
+        SELECT d.kind, d.object_id, d.title,
+               snippet({FTS_TABLE}, 1, '', '', '...', {SNIPPET_WORDS}),
+               bm25({FTS_TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score
+        FROM {FTS_TABLE}
+        JOIN products_searchdocument d ON d.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s AND {scope}
+        ORDER BY score, d.id
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, limit, offset])
+        # bm25 is lower for better matches; report higher-is-better
+        return [SearchResult(kind, object_id, title, snippet, round(-score, 4))
+                for kind, object_id, title, snippet, score in cursor.fetchall()]
+
+
+def _postgresql_search(words, company, kinds, limit, offset):
+    tsquery = ' & '.join(f'{word}:*' for word in words)
+    scope, params = _scope_sql(company, kinds)
+    sql = f"""
+        SELECT d.kind, d.object_id, d.title,
+               ts_headline('english', d.body, q, 'StartSel="", StopSel="", MaxWords={SNIPPET_WORDS}, MinWords=4'),
+               ts_rank({PG_VECTOR}, q) AS score
+        FROM products_searchdocument d, to_tsquery('english', %s) q
+        WHERE {PG_VECTOR} @@ q AND {scope}
+        ORDER BY score DESC, d.id
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, *params, limit, offset])
+        return [SearchResult(kind, object_id, title, snippet, round(score, 4))
+                for kind, object_id, title, snippet, score in cursor.fetchall()]
+
+
+def _like_search(words, company, kinds, limit, offset):
+    documents = SearchDocument.objects.filter(
+        Q(company=company) | Q(company__isnull=True) if company else Q(company__isnull=True),
+        reduce(and_, [Q(title__icontains=word) | Q(body__icontains=word) for word in words]),
+    )
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    rows = documents.order_by('-updated_at', 'pk').values_list('kind', 'object_id', 'title', 'body')
+    return [SearchResult(kind, object_id, title, body[:200], None)
+            for kind, object_id, title, body in rows[offset:offset + limit]]
+
+
+BACKENDS = {
+    'sqlite': _sqlite_search,
+    'postgresql': _postgresql_search,
+}
+
+
+def search(company, query, kinds=None, limit=20, offset=0):
+    """
+    Ranked documents matching every word of ``query`` that ``company`` may
+    see: its own batches and inventory plus the shared catalogs. Returns
+    (results, has_more); one extra row is fetched instead of counting.
+    """
+    words = terms(query)
+    if not words:
+        return [], False
+    backend = BACKENDS.get(connection.vendor, _like_search)
+    rows = backend(words, company, kinds, limit + 1, offset)
+    return rows[:limit], len(rows) > limit
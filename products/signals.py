@@ -0,0 +1,160 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from products import alerts, consumption, fragments, mortality, outbreaks, rollups, search
+from products.caching import bump_version
+from products.models import (
+    BatchRollup, ChickBatch, DiseaseCase, FeedSchedule, HealthCheck, InventoryProduct, TreatmentRecord
+)
+from products.stats import INVENTORY_NAMESPACE
+
+ROLLUP_SOURCES = [HealthCheck, FeedSchedule, TreatmentRecord, DiseaseCase]
+ALERT_SOURCES = {model for rule in alerts.RULES.values() for model in rule.sources}
+
+
+def receiver_for(signal, senders):
+    """
+    @receiver connected once per sender. A receiver without a sender would
+    listen to every model and stop Django from deleting any of them in bulk.
+    """
+    def decorator(func):
+        for sender in senders:
+            receiver(signal, sender=sender)(func)
+        return func
+    return decorator
+
+
+def deleted_on_its_own(sender, origin):
+    """
+    Whether a post_delete is for the row itself (or a queryset of its model)
+    rather than a cascade from deleting its batch, whose rollup, cached tabs
+    and alerts go with it.
+    """
+    return isinstance(origin, sender) or getattr(origin, 'model', None) is sender
+
+
+@receiver(post_save, sender=ChickBatch)
+def batch_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BatchRollup.objects.create(batch=instance)
+
+
+@receiver_for(pre_save, ROLLUP_SOURCES)
+def rollup_source_saving(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._saved_batch_id = rollups.saved_batch_id(instance)
+
+
+@receiver_for(post_save, ROLLUP_SOURCES)
+def rollup_source_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.record_created(instance)
+    else:
+        rollups.record_changed(instance)
+
+
+@receiver_for(post_delete, ROLLUP_SOURCES)
+def rollup_source_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_on_its_own(sender, origin):
+        rollups.record_changed(instance)
+
+
+@receiver([post_save, post_delete], sender=InventoryProduct)
+def inventory_changed(sender, instance, **kwargs):
+    if instance.company_id:
+        bump_version(INVENTORY_NAMESPACE, instance.company_id)
+
+
+@receiver_for([post_save, post_delete], [*fragments.SECTION_BY_MODEL, *fragments.CATALOGS])
+def fragment_source_changed(sender, instance, signal, origin=None, **kwargs):
+    """Invalidate the cached batch detail fragments showing this row"""
+    if signal is post_delete and not deleted_on_its_own(sender, origin):
+        return
+    if sender in fragments.SECTION_BY_MODEL:
+        fragments.invalidate_batches([instance.batch_id], fragments.SECTION_BY_MODEL[sender])
+    else:
+        fragments.invalidate_catalog(sender)
+
+
+@receiver_for(post_save, search.INDEXED)
+def search_source_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and search.needs_indexing(instance, update_fields):
+        search.index_instances([instance])
+
+
+@receiver_for(post_delete, search.INDEXED)
+def search_source_deleted(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+@receiver_for(pre_save, ALERT_SOURCES)
+def alert_source_saving(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._saved_scopes = alerts.saved_scopes(instance)
+
+
+@receiver_for([post_save, post_delete], ALERT_SOURCES)
+def alert_source_changed(sender, instance, signal, raw=False, origin=None, **kwargs):
+    """Re-evaluate the alert rules fed by this row once the write commits"""
+    if signal is post_delete and not deleted_on_its_own(sender, origin):
+        return
+    if not raw:
+        # Scopes are read now: after a delete commits the pk is already cleared
+        transaction.on_commit(partial(alerts.evaluate_scopes, alerts.scopes_for(instance)))
+
+
+@receiver_for(post_save, consumption.SOURCES)
+def consumption_source_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and consumption.needs_sync(instance, update_fields):
+        consumption.sync(sender, [instance.pk])
+
+
+@receiver_for(pre_delete, consumption.SOURCES)
+def consumption_source_deleting(sender, instance, origin=None, **kwargs):
+    """Deleting the record returns what it consumed; deleting its whole batch does not"""
+    if deleted_on_its_own(sender, origin):
+        consumption.sync(sender, [instance.pk], removed=True)
+
+
+@receiver(pre_save, sender=HealthCheck)
+def health_check_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A pk set by hand may name an existing row, saved with an UPDATE
+    if not raw and instance.pk is not None and mortality.needs_sync(instance, update_fields):
+        instance._recorded_deaths = mortality.recorded_deaths(instance)
+
+
+@receiver(post_save, sender=HealthCheck)
+def health_check_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not raw and mortality.needs_sync(instance, update_fields):
+        mortality.check_saved(instance, created)
+
+
+@receiver(post_delete, sender=HealthCheck)
+def health_check_deleted(sender, instance, origin=None, **kwargs):
+    """Deleting the check gives its deaths back; deleting its whole batch does not"""
+    if deleted_on_its_own(sender, origin):
+        mortality.check_deleted(instance)
+
+
+@receiver(pre_save, sender=DiseaseCase)
+def disease_case_saving(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._saved_key = outbreaks.saved_key(instance)
+
+
+@receiver(post_save, sender=DiseaseCase)
+def disease_case_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        outbreaks.case_changed(instance)
+
+
+@receiver(post_delete, sender=DiseaseCase)
+def disease_case_deleted(sender, instance, origin=None, **kwargs):
+    """Deleting the case re-evaluates its outbreak; deleting whole batches leaves it to detect_outbreaks"""
+    if deleted_on_its_own(sender, origin):
+        outbreaks.case_changed(instance)
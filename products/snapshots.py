@@ -0,0 +1,194 @@
+"""
+Daily company KPI snapshots for trend charts.
+
+``take`` writes one CompanyDailySnapshot per company per day over a range of
+days, for every company at once: each source table is read with one grouped
+query keyed by (company, day), and each day's figures are running totals
+over those rows. Days before the range collapse into a single bucket, so a
+daily run reads a handful of rows per company however long its history is.
+
+Past days are rebuilt from what the tables still hold:
+
+- a batch is active from its hatch date until it is closed (closed_at), and
+  a disease case from detection until resolved, dated by the case's last
+  change;
+- live birds are the active batches' initial counts less the deaths their
+  health checks recorded;
+- inventory value walks the stock ledger back from today's stock at today's
+  cost prices, so it only reaches as far back as the ledger is uncompacted
+  (see products.stock); low stock is only recorded for the current day.
+
+Archived batches are no longer in the tables: snapshots written before
+archiving keep their figures, backfills after it do not see them.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from company.models import Company
+from products.models import (
+    ChickBatch, ChickStatus, CompanyDailySnapshot, DiseaseCase, DiseaseCaseStatus, FeedSchedule, HealthCheck,
+    InventoryProduct, StockMovement
+)
+
+CLOSED_STATUSES = [ChickStatus.SOLD, ChickStatus.DECEASED, ChickStatus.CULLED]
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+METRICS = [
+    'active_batches', 'live_birds', 'mortality_rate', 'deaths', 'diseased', 'feed_kg',
+    'active_disease_cases', 'inventory_value', 'low_stock_items',
+]
+BATCH_SIZE = 1000
+
+
+def _by_day(queryset, company, day, since, **totals):
+    """
+    ``totals`` of ``queryset`` keyed by (company id, day); days before
+    ``since`` are added up under the day before it
+    """
+    floor = Value(since - timedelta(days=1), output_field=DateField())
+    rows = queryset.annotate(bucket=Greatest(day, floor, output_field=DateField())) \
+        .order_by().values_list(company, 'bucket').annotate(**totals)
+    return {(company_id, bucket): values for company_id, bucket, *values in rows}
+
+
+def collect(since, until):
+    """The grouped rows of every source table, one query each"""
+    batches = ChickBatch.objects.filter(company__isnull=False)
+    closed = batches.filter(status__in=CLOSED_STATUSES, closed_at__date__lte=until)
+    cases = DiseaseCase.objects.filter(company__isnull=False)
+    products = InventoryProduct.objects.filter(company__isnull=False, is_active=True)
+    stock_value = Coalesce(Sum(F('stock_on_hand') * F('cost_price'), output_field=MONEY), Value(Decimal(0)))
+    return {
+        'hatched': _by_day(
+            batches.filter(hatch_date__lte=until), 'company', F('hatch_date'), since,
+            batches=Count('id'), birds=Sum('initial_count'),
+        ),
+        'closed': _by_day(
+            closed, 'company', TruncDate('closed_at'), since,
+            batches=Count('id'), birds=Sum('initial_count'), deaths=Coalesce(Sum('rollup__cumulative_mortality'), 0),
+        ),
+        'checks': _by_day(
+            HealthCheck.objects.filter(company__isnull=False, check_date__lte=until),
+            'company', F('check_date'), since,
+            deaths=Sum('mortality_count'), diseased=Sum('diseased_count'),
+        ),
+        'feed': _by_day(
+            FeedSchedule.objects.filter(company__isnull=False, date__lte=until),
+            'company', F('date'), since,
+            kg=Sum('quantity_kg'),
+        ),
+        'detected': _by_day(
+            cases.filter(date_detected__lte=until), 'company', F('date_detected'), since,
+            cases=Count('id'),
+        ),
+        'resolved': _by_day(
+            cases.filter(status=DiseaseCaseStatus.RESOLVED, updated_at__date__lte=until),
+            'company', TruncDate('updated_at'), since,
+            cases=Count('id'),
+        ),
+        # Movements since the range started, valued at today's cost, undo today's stock day by day
+        'moved': _by_day(
+            StockMovement.objects.filter(product__is_active=True, created_at__date__gte=since),
+            'company', TruncDate('created_at'), since,
+            value=Sum(F('quantity') * F('product__cost_price'), output_field=MONEY),
+        ),
+        'inventory': {
+            company_id: (value, low)
+            for company_id, value, low in products.order_by().values_list('company').annotate(
+                value=stock_value,
+                low=Count('id', filter=Q(stock_on_hand__lte=F('reorder_point'))),
+            )
+        },
+    }
+
+
+def build(rows, company_ids, since, until, today):
+    """Running totals of the collected rows as unsaved snapshots"""
+    floor = since - timedelta(days=1)
+    days = [floor + timedelta(days=n) for n in range((until - floor).days + 1)]
+    moved_by_company = defaultdict(Decimal)
+    for (company_id, _), (value,) in rows['moved'].items():
+        moved_by_company[company_id] += value
+
+    snapshots = []
+    for company_id in company_ids:
+        active = initial = dead = cases = 0
+        value_now, low_now = rows['inventory'].get(company_id, (Decimal(0), 0))
+        # Value of movements after the current day, to take off today's value
+        moved_after = moved_by_company[company_id]
+        for day in days:
+            key = (company_id, day)
+            hatched, hatched_birds = rows['hatched'].get(key, (0, 0))
+            closed, closed_birds, closed_deaths = rows['closed'].get(key, (0, 0, 0))
+            deaths, diseased = rows['checks'].get(key, (0, 0))
+            detected, = rows['detected'].get(key, (0,))
+            resolved, = rows['resolved'].get(key, (0,))
+            moved, = rows['moved'].get(key, (Decimal(0),))
+            active += hatched - closed
+            initial += hatched_birds - closed_birds
+            dead += deaths - closed_deaths
+            cases += detected - resolved
+            moved_after -= moved
+            if day == floor:
+                continue
+            snapshots.append(CompanyDailySnapshot(
+                company_id=company_id,
+                date=day,
+                active_batches=active,
+                live_birds=initial - dead,
+                mortality_rate=round(dead * 100 / initial, 2) if initial > 0 else None,
+                deaths=deaths,
+                diseased=diseased,
+                feed_kg=rows['feed'].get(key, (0,))[0],
+                active_disease_cases=cases,
+                inventory_value=value_now - moved_after,
+                low_stock_items=low_now if day == today else None,
+            ))
+    return snapshots
+
+
+def take(since=None, until=None):
+    """
+    Write the snapshots of every company for the days from ``since`` to
+    ``until`` (both default to today), replacing any already there. Low
+    stock counts of earlier days are kept. Returns the number written.
+    """
+    today = timezone.localdate()
+    until = until or today
+    since = since or until
+    if since > until:
+        raise ValueError("since must not be after until")
+
+    company_ids = list(Company.objects.order_by('pk').values_list('pk', flat=True))
+    snapshots = build(collect(since, until), company_ids, since, until, today)
+    update_fields = [name for name in METRICS if name != 'low_stock_items'] + ['updated_at']
+    with transaction.atomic():
+        for live in (False, True):
+            CompanyDailySnapshot.objects.bulk_create(
+                [snapshot for snapshot in snapshots if (snapshot.date == today) is live],
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['company', 'date'],
+                update_fields=update_fields + ['low_stock_items'] if live else update_fields,
+            )
+    return len(snapshots)
+
+
+def trends(company, since, metrics=METRICS):
+    """A company's snapshots from ``since`` as chart series: dates plus one list per metric"""
+    rows = list(
+        CompanyDailySnapshot.objects.filter(company=company, date__gte=since)
+        .order_by('date').values_list('date', *metrics)
+    )
+    return {
+        'dates': [row[0] for row in rows],
+        'series': {
+            name: [float(row[i]) if isinstance(row[i], Decimal) else row[i] for row in rows]
+            for i, name in enumerate(metrics, 1)
+        },
+    }
@@ -0,0 +1,173 @@
+"""
+Aggregate-backed statistics for company dashboards and list pages.
+
+Every figure is computed in the database so the cost of a page load does not
+grow with the number of batches or inventory rows a company has.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import (
+    Avg, Count, DateField, DecimalField, DurationField, ExpressionWrapper, F, Min, Q, Sum, Value
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.caching import versioned_key
+from products.models import ChickBatch, ChickStatus, InventoryProduct
+
+INVENTORY_NAMESPACE = 'inventory'
+INVENTORY_SUMMARY_TIMEOUT = 60 * 60
+
+# Thresholds shared by the dashboard statistics and alerts
+HIGH_MORTALITY_SURVIVAL_RATIO = 0.9
+AGING_BATCH_DAYS = 365
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Company KPIs shown on the dashboard"""
+    total_batches: int = 0
+    active_batches: int = 0
+    total_chicks: int = 0
+    inventory_items: int = 0
+    low_stock_items: int = 0
+    avg_batch_age: int | None = None
+    mortality_rate: float | None = None
+    oldest_active_batch: int | None = None
+    high_mortality_batches: int = 0
+    aging_batches: int = 0
+
+
+def live_count_expression():
+    """Current live count, falling back to the initial count when unset"""
+    return Coalesce(F('current_count'), F('initial_count'))
+
+
+def batch_age_expression(today=None):
+    """Age of a batch as an interval, evaluated in SQL"""
+    today = today or timezone.now().date()
+    return ExpressionWrapper(
+        Value(today, output_field=DateField()) - F('hatch_date'),
+        output_field=DurationField(),
+    )
+
+
+def high_mortality_q():
+    """Batches that have lost more than 10% of their initial count"""
+    return Q(current_count__lt=F('initial_count') * HIGH_MORTALITY_SURVIVAL_RATIO)
+
+
+def aging_batch_q(today=None):
+    today = today or timezone.now().date()
+    return Q(hatch_date__lt=today - timedelta(days=AGING_BATCH_DAYS))
+
+
+def batch_aggregates(company, today=None):
+    """All batch KPIs for a company in a single aggregate query"""
+    today = today or timezone.now().date()
+    active = Q(status=ChickStatus.ACTIVE)
+    return ChickBatch.objects.filter(company=company).aggregate(
+        total_batches=Count('id'),
+        active_batches=Count('id', filter=active),
+        total_chicks=Coalesce(Sum(live_count_expression(), filter=active), 0),
+        total_initial=Coalesce(Sum('initial_count', filter=active), 0),
+        avg_age=Avg(batch_age_expression(today), filter=active),
+        oldest_hatch_date=Min('hatch_date', filter=active),
+        high_mortality_batches=Count('id', filter=active & high_mortality_q()),
+        aging_batches=Count('id', filter=active & aging_batch_q(today)),
+    )
+
+
+def inventory_aggregates(company):
+    """Active and low-stock inventory counts in a single aggregate query"""
+    return InventoryProduct.objects.filter(company=company, is_active=True).aggregate(
+        inventory_items=Count('id'),
+        low_stock_items=Count('id', filter=Q(stock_on_hand__lte=F('reorder_point'))),
+    )
+
+
+def build_dashboard_stats(batch_totals, inventory_totals, today=None):
+    """Turn raw aggregate rows into a DashboardStats"""
+    today = today or timezone.now().date()
+    avg_batch_age = mortality_rate = oldest_active_batch = None
+
+    if batch_totals['active_batches']:
+        if batch_totals['avg_age'] is not None:
+            avg_batch_age = batch_totals['avg_age'].days
+        if batch_totals['total_initial'] > 0:
+            lost = batch_totals['total_initial'] - batch_totals['total_chicks']
+            mortality_rate = round((lost / batch_totals['total_initial']) * 100, 1)
+        if batch_totals['oldest_hatch_date']:
+            oldest_active_batch = (today - batch_totals['oldest_hatch_date']).days
+
+    return DashboardStats(
+        total_batches=batch_totals['total_batches'],
+        active_batches=batch_totals['active_batches'],
+        total_chicks=batch_totals['total_chicks'],
+        inventory_items=inventory_totals['inventory_items'],
+        low_stock_items=inventory_totals['low_stock_items'],
+        avg_batch_age=avg_batch_age,
+        mortality_rate=mortality_rate,
+        oldest_active_batch=oldest_active_batch,
+        high_mortality_batches=batch_totals['high_mortality_batches'],
+        aging_batches=batch_totals['aging_batches'],
+    )
+
+
+def compute_dashboard_stats(company, today=None):
+    """
+    Compute all dashboard KPIs for a company using two aggregate queries,
+    independent of how many batches or inventory items it has.
+    """
+    today = today or timezone.now().date()
+    return build_dashboard_stats(
+        batch_aggregates(company, today),
+        inventory_aggregates(company),
+        today,
+    )
+
+
+@dataclass(frozen=True)
+class InventorySummary:
+    """Summary figures shown above the inventory list"""
+    in_stock: int = 0
+    low_stock: int = 0
+    out_of_stock: int = 0
+    categories: int = 0
+    total_value: Decimal = Decimal('0')
+
+
+def inventory_summary(company):
+    """Summary of a company's active inventory in a single aggregate query"""
+    totals = InventoryProduct.objects.filter(company=company, is_active=True).aggregate(
+        in_stock=Count('id', filter=Q(stock_on_hand__gt=0)),
+        low_stock=Count('id', filter=Q(
+            stock_on_hand__gt=0,
+            reorder_point__gt=0,
+            stock_on_hand__lte=F('reorder_point'),
+        )),
+        out_of_stock=Count('id', filter=Q(stock_on_hand=0)),
+        categories=Count('category', distinct=True),
+        total_value=Coalesce(
+            Sum(F('stock_on_hand') * F('cost_price'), output_field=DecimalField(max_digits=20, decimal_places=2)),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        ),
+    )
+    return InventorySummary(**totals)
+
+
+def get_inventory_summary(company):
+    """
+    Cached inventory_summary. The cache key carries the company's inventory
+    version, which products.signals bumps on every inventory write.
+    """
+    key = versioned_key(INVENTORY_NAMESPACE, company.pk, suffix='summary')
+    summary = cache.get(key)
+    if summary is None:
+        summary = inventory_summary(company)
+        cache.set(key, summary, INVENTORY_SUMMARY_TIMEOUT)
+    return summary
@@ -0,0 +1,242 @@
+"""
+The stock ledger.
+
+Every change to ``InventoryProduct.stock_on_hand`` is recorded as a signed
+StockMovement and applied with an atomic ``F()`` update, so concurrent
+adjustments add up instead of overwriting each other. Movements for many
+products are applied in one transaction, with one UPDATE per chunk of
+products (a CASE over their ids).
+
+``stock_on_hand`` stays the value every page reads. The ledger is kept short
+by ``compact``, which folds old movements into a StockSnapshot per product,
+so a product's ledger balance is its snapshot plus the movements after it.
+``reconcile`` corrects a stock_on_hand that drifted from that balance.
+"""
+from collections import defaultdict
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products import alerts
+from products.caching import bump_version
+from products.models import InventoryProduct, MovementKind, StockMovement, StockSnapshot
+from products.stats import INVENTORY_NAMESPACE
+
+CHUNK_SIZE = 500
+MAX_BULK_MOVEMENTS = 1000
+
+# Kinds entered as a positive amount and the sign they apply with;
+# adjustments are entered signed
+DIRECTION = {
+    MovementKind.RECEIPT: 1,
+    MovementKind.ISSUE: -1,
+    MovementKind.CONSUMPTION: -1,
+}
+
+
+class StockError(Exception):
+    pass
+
+
+def signed_quantity(kind, quantity):
+    """Stock change of entering ``quantity`` as a ``kind`` movement"""
+    if kind in DIRECTION:
+        if quantity <= 0:
+            raise StockError(f"{MovementKind(kind).label} quantity must be positive")
+        return DIRECTION[kind] * quantity
+    if quantity == 0:
+        raise StockError("Adjustment quantity must not be zero")
+    return quantity
+
+
+def stock_changed(company_id, product_ids):
+    """Invalidate cached inventory figures and re-check the stock alerts"""
+    bump_version(INVENTORY_NAMESPACE, company_id)
+    alerts.evaluate_scopes([
+        (rule, product_ids) for rule in alerts.RULES.values() if InventoryProduct in rule.sources
+    ])
+
+
+def _shortages(deltas):
+    rows = InventoryProduct.objects.filter(pk__in=deltas).values_list('pk', 'sku', 'stock_on_hand')
+    return [f"{sku} (has {stock}, change {deltas[pk]:+})" for pk, sku, stock in rows if stock + deltas[pk] < 0]
+
+
+def apply_movements(company, movements, user=None):
+    """
+    Record and apply unsaved StockMovements (signed quantities) for
+    ``company`` in one transaction. Raises StockError, applying nothing, when
+    a product is not the company's or would go below zero. Returns the new
+    stock_on_hand by product id.
+    """
+    if not movements:
+        return {}
+    deltas = defaultdict(int)
+    for movement in movements:
+        movement.company = company
+        movement.created_by = movement.created_by or user
+        deltas[movement.product_id] += movement.quantity
+
+    with transaction.atomic():
+        owned = set(InventoryProduct.objects.filter(company=company, pk__in=deltas).values_list('pk', flat=True))
+        unknown = set(deltas) - owned
+        if unknown:
+            raise StockError(f"Unknown products: {', '.join(str(pk) for pk in sorted(unknown))}")
+
+        # Sorted so concurrent bulk adjustments lock rows in the same order
+        product_ids = sorted(pk for pk, delta in deltas.items() if delta)
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                for start in range(0, len(product_ids), CHUNK_SIZE):
+                    chunk = product_ids[start:start + CHUNK_SIZE]
+                    InventoryProduct.objects.filter(pk__in=chunk).update(
+                        stock_on_hand=F('stock_on_hand') + Case(
+                            *[When(pk=pk, then=Value(deltas[pk])) for pk in chunk],
+                            output_field=IntegerField(),
+                        ),
+                        updated_at=now,
+                    )
+        except IntegrityError:
+            # stock_on_hand is unsigned: the database refused to go below zero
+            raise StockError(f"Insufficient stock: {', '.join(_shortages(deltas))}")
+
+        StockMovement.objects.bulk_create(movements, batch_size=CHUNK_SIZE)
+        transaction.on_commit(partial(stock_changed, company.pk, product_ids))
+        return dict(InventoryProduct.objects.filter(pk__in=deltas).values_list('pk', 'stock_on_hand'))
+
+
+def adjust(product, kind, quantity, user=None, **fields):
+    """Apply a single movement entered as ``quantity`` of ``kind``"""
+    movement = StockMovement(
+        product_id=product.pk, kind=kind, quantity=signed_quantity(kind, quantity), **fields,
+    )
+    return apply_movements(product.company, [movement], user)[product.pk]
+
+
+def record_opening_stock(product, user=None):
+    """
+    Record the stock a product was created with as a receipt. The stock is
+    already on the row, so the movement is only recorded, not applied.
+    """
+    return StockMovement.objects.create(
+        company_id=product.company_id, product=product, kind=MovementKind.RECEIPT,
+        quantity=product.stock_on_hand, note='Opening stock', created_by=user,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+def with_ledger_balance(products):
+    """
+    Annotate ``ledger_stock``: the snapshot plus every movement after it,
+    summed in the same grouped query that reads the products
+    """
+    after_snapshot = Q(movements__id__gt=Coalesce(F('snapshot__last_movement_id'), Value(0)))
+    return products.annotate(
+        ledger_stock=Coalesce(F('snapshot__quantity'), Value(0))
+        + Coalesce(Sum('movements__quantity', filter=after_snapshot), Value(0)),
+    )
+
+
+def drifted(products):
+    """
+    Products on the ledger whose stock_on_hand disagrees with their ledger
+    balance. Products bulk-created without an opening movement are skipped.
+    """
+    on_ledger = Exists(StockSnapshot.objects.filter(product=OuterRef('pk'))) \
+        | Exists(StockMovement.objects.filter(product=OuterRef('pk')))
+    return with_ledger_balance(products.filter(on_ledger)).exclude(stock_on_hand=F('ledger_stock'))
+
+
+def reconcile(products):
+    """
+    Bring the stock of ``products`` that drifted from the ledger back to their
+    ledger balance; products with a negative balance are left. The rows are
+    locked before the ledger is read and the correction is applied as a
+    change, so a movement applied meanwhile is kept. Returns the corrected
+    product ids by company id.
+    """
+    corrected = defaultdict(list)
+    with transaction.atomic():
+        # Sorted so concurrent adjustments lock rows in the same order
+        locked = list(products.select_for_update().order_by('pk').values_list('pk', flat=True))
+        rows = drifted(InventoryProduct.objects.filter(pk__in=locked)).filter(ledger_stock__gte=0) \
+            .values_list('pk', 'company_id', 'stock_on_hand', 'ledger_stock')
+        deltas = {}
+        for pk, company_id, stock, ledger in rows:
+            deltas[pk] = ledger - stock
+            corrected[company_id].append(pk)
+        product_ids = sorted(deltas)
+        now = timezone.now()
+        for start in range(0, len(product_ids), CHUNK_SIZE):
+            chunk = product_ids[start:start + CHUNK_SIZE]
+            InventoryProduct.objects.filter(pk__in=chunk).update(
+                stock_on_hand=F('stock_on_hand') + Case(
+                    *[When(pk=pk, then=Value(deltas[pk])) for pk in chunk],
+                    output_field=IntegerField(),
+                ),
+                updated_at=now,
+            )
+        for company_id, company_product_ids in corrected.items():
+            transaction.on_commit(partial(stock_changed, company_id, company_product_ids))
+    return dict(corrected)
+
+
+def compact(before, company_ids=None):
+    """
+    Fold movements created before ``before`` into per-product snapshots and
+    delete them. Products without a snapshot are baselined from stock_on_hand
+    (stock recorded before the ledger existed). Returns (snapshots written,
+    movements deleted).
+    """
+    movements = StockMovement.objects.all()
+    if company_ids is not None:
+        movements = movements.filter(company_id__in=company_ids)
+
+    with transaction.atomic():
+        cutoff = movements.filter(created_at__lt=before).aggregate(last=Max('id'))['last']
+        if cutoff is None:
+            return 0, 0
+        folded = movements.filter(id__lte=cutoff)
+        product_ids = set(folded.values_list('product_id', flat=True).distinct())
+        existing = dict(
+            StockSnapshot.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity')
+        )
+
+        # Remaining movements up to the cutoff were never folded before
+        totals = dict(folded.values('product').annotate(total=Sum('quantity')).values_list('product', 'total'))
+        baselines = {}
+        missing = product_ids - set(existing)
+        if missing:
+            later = StockMovement.objects.filter(product=OuterRef('pk'), id__gt=cutoff).values('product') \
+                .annotate(total=Sum('quantity')).values('total')
+            baselines = dict(
+                InventoryProduct.objects.filter(pk__in=missing)
+                .annotate(later=Coalesce(Subquery(later), Value(0)))
+                .values_list('pk', F('stock_on_hand') - F('later'))
+            )
+
+        now = timezone.now()
+        snapshots = [
+            StockSnapshot(
+                product_id=pk,
+                quantity=existing[pk] + totals[pk] if pk in existing else baselines[pk],
+                last_movement_id=cutoff,
+                taken_at=now,
+            )
+            for pk in product_ids
+        ]
+        StockSnapshot.objects.bulk_create(
+            snapshots,
+            batch_size=CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['quantity', 'last_movement_id', 'taken_at'],
+        )
+        deleted, _ = folded.delete()
+    return len(snapshots), deleted
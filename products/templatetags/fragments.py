@@ -0,0 +1,50 @@
+"""
+{% fragment %} caches the enclosed template output (see products.fragments)
+"""
+from django import template
+
+from products import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, section, obj, vary):
+        self.nodelist = nodelist
+        self.section = section
+        self.obj = obj
+        self.vary = vary
+
+    def render(self, context):
+        obj = self.obj.resolve(context)
+        if obj is None:
+            return self.nodelist.render(context)
+        return fragments.get_or_render(
+            self.section.resolve(context),
+            obj,
+            lambda: self.nodelist.render(context),
+            *(part.resolve(context) for part in self.vary),
+        )
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Usage::
+
+        {% fragment 'health_checks' batch %} ... {% endfragment %}
+        {% fragment 'inventory' company request.GET.urlencode %} ... {% endfragment %}
+
+    Extra arguments are added to the cache key.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a section and an object")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -1,3 +1,415 @@
+import io
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from company.models import Company, CompanyMembership
+from products import archive
+from products.benchmarks import seed_farm
+from products.importers import CSV, import_file, open_text
+from products.models import (
+    ArchivedBatch, BatchRollup, BreederType, ChickBatch, ChickStatus, DiseaseCase, DiseaseCatalog, FeedFormula,
+    FeedSchedule, HealthCheck, InventoryProduct, MedicineProduct, MovementKind, StockMovement, TreatmentRecord
+)
+from products.stock import (
+    StockError, adjust, apply_movements, compact, drifted, reconcile, record_opening_stock, with_ledger_balance
+)
+from products.view_benchmarks import run_benchmarks
+
+PASSWORD = 'test-pass'
+
+
+def create_company(name='Test Farm'):
+    """A company whose owner can log in with PASSWORD"""
+    slug = name.lower().replace(' ', '-')
+    owner = get_user_model().objects.create_user(username=slug, password=PASSWORD)
+    company = Company.objects.create(
+        name=name, slug=slug, email=f'{slug}@example.com', city='Town', state_province='State', owner=owner,
+    )
+    CompanyMembership.objects.create(user=owner, company=company, role='OWNER')
+    return company
+
+
+def create_product(company, sku, stock=0):
+    """A product on the ledger, its stock recorded as an opening movement"""
+    product = InventoryProduct.objects.create(company=company, sku=sku, name=sku, stock_on_hand=stock)
+    record_opening_stock(product)
+    return product
+
+
+def stock_of(product):
+    return InventoryProduct.objects.values_list('stock_on_hand', flat=True).get(pk=product.pk)
+
+
+def create_batch(company, initial_count=1000, **fields):
+    fields.setdefault('hatch_date', date(2026, 9, 1))
+    return ChickBatch.objects.create(
+        company=company, breeder_type=BreederType.values[0], initial_count=initial_count,
+        current_count=initial_count, **fields,
+    )
+
+
+class ViewQueryBudgetTests(TestCase):
+    """Every company and products view stays within its query budget"""
+
+    def test_views_within_query_budget(self):
+        # Latency is left to manage.py bench_views; it is too noisy for CI
+        farm = seed_farm(batches=20, days=5, inventory=20)
+        results, problems = run_benchmarks(farm, repeat=1, latency_budget_ms=None)
+        self.assertTrue(results)
+        self.assertEqual(problems, [])
+
+
+class DashboardQueryTests(TestCase):
+    """The dashboard's query count does not grow with the company"""
+
+    def setUp(self):
+        self.company = create_company()
+        self.client.login(username=self.company.owner.username, password=PASSWORD)
+
+    def add_batches(self, count):
+        for _ in range(count):
+            batch = create_batch(self.company)
+            HealthCheck.objects.create(batch=batch, mortality_count=3, average_weight_g=900)
+
+    def dashboard_queries(self):
+        # Cold caches, so both sizes run the same queries
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('company:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_batches(self):
+        self.add_batches(5)
+        queries = self.dashboard_queries()
+        self.add_batches(5)
+        self.assertEqual(self.dashboard_queries(), queries)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        self.product = create_product(self.company, 'FEED-1', stock=10)
+
+    def ledger_stock(self, product):
+        return with_ledger_balance(InventoryProduct.objects.filter(pk=product.pk)).get().ledger_stock
+
+    def test_adjust_applies_a_change_not_a_value(self):
+        stale = InventoryProduct.objects.get(pk=self.product.pk)
+        self.assertEqual(adjust(self.product, MovementKind.RECEIPT, 5), 15)
+        # An instance read before the receipt does not overwrite it
+        self.assertEqual(adjust(stale, MovementKind.ISSUE, 3), 12)
+        self.assertEqual(stock_of(self.product), 12)
+        self.assertEqual(self.ledger_stock(self.product), 12)
+
+    def test_overdraw_applies_nothing(self):
+        other = create_product(self.company, 'FEED-2', stock=10)
+        movements = [
+            StockMovement(product_id=other.pk, kind=MovementKind.RECEIPT, quantity=5),
+            StockMovement(product_id=self.product.pk, kind=MovementKind.ISSUE, quantity=-11),
+        ]
+        with self.assertRaisesMessage(StockError, 'FEED-1 (has 10, change -11)'):
+            apply_movements(self.company, movements)
+        self.assertEqual(stock_of(self.product), 10)
+        self.assertEqual(stock_of(other), 10)
+        self.assertEqual(StockMovement.objects.filter(kind=MovementKind.RECEIPT).count(), 2)
+        self.assertFalse(StockMovement.objects.exclude(kind=MovementKind.RECEIPT).exists())
+
+    def test_other_company_product_is_refused(self):
+        other = create_product(create_company('Other Farm'), 'FEED-1', stock=10)
+        with self.assertRaises(StockError):
+            apply_movements(self.company, [StockMovement(product_id=other.pk, kind=MovementKind.RECEIPT, quantity=1)])
+        self.assertEqual(stock_of(other), 10)
+
+    def test_compact_keeps_the_ledger_balance(self):
+        adjust(self.product, MovementKind.RECEIPT, 5)
+        adjust(self.product, MovementKind.ISSUE, 7)
+        self.assertEqual(compact(timezone.now() + timedelta(seconds=1)), (1, 3))
+        self.assertEqual(self.product.snapshot.quantity, 8)
+        self.assertFalse(StockMovement.objects.exists())
+
+        adjust(self.product, MovementKind.ADJUSTMENT, -2)
+        self.assertEqual(stock_of(self.product), 6)
+        self.assertEqual(self.ledger_stock(self.product), 6)
+        self.assertFalse(drifted(InventoryProduct.objects.all()).exists())
+
+
+class ConsumptionTests(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        self.batch = create_batch(self.company)
+        self.feed = create_product(self.company, 'FEED-1', stock=100)
+        self.formula = FeedFormula.objects.create(name='Starter', breeder_type=BreederType.values[0], sku='FEED-1')
+
+    def schedule(self, quantity_kg, **fields):
+        return FeedSchedule.objects.create(batch=self.batch, formula=self.formula, quantity_kg=quantity_kg, **fields)
+
+    def test_edit_moves_only_the_difference(self):
+        feed = self.schedule(30)
+        self.assertEqual(stock_of(self.feed), 70)
+        feed.quantity_kg = 45
+        feed.save()
+        self.assertEqual(stock_of(self.feed), 55)
+        self.assertEqual(
+            list(feed.stock_movements.order_by('pk').values_list('kind', 'quantity')),
+            [(MovementKind.CONSUMPTION, -30), (MovementKind.CONSUMPTION, -15)],
+        )
+
+    def test_formula_change_returns_stock_to_the_old_sku(self):
+        grower = create_product(self.company, 'FEED-2', stock=100)
+        feed = self.schedule(30)
+        feed.formula = FeedFormula.objects.create(name='Grower', breeder_type=BreederType.values[0], sku='FEED-2')
+        feed.save()
+        self.assertEqual(stock_of(self.feed), 100)
+        self.assertEqual(stock_of(grower), 70)
+
+    def test_delete_returns_the_stock(self):
+        medicine = create_product(self.company, 'MED-1', stock=10)
+        treatment = TreatmentRecord.objects.create(
+            batch=self.batch, medicine=MedicineProduct.objects.create(name='Vaccine', sku='MED-1'), quantity_used=4,
+        )
+        self.schedule(30).delete()
+        self.assertEqual(stock_of(medicine), 6)
+        treatment.delete()
+        self.assertEqual(stock_of(self.feed), 100)
+        self.assertEqual(stock_of(medicine), 10)
+
+    def test_overdraw_leaves_no_record(self):
+        with self.assertRaises(StockError):
+            self.schedule(101)
+        self.assertFalse(FeedSchedule.objects.exists())
+        self.assertEqual(stock_of(self.feed), 100)
+
+    def test_clean_checks_the_stock(self):
+        feed = FeedSchedule(batch=self.batch, formula=self.formula, quantity_kg=101)
+        with self.assertRaisesMessage(ValidationError, 'Insufficient stock: FEED-1 (has 100, change -101)'):
+            feed.clean()
+        # What the record already took counts towards its edit
+        feed = self.schedule(60)
+        feed.quantity_kg = 100
+        feed.clean()
+        feed.quantity_kg = 101
+        with self.assertRaises(ValidationError):
+            feed.clean()
+
+    def test_reconcile_corrects_drift_by_the_difference(self):
+        self.schedule(30)
+        InventoryProduct.objects.filter(pk=self.feed.pk).update(stock_on_hand=50)
+        self.assertEqual(reconcile(InventoryProduct.objects.all()), {self.company.pk: [self.feed.pk]})
+        self.assertEqual(stock_of(self.feed), 70)
+        self.assertFalse(drifted(InventoryProduct.objects.all()).exists())
+
+
+class LiveCountTests(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        self.batch = create_batch(self.company, initial_count=100)
+
+    def check(self, deaths, batch=None, **fields):
+        return HealthCheck.objects.create(
+            batch=batch or self.batch, mortality_count=deaths, average_weight_g=500, **fields,
+        )
+
+    def live(self, batch=None):
+        return ChickBatch.objects.values_list('current_count', flat=True).get(pk=(batch or self.batch).pk)
+
+    def test_create_takes_the_deaths(self):
+        self.check(5, check_date=date(2026, 10, 1))
+        self.check(3, check_date=date(2026, 10, 2))
+        self.assertEqual(self.live(), 92)
+
+    def test_edit_moves_the_difference(self):
+        check = self.check(5)
+        check.mortality_count = 8
+        check.save()
+        self.assertEqual(self.live(), 92)
+        # Loaded without its deaths, the check reads them from its row
+        check = HealthCheck.objects.only('pk', 'batch').get(pk=check.pk)
+        check.mortality_count = 2
+        check.save()
+        self.assertEqual(self.live(), 98)
+
+    def test_edit_of_a_check_built_with_its_pk(self):
+        check = self.check(5)
+        HealthCheck(
+            pk=check.pk, batch=self.batch, mortality_count=7, average_weight_g=500, created_at=check.created_at,
+        ).save()
+        self.assertEqual(self.live(), 93)
+
+    def test_batch_change_gives_the_deaths_back(self):
+        other = create_batch(self.company, initial_count=50)
+        check = self.check(5)
+        check.batch = other
+        check.save()
+        self.assertEqual(self.live(), 100)
+        self.assertEqual(self.live(other), 45)
+
+    def test_delete_gives_the_deaths_back(self):
+        self.check(5).delete()
+        self.assertEqual(self.live(), 100)
+
+    def test_deaths_past_the_live_count_are_rejected(self):
+        check = self.check(60)
+        with self.assertRaisesMessage(ValidationError, f"Batch #{self.batch.pk} has only 40 live birds."):
+            HealthCheck(batch=self.batch, mortality_count=41, average_weight_g=500).clean()
+        # The check's own deaths are available to its edit
+        check.mortality_count = 100
+        check.clean()
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        self.batch = create_batch(self.company, initial_count=100)
+
+    def import_csv(self, kind, content, **options):
+        data = content if isinstance(content, bytes) else content.encode()
+        return import_file(kind, open_text(io.BytesIO(data)), CSV, self.company, **options)
+
+    def test_rows_are_validated_individually(self):
+        other = create_batch(create_company('Other Farm'))
+        result = self.import_csv('health_checks', (
+            'batch,check_date,mortality_count,diseased_count,average_weight_g\n'
+            f'{self.batch.pk},2026-10-01,5,0,500\n'
+            f'{self.batch.pk},2026-10-02,-1,0,500\n'
+            f'{other.pk},2026-10-01,1,0,500\n'
+            f'{self.batch.pk},2026-10-03,96,0,500\n'
+        ))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row for row, _ in result.errors], [2, 3, 4])
+        self.assertIn('does not belong to your company', result.errors[1][1])
+        self.assertEqual(result.errors[2][1], f"mortality_count: Batch #{self.batch.pk} has only 95 live birds.")
+        self.assertEqual(ChickBatch.objects.get(pk=self.batch.pk).current_count, 95)
+
+    def test_bad_encoding_is_reported(self):
+        result = self.import_csv('health_checks', 'batch,notes\n1,caf\u00e9\n'.encode('latin-1'))
+        self.assertEqual(result.fatal_error, "The file is not UTF-8 text; save it as UTF-8 and upload it again.")
+        self.assertEqual(result.imported, 0)
+
+    def test_malformed_csv_keeps_the_rows_before_it(self):
+        result = self.import_csv('health_checks', (
+            'batch,check_date,mortality_count,diseased_count,average_weight_g,notes\n'
+            f'{self.batch.pk},2026-10-01,5,0,500,\n'
+            f'{self.batch.pk},2026-10-02,5,0,500,{"x" * 200000}\n'
+        ), chunk_size=1)
+        self.assertTrue(result.fatal_error.startswith('Invalid CSV after line 2: field larger than field limit'))
+        self.assertEqual(result.created, 1)
+
+    def test_failed_chunk_reports_its_rows(self):
+        create_product(self.company, 'FEED-1', stock=100)
+        FeedFormula.objects.create(name='Starter', breeder_type=BreederType.values[0], sku='FEED-1')
+        result = self.import_csv('feed_schedules', (
+            'batch,formula,date,quantity_kg\n'
+            f'{self.batch.pk},Starter,2026-10-01,60\n'
+            f'{self.batch.pk},Starter,2026-10-02,30\n'
+            f'{self.batch.pk},Starter,2026-10-03,20\n'
+            f'{self.batch.pk},Unknown,2026-10-04,1\n'
+        ), chunk_size=2)
+        self.assertEqual(result.created, 2)
+        errors = dict(result.errors)
+        self.assertEqual(sorted(errors), [3, 4])
+        self.assertTrue(errors[3].startswith('Not saved, chunk failed: Insufficient stock: FEED-1'))
+        # A row rejected before the write is reported once, for its own error
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual(errors[4], "formula: Unknown feed formula 'Unknown'.")
+        self.assertEqual(FeedSchedule.objects.count(), 2)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(archive, 'ARCHIVE_ROOT', Path(directory.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.company = create_company()
+        self.open_batch = create_batch(self.company)
+        self.batch = create_batch(self.company, initial_count=100)
+        create_product(self.company, 'FEED-1', stock=100)
+        self.children = {
+            'health_checks': HealthCheck.objects.create(batch=self.batch, mortality_count=4, average_weight_g=500),
+            'feed_schedules': FeedSchedule.objects.create(
+                batch=self.batch, quantity_kg=30,
+                formula=FeedFormula.objects.create(name='Starter', breeder_type=BreederType.values[0], sku='FEED-1'),
+            ),
+            'treatments': TreatmentRecord.objects.create(
+                batch=self.batch, medicine=MedicineProduct.objects.create(name='Vaccine'),
+            ),
+            'disease_cases': DiseaseCase.objects.create(
+                batch=self.batch, disease=DiseaseCatalog.objects.create(name='Coccidiosis', severity=3),
+            ),
+        }
+        self.batch.status = ChickStatus.SOLD
+        self.batch.save(update_fields=['status'])
+        ChickBatch.objects.filter(pk=self.batch.pk).update(closed_at=timezone.now() - timedelta(days=400))
+
+    def test_archive_moves_closed_batches_out(self):
+        self.assertEqual(archive.archive(days=365), {self.company.pk: 1})
+        self.assertEqual(list(ChickBatch.objects.values_list('pk', flat=True)), [self.open_batch.pk])
+        for name, model in archive.CHILDREN.items():
+            self.assertFalse(model.objects.exists(), name)
+        summary = ArchivedBatch.objects.get(batch_id=self.batch.pk)
+        self.assertEqual((summary.final_count, summary.total_mortality, summary.total_feed_kg), (96, 4, 30))
+        # The ledger keeps the feed drawn, unlinked from the archived record
+        self.assertTrue(StockMovement.objects.filter(kind=MovementKind.CONSUMPTION, feed_schedule=None).exists())
+
+    def test_restore_recreates_the_rows_with_their_pks(self):
+        archive.archive(days=365)
+        self.assertEqual(archive.restore([self.batch.pk]), [self.batch.pk])
+
+        batch = ChickBatch.objects.get(pk=self.batch.pk)
+        self.assertEqual((batch.status, batch.current_count), (ChickStatus.SOLD, 96))
+        for name, record in self.children.items():
+            restored = getattr(batch, name).get()
+            self.assertEqual((restored.pk, restored.company_id), (record.pk, self.company.pk), name)
+        self.assertEqual(BatchRollup.objects.get(batch=batch).cumulative_mortality, 4)
+        self.assertFalse(ArchivedBatch.objects.exists())
+        # Closed anew on restore, so the next run leaves it
+        self.assertEqual(archive.archive(days=365), {})
+
+
+class ApiETagTests(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        self.client.login(username=self.company.owner.username, password=PASSWORD)
+        self.batch = create_batch(self.company)
+        self.disease = DiseaseCatalog.objects.create(name='Coccidiosis', severity=3)
+        DiseaseCase.objects.create(batch=self.batch, disease=self.disease)
+
+    def get(self, resource, etag=None, **params):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('products:api_list', args=[resource]), params, headers=headers)
+
+    def test_unchanged_rows_are_not_modified(self):
+        etag = self.get('disease_cases')['ETag']
+        response = self.get('disease_cases', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_joined_row_change_changes_the_etag(self):
+        etag = self.get('disease_cases', fields='id,disease__name')['ETag']
+        self.disease.name = 'Coccidiosis (Eimeria)'
+        self.disease.save()
+        response = self.get('disease_cases', etag, fields='id,disease__name')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['disease__name'], 'Coccidiosis (Eimeria)')
 
-# Create your tests here.
+    def test_live_count_change_changes_the_etag(self):
+        etag = self.get('batches')['ETag']
+        HealthCheck.objects.create(batch=self.batch, mortality_count=3, average_weight_g=500)
+        response = self.get('batches', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['current_count'], 997)
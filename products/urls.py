@@ -1,13 +1,15 @@
 from django.urls import path
 from products.views import (
-    BatchListView, BatchCreateView, BatchDetailView,
+    BatchListView, BatchCreateView, BatchDetailView, AsyncBatchDetailView,
     HealthCheckCreateView, FeedFormulaListView, FeedFormulaCreateView,
     FeedScheduleCreateView, MedicineListView, MedicineCreateView,
     TreatmentCreateView, DiseaseCatalogListView, DiseaseCatalogCreateView,
     DiseaseCaseCreateView, InventoryListView, InventoryCreateView,
     BatchUpdateView, BatchDeleteView, FeedFormulaUpdateView, FeedFormulaDeleteView,
     MedicineUpdateView, MedicineDeleteView, DiseaseCatalogUpdateView, DiseaseCatalogDeleteView,
-    InventoryUpdateView, InventoryDeleteView
+    InventoryUpdateView, InventoryDeleteView, BulkImportView, ExportView,
+    BatchAnalyticsView, CompanyAnalyticsView, ApiListView, ApiDetailView, SearchView, SearchApiView,
+    StockMovementBulkView, CompanyTrendsView, DailyRoundView,
 )
 
 app_name = 'products'
@@ -17,12 +19,18 @@ urlpatterns = [
     path('batches/list/', BatchListView.as_view(), name='batch_list'),
     path('batches/create/', BatchCreateView.as_view(), name='batch_create'),
     path('batches/<int:pk>/detail/', BatchDetailView.as_view(), name='batch_detail'),
+    path('batches/<int:pk>/detail/async/', AsyncBatchDetailView.as_view(), name='batch_detail_async'),
     path('batches/<int:pk>/edit/', BatchUpdateView.as_view(), name='batch_update'),
     path('batches/<int:pk>/delete/', BatchDeleteView.as_view(), name='batch_delete'),
+    path('batches/rounds/', DailyRoundView.as_view(), name='daily_round'),
     path('batches/<int:batch_pk>/health/add/', HealthCheckCreateView.as_view(), name='health_check_add'),
     path('batches/<int:batch_pk>/feed/add/', FeedScheduleCreateView.as_view(), name='feed_schedule_add'),
     path('batches/<int:batch_pk>/treatment/add/', TreatmentCreateView.as_view(), name='treatment_add'),
     path('batches/<int:batch_pk>/disease/add/', DiseaseCaseCreateView.as_view(), name='disease_case_add'),
+    path('batches/import/', BulkImportView.as_view(), name='bulk_import'),
+    path('batches/<int:pk>/analytics/', BatchAnalyticsView.as_view(), name='batch_analytics'),
+    path('batches/analytics/', CompanyAnalyticsView.as_view(), name='company_analytics'),
+    path('batches/analytics/trends/', CompanyTrendsView.as_view(), name='company_trends'),
 
     # Feed formulas
     path('feed/formulas/list/', FeedFormulaListView.as_view(), name='feed_formula_list'),
@@ -47,4 +55,16 @@ urlpatterns = [
     path('inventory/create/', InventoryCreateView.as_view(), name='inventory_create'),
     path('inventory/<int:pk>/edit/', InventoryUpdateView.as_view(), name='inventory_update'),
     path('inventory/<int:pk>/delete/', InventoryDeleteView.as_view(), name='inventory_delete'),
+    path('inventory/movements/', StockMovementBulkView.as_view(), name='stock_movements'),
+
+    # Exports
+    path('exports/<slug:dataset>/', ExportView.as_view(), name='export'),
+
+    # Search
+    path('search/', SearchView.as_view(), name='search'),
+    path('search/api/', SearchApiView.as_view(), name='search_api'),
+
+    # JSON API
+    path('api/<slug:resource>/', ApiListView.as_view(), name='api_list'),
+    path('api/<slug:resource>/<int:pk>/', ApiDetailView.as_view(), name='api_detail'),
 ]
@@ -0,0 +1,176 @@
+"""
+Query-count and latency benchmarks for every company and products URL.
+
+Each URL pattern in ``company.urls`` and ``products.urls`` is expanded into
+one or more cases using a seeded Farm (see products.benchmarks). Each case is
+requested through the test client as the farm's owner and measured: query
+count, SQL time, total time and response size. A case fails when it goes over
+its query or latency budget, or over the query count recorded in a previous
+baseline. Query budgets do not depend on scale, so an N+1 shows up as a
+failure once the seeded data grows.
+"""
+import json
+import statistics
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import get_resolver, reverse
+
+from products.api import RESOURCES
+from products.benchmarks import measure
+from products.exports import DATASETS
+
+URLCONFS = ('company.urls', 'products.urls')
+
+DEFAULT_QUERY_BUDGET = 8
+DEFAULT_LATENCY_BUDGET_MS = 500
+
+# Views that legitimately need more queries than the default
+QUERY_BUDGETS = {
+    'company:dashboard': 10,
+    'company:dashboard_async': 10,
+    'products:batch_detail': 12,
+    'products:batch_detail_async': 12,
+}
+
+
+def _one(kwargs):
+    return lambda farm: [kwargs(farm)]
+
+
+# Builds the URL kwargs for every pattern that takes arguments
+URL_KWARGS = {
+    'products:batch_detail': _one(lambda farm: {'pk': farm.batch.pk}),
+    'products:batch_detail_async': _one(lambda farm: {'pk': farm.batch.pk}),
+    'products:batch_update': _one(lambda farm: {'pk': farm.batch.pk}),
+    'products:batch_delete': _one(lambda farm: {'pk': farm.batch.pk}),
+    'products:batch_analytics': _one(lambda farm: {'pk': farm.batch.pk}),
+    'products:health_check_add': _one(lambda farm: {'batch_pk': farm.batch.pk}),
+    'products:feed_schedule_add': _one(lambda farm: {'batch_pk': farm.batch.pk}),
+    'products:treatment_add': _one(lambda farm: {'batch_pk': farm.batch.pk}),
+    'products:disease_case_add': _one(lambda farm: {'batch_pk': farm.batch.pk}),
+    'products:feed_formula_update': _one(lambda farm: {'pk': farm.formula.pk}),
+    'products:feed_formula_delete': _one(lambda farm: {'pk': farm.formula.pk}),
+    'products:medicine_update': _one(lambda farm: {'pk': farm.medicine.pk}),
+    'products:medicine_delete': _one(lambda farm: {'pk': farm.medicine.pk}),
+    'products:disease_catalog_update': _one(lambda farm: {'pk': farm.disease.pk}),
+    'products:disease_catalog_delete': _one(lambda farm: {'pk': farm.disease.pk}),
+    'products:inventory_update': _one(lambda farm: {'pk': farm.products[0].pk}),
+    'products:inventory_delete': _one(lambda farm: {'pk': farm.products[0].pk}),
+    'products:export': lambda farm: [{'dataset': name} for name in DATASETS],
+    'products:api_list': lambda farm: [{'resource': name} for name in RESOURCES],
+    'products:api_detail': lambda farm: [
+        {'resource': 'batches', 'pk': farm.batch.pk},
+        {'resource': 'inventory', 'pk': farm.products[0].pk},
+    ],
+}
+
+
+class ViewCase:
+    def __init__(self, name, url, query_budget, latency_budget_ms):
+        self.name = name
+        self.url = url
+        self.query_budget = query_budget
+        self.latency_budget_ms = latency_budget_ms
+
+
+def url_names():
+    """Namespaced names of every pattern in URLCONFS, with whether they take arguments"""
+    names = []
+    for urlconf in URLCONFS:
+        resolver = get_resolver(urlconf)
+        namespace = resolver.urlconf_module.app_name
+        for pattern in resolver.url_patterns:
+            names.append((f'{namespace}:{pattern.name}', bool(pattern.pattern.converters)))
+    return names
+
+
+def build_cases(farm, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS):
+    """
+    One case per URL (several for parametrised ones). Raises LookupError for a
+    pattern with arguments that URL_KWARGS does not cover, so new views cannot
+    silently escape the benchmark.
+    """
+    cases = []
+    for name, takes_arguments in url_names():
+        if not takes_arguments:
+            variants = [{}]
+        elif name in URL_KWARGS:
+            variants = URL_KWARGS[name](farm)
+        else:
+            raise LookupError(f"No benchmark arguments for URL '{name}'; add it to URL_KWARGS")
+        for kwargs in variants:
+            label = name if not kwargs else f"{name}[{','.join(str(v) for v in kwargs.values())}]"
+            cases.append(ViewCase(
+                label,
+                reverse(name, kwargs=kwargs),
+                QUERY_BUDGETS.get(name, DEFAULT_QUERY_BUDGET),
+                latency_budget_ms,
+            ))
+    return cases
+
+
+def run_case(client, user, case, repeat=3):
+    """Request ``case`` once to warm caches, then ``repeat`` measured times"""
+    runs = []
+    for i in range(repeat + 1):
+        # Log in again every time: the logout view ends the session
+        client.force_login(user)
+        with measure() as result:
+            response = client.get(case.url)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        result['status'] = response.status_code
+        result['bytes'] = len(content)
+        if i:
+            runs.append(result)
+    return {
+        'url': case.url,
+        'status': runs[-1]['status'],
+        'queries': max(run['queries'] for run in runs),
+        'sql_ms': round(statistics.median(run['sql_ms'] for run in runs), 2),
+        'total_ms': round(statistics.median(run['total_ms'] for run in runs), 2),
+        'bytes': runs[-1]['bytes'],
+        'query_budget': case.query_budget,
+        'latency_budget_ms': case.latency_budget_ms,
+    }
+
+
+def check(name, result, baseline=None):
+    """Budget violations of one result, as messages"""
+    problems = []
+    if result['status'] >= 400:
+        problems.append(f"{name}: HTTP {result['status']}")
+    if result['queries'] > result['query_budget']:
+        problems.append(f"{name}: {result['queries']} queries, budget {result['query_budget']}")
+    if result['latency_budget_ms'] is not None and result['total_ms'] > result['latency_budget_ms']:
+        problems.append(f"{name}: {result['total_ms']:.0f} ms, budget {result['latency_budget_ms']} ms")
+    previous = (baseline or {}).get(name)
+    if previous and result['queries'] > previous['queries']:
+        problems.append(f"{name}: {result['queries']} queries, baseline {previous['queries']}")
+    return problems
+
+
+def run_benchmarks(farm, repeat=3, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS, baseline=None):
+    """Benchmark every case for ``farm``; returns (results by case name, problems)"""
+    client = Client()
+    user = farm.company.owner
+    results = {}
+    problems = []
+    # The test client's host is only allowed automatically under the test runner
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for case in build_cases(farm, latency_budget_ms):
+            results[case.name] = run_case(client, user, case, repeat)
+            problems += check(case.name, results[case.name], baseline)
+    return results, problems
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['views']
+
+
+def write_baseline(path, results, **meta):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'views': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
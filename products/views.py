@@ -1,60 +1,55 @@
-from django.shortcuts import redirect, get_object_or_404
-from django.urls import reverse_lazy
+import json
+from datetime import timedelta
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, get_object_or_404, resolve_url
+from django.template.response import TemplateResponse
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
+from django.views import View
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 
 from products.models import (
     ChickBatch, HealthCheck, FeedFormula, FeedSchedule,
     MedicineProduct, TreatmentRecord, DiseaseCatalog, DiseaseCase,
-    InventoryProduct
+    InventoryProduct, MovementKind, SearchKind, StockMovement, CompanyDailySnapshot
 )
 from products.forms import (
     ChickBatchForm, HealthCheckForm, FeedFormulaForm, FeedScheduleForm,
     MedicineProductForm, TreatmentRecordForm, DiseaseCatalogForm, DiseaseCaseForm,
-    InventoryProductForm
+    InventoryProductForm, StockMovementForm, BulkImportForm, DailyRoundFormSet, RoundDateForm
 )
-from company.models import Company
+from products.analytics import batch_analytics, company_analytics
+from products.api import RESOURCES, ApiError, compute_etag, paginate, parse_limit
+from products.asyncdb import gather_queries
+from products.importers import ImportFormatError, detect_format, import_file, open_text
+from products.exports import CONTENT_TYPES, CSV, DATASETS, stream_export
+from products.pagination import KeysetPaginator, InvalidCursor, NEXT, PREVIOUS
+from products.rounds import initial_row, live_count, new_deaths, record_round, round_batches
+from products.search import search
+from products.snapshots import METRICS as TREND_METRICS, trends
+from products.stock import (
+    MAX_BULK_MOVEMENTS, StockError, adjust, apply_movements, record_opening_stock
+)
+from products.stats import InventorySummary, batch_aggregates, get_inventory_summary
+from company.tenancy import aget_request_tenancy, get_request_company
 
 
 class CompanyScopedMixin:
     """Mixin to scope querysets to user's company"""
 
     def get_user_company(self):
-        """Get the company associated with the current user"""
-        user = self.request.user
-
-        # Option 1: Direct ForeignKey from User to Company (most common)
-        if hasattr(user, 'company') and user.company:
-            return user.company
-
-        # Option 2: Check if User has a company attribute (OneToOne or ForeignKey)
-        try:
-            return user.company
-        except (AttributeError, Company.DoesNotExist):
-            pass
-
-        # Option 3: Try to find a company where user is the owner
-        try:
-            return Company.objects.get(owner=user)
-        except (Company.DoesNotExist, AttributeError):
-            pass
-
-        # Option 4: Try to get through related name
-        try:
-            # If Company has a OneToOneField to User named 'user_profile'
-            return Company.objects.get(user=user)
-        except (Company.DoesNotExist, AttributeError):
-            pass
-
-        # Option 5: Check if user is associated with any company
-        if hasattr(user, 'companies') and user.companies.exists():
-            return user.companies.first()
-
-        # Return None if no company found
-        return None
+        """Get the company associated with the current user (resolved once per request)"""
+        return get_request_company(self.request)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -90,6 +85,39 @@ class BatchListView(LoginRequiredMixin, CompanyScopedMixin, ListView):
     template_name = 'batch/batch_list.html'
     context_object_name = 'batches'
     login_url = 'company:login'
+    paginate_by = 25
+    ordering = ('-hatch_date', '-id')
+
+    def get_queryset(self):
+        # Latest health check comes from the precomputed rollup, not a query per row
+        return super().get_queryset().with_list_metrics().select_related('rollup__latest_check')
+
+    def paginate_queryset(self, queryset, page_size):
+        """Cursor pagination on (hatch_date, id): every page costs one query"""
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.ordering)
+        direction = self.request.GET.get('dir', NEXT)
+        try:
+            page = paginator.page(self.request.GET.get('cursor') or None, direction)
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        company = self.get_user_company()
+        if company is None:
+            return ctx
+        # The cards cover every batch, not just this page: one aggregate query
+        totals = batch_aggregates(company)
+        ctx.update(
+            total_batches=totals['total_batches'],
+            active_batches_count=totals['active_batches'],
+            total_chicks=totals['total_chicks'],
+            avg_survival_rate=round(totals['total_chicks'] / totals['total_initial'] * 100, 1)
+            if totals['total_initial'] else 0,
+            attention_needed=totals['high_mortality_batches'],
+        )
+        return ctx
 
 class BatchCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
     model = ChickBatch
@@ -111,13 +139,99 @@ class BatchDetailView(LoginRequiredMixin, CompanyScopedMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        batch = self.object
-        ctx['health_checks'] = batch.health_checks.all()
-        ctx['feed_schedules'] = batch.feed_schedules.select_related('formula').all()
-        ctx['treatments'] = batch.treatments.select_related('medicine').all()
-        ctx['disease_cases'] = batch.disease_cases.select_related('disease').all()
+        # Lazy: a tab served from the fragment cache never runs its query
+        ctx.update(batch_detail_querysets(self.object))
+        ctx['analytics'] = batch_analytics(self.object)['summary']
         return ctx
 
+def batch_detail_querysets(batch):
+    """The related rows listed in the batch detail tabs"""
+    return {
+        'health_checks': batch.health_checks.all(),
+        'feed_schedules': batch.feed_schedules.select_related('formula').all(),
+        'treatments': batch.treatments.select_related('medicine').all(),
+        'disease_cases': batch.disease_cases.select_related('disease').all(),
+    }
+
+def batch_detail_queries(batch):
+    """The batch detail page's independent queries, as zero-argument callables by name"""
+    queries = {name: partial(list, qs) for name, qs in batch_detail_querysets(batch).items()}
+    queries['analytics'] = lambda: batch_analytics(batch)['summary']
+    return queries
+
+class AsyncBatchDetailView(View):
+    """
+    Batch detail as an async view: the related lists and the analytics load
+    concurrently (see products.asyncdb) instead of one after another.
+    """
+    template_name = 'batch/batch_detail.html'
+    login_url = 'company:login'
+
+    async def get(self, request, pk):
+        # LoginRequiredMixin.dispatch is sync, so check the user here
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), resolve_url(self.login_url))
+        request.user = user
+
+        company = (await aget_request_tenancy(request)).company
+        batch = await ChickBatch.objects.filter(company=company, pk=pk).afirst() if company else None
+        if batch is None:
+            raise Http404('No batch found matching the query')
+
+        queries = batch_detail_queries(batch)
+        context = dict(zip(queries, await gather_queries(*queries.values())))
+        context.update({'batch': batch, 'object': batch, 'view': self})
+        return TemplateResponse(request, self.template_name, context)
+
+class BatchAnalyticsView(LoginRequiredMixin, CompanyScopedMixin, DetailView):
+    """FCR, ADG and mortality curves of one batch as JSON"""
+    model = ChickBatch
+    login_url = 'company:login'
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse({'batch': self.object.pk, **batch_analytics(self.object)})
+
+class CompanyAnalyticsView(LoginRequiredMixin, CompanyScopedMixin, View):
+    """Latest FCR, ADG and mortality of every active batch as JSON"""
+    login_url = 'company:login'
+
+    def get(self, request):
+        company = self.get_user_company()
+        if not company:
+            raise Http404('No company.')
+        batches = company_analytics(company)
+        return JsonResponse({'batches': [{'batch': pk, **values} for pk, values in batches.items()]})
+
+class CompanyTrendsView(LoginRequiredMixin, CompanyScopedMixin, View):
+    """
+    Daily KPI series from the company's snapshots, for charts:
+    ``?days=`` back from today (default 365), ``?metrics=a,b`` (default all)
+    """
+    login_url = 'company:login'
+    max_days = 3 * 365
+
+    def get(self, request):
+        company = self.get_user_company()
+        if not company:
+            raise Http404('No company.')
+        days = request.GET.get('days', '365')
+        metrics = [name for name in request.GET.get('metrics', '').split(',') if name] or TREND_METRICS
+        if not days.isdigit() or not 1 <= int(days) <= self.max_days:
+            return JsonResponse({'error': f'days must be between 1 and {self.max_days}.'}, status=400)
+        unknown = set(metrics) - set(TREND_METRICS)
+        if unknown:
+            return JsonResponse({'error': f"Unknown metrics: {', '.join(sorted(unknown))}."}, status=400)
+
+        since = timezone.localdate() - timedelta(days=int(days) - 1)
+        snapshots = CompanyDailySnapshot.objects.filter(company=company, date__gte=since)
+        etag = compute_etag(snapshots, since, metrics)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse({'since': since, **trends(company, since, metrics)})
+        response['ETag'] = etag
+        return response
+
 class BatchUpdateView(LoginRequiredMixin, CompanyScopedMixin, UpdateView):
     model = ChickBatch
     form_class = ChickBatchForm
@@ -125,6 +239,12 @@ class BatchUpdateView(LoginRequiredMixin, CompanyScopedMixin, UpdateView):
     login_url = 'company:login'
     success_url = reverse_lazy('products:batch_list')
 
+    def form_valid(self, form):
+        # Write only the edited fields, so a check saved meanwhile keeps its deaths
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=[*form.Meta.fields, 'updated_at'])
+        return redirect(self.get_success_url())
+
 class BatchDeleteView(LoginRequiredMixin, CompanyScopedMixin, DeleteView):
     model = ChickBatch
     template_name = 'batch/batch_confirm_delete.html'
@@ -148,11 +268,17 @@ class HealthCheckCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
         self.batch = get_object_or_404(ChickBatch, pk=kwargs['batch_pk'])
         # Verify batch belongs to user's company
         company = self.get_user_company()
-        if company and self.batch.company != company:
+        if company and self.batch.company_id != company.pk:
             messages.error(request, 'Access denied: This batch does not belong to your company.')
             return redirect('company:dashboard')
         return super().dispatch(request, *args, **kwargs)
 
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        # Before validation: HealthCheck.clean checks the deaths against the batch
+        form.instance.batch = self.batch
+        return form
+
     def form_valid(self, form):
         hc = form.save(commit=False)
         hc.batch = self.batch
@@ -165,6 +291,68 @@ class HealthCheckCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
         ctx['batch'] = self.batch
         return ctx
 
+class DailyRoundView(LoginRequiredMixin, CompanyScopedMixin, TemplateView):
+    """
+    Health checks for every active batch of the company on one page
+    (``?check_date=``, default today), validated and saved together
+    """
+    template_name = 'products/daily_round.html'
+    login_url = 'company:login'
+    prefix = 'rows'
+
+    def get_round_date(self, data):
+        date_form = RoundDateForm(data if 'check_date' in data else None, initial={'check_date': timezone.localdate()})
+        day = date_form.cleaned_data['check_date'] if date_form.is_valid() else timezone.localdate()
+        return date_form, day
+
+    def get(self, request, *args, **kwargs):
+        company = self.get_user_company()
+        if not company:
+            raise Http404('No company.')
+        date_form, day = self.get_round_date(request.GET)
+        batches = round_batches(company, day)
+        formset = DailyRoundFormSet(initial=[initial_row(batch) for batch in batches], prefix=self.prefix)
+        return self.render_to_response(self.get_context_data(date_form=date_form, day=day, formset=formset, batches=batches))
+
+    def post(self, request, *args, **kwargs):
+        company = self.get_user_company()
+        if not company:
+            raise Http404('No company.')
+        date_form, day = self.get_round_date(request.POST)
+        batches = round_batches(company, day)
+        by_id = {batch.pk: batch for batch in batches}
+        formset = DailyRoundFormSet(request.POST, prefix=self.prefix)
+
+        rows = []
+        if date_form.is_valid() and formset.is_valid():
+            for form in formset:
+                if not form.included:
+                    continue
+                data = form.cleaned_data
+                batch = by_id.get(data['batch'])
+                if batch is None:
+                    form.add_error(None, f"Batch {data['batch']} is not an active batch of your company.")
+                elif new_deaths(batch, data['mortality_count']) > live_count(batch):
+                    form.add_error('mortality_count', f"Batch #{batch.pk} has only {live_count(batch)} live birds.")
+                else:
+                    rows.append(data)
+
+        if not rows or not formset.is_valid():
+            if date_form.is_valid() and formset.is_valid():
+                messages.warning(request, 'No batches were ticked; nothing was saved.')
+            return self.render_to_response(self.get_context_data(date_form=date_form, day=day, formset=formset, batches=batches))
+
+        created, updated = record_round(day, rows, by_id)
+        messages.success(request, f'Daily round saved: {created} health checks added, {updated} updated.')
+        return redirect(f"{reverse('products:daily_round')}?check_date={day.isoformat()}")
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        # Each form next to its batch; matched by id since a posted round may predate a status change
+        by_id = {str(batch.pk): batch for batch in ctx['batches']}
+        ctx['rows'] = [(by_id.get(str(form['batch'].value())), form) for form in ctx['formset']]
+        return ctx
+
 # ---------------------------------------------------------------------------
 # Feed Formula List/Create & Feed Schedule Create
 # ---------------------------------------------------------------------------
@@ -198,7 +386,7 @@ class FeedScheduleCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView)
         self.batch = get_object_or_404(ChickBatch, pk=kwargs['batch_pk'])
         # Verify batch belongs to user's company
         company = self.get_user_company()
-        if company and self.batch.company != company:
+        if company and self.batch.company_id != company.pk:
             messages.error(request, 'Access denied: This batch does not belong to your company.')
             return redirect('company:dashboard')
         return super().dispatch(request, *args, **kwargs)
@@ -206,7 +394,12 @@ class FeedScheduleCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView)
     def form_valid(self, form):
         fs = form.save(commit=False)
         fs.batch = self.batch
-        fs.save()
+        try:
+            with transaction.atomic():
+                fs.save()
+        except StockError as e:
+            form.add_error('quantity_kg', str(e))
+            return self.form_invalid(form)
         messages.success(self.request, 'Feed schedule added.')
         return redirect('products:batch_detail', pk=self.batch.pk)
 
@@ -292,7 +485,7 @@ class TreatmentCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
         self.batch = get_object_or_404(ChickBatch, pk=kwargs['batch_pk'])
         # Verify batch belongs to user's company
         company = self.get_user_company()
-        if company and self.batch.company != company:
+        if company and self.batch.company_id != company.pk:
             messages.error(request, 'Access denied: This batch does not belong to your company.')
             return redirect('company:dashboard')
         return super().dispatch(request, *args, **kwargs)
@@ -300,7 +493,12 @@ class TreatmentCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
     def form_valid(self, form):
         tr = form.save(commit=False)
         tr.batch = self.batch
-        tr.save()
+        try:
+            with transaction.atomic():
+                tr.save()
+        except StockError as e:
+            form.add_error('quantity_used', str(e))
+            return self.form_invalid(form)
         messages.success(self.request, 'Treatment recorded.')
         return redirect('products:batch_detail', pk=self.batch.pk)
 
@@ -362,7 +560,7 @@ class DiseaseCaseCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
         self.batch = get_object_or_404(ChickBatch, pk=kwargs['batch_pk'])
         # Verify batch belongs to user's company
         company = self.get_user_company()
-        if company and self.batch.company != company:
+        if company and self.batch.company_id != company.pk:
             messages.error(request, 'Access denied: This batch does not belong to your company.')
             return redirect('company:dashboard')
         return super().dispatch(request, *args, **kwargs)
@@ -410,7 +608,7 @@ class InventoryListView(LoginRequiredMixin, CompanyScopedMixin, ListView):
             queryset = queryset.filter(stock_on_hand__gt=0)
         elif status == 'low_stock':
             queryset = queryset.filter(stock_on_hand__gt=0).filter(
-                stock_on_hand__lte=models.F('reorder_point')
+                stock_on_hand__lte=F('reorder_point')
             )
         elif status == 'out_of_stock':
             queryset = queryset.filter(stock_on_hand=0)
@@ -422,49 +620,23 @@ class InventoryListView(LoginRequiredMixin, CompanyScopedMixin, ListView):
         if not self.request.GET.get('show_inactive'):
             queryset = queryset.filter(is_active=True)
 
-        return queryset.order_by('category', 'name')
+        # Margin is computed per row in SQL
+        return queryset.with_margin().order_by('category', 'name')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        products = context['products']
-
         company = self.get_user_company()
 
-        # Get all products for stats (unfiltered)
-        all_products = super().get_queryset()
-
-        # Filter by company if model has company field
-        if hasattr(InventoryProduct, 'company') and company:
-            all_products = all_products.filter(company=company)
-
-        # Filter active products for stats
-        all_active_products = all_products.filter(is_active=True)
-
-        # Calculate stats
-        in_stock = sum(1 for p in all_active_products if p.stock_on_hand > 0)
-        low_stock = sum(1 for p in all_active_products if p.needs_reorder and p.stock_on_hand > 0)
-        out_of_stock = sum(1 for p in all_active_products if p.stock_on_hand == 0)
-
-        # Calculate total inventory value
-        total_value = sum(
-            (p.stock_on_hand * p.cost_price) for p in all_active_products
-        )
-
-        # Calculate margin for each product
-        for product in products:
-            if product.sale_price > 0 and product.cost_price > 0:
-                margin = ((product.sale_price - product.cost_price) / product.cost_price) * 100
-                product.margin_percentage = margin
-            else:
-                product.margin_percentage = 0
+        # Summary figures for all active products (unfiltered), one cached aggregate
+        summary = get_inventory_summary(company) if company else InventorySummary()
 
         context.update({
-            'in_stock_count': in_stock,
-            'low_stock_count': low_stock,
-            'out_of_stock_count': out_of_stock,
-            'reorder_count': low_stock,  # Same as low stock
-            'categories_count': all_active_products.values('category').distinct().count(),
-            'total_inventory_value': total_value,
+            'in_stock_count': summary.in_stock,
+            'low_stock_count': summary.low_stock,
+            'out_of_stock_count': summary.out_of_stock,
+            'reorder_count': summary.low_stock,  # Same as low stock
+            'categories_count': summary.categories,
+            'total_inventory_value': summary.total_value,
             'category_choices': InventoryProduct._meta.get_field('category').choices,
             'user_company': company,  # Pass company to template
         })
@@ -481,8 +653,11 @@ class InventoryCreateView(LoginRequiredMixin, CompanyScopedMixin, CreateView):
 
     def form_valid(self, form):
         # CompanyScopedMixin will handle setting the company
+        response = super().form_valid(form)
+        if form.instance.pk and form.instance.stock_on_hand:
+            record_opening_stock(form.instance, self.request.user)
         messages.success(self.request, 'Inventory product created successfully.')
-        return super().form_valid(form)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -512,8 +687,23 @@ class InventoryUpdateView(LoginRequiredMixin, CompanyScopedMixin, UpdateView):
         return qs
 
     def form_valid(self, form):
+        product = form.save(commit=False)
+        expected = form.cleaned_data.get('expected_stock')
+        if expected is None:
+            expected = form.initial['stock_on_hand']
+        delta = form.cleaned_data['stock_on_hand'] - expected
+        fields = [name for name in form._meta.fields if name != 'stock_on_hand']
+        try:
+            with transaction.atomic():
+                product.save(update_fields=[*fields, 'updated_at'])
+                if delta:
+                    # Applied as a change, not the typed total, so concurrent movements are kept
+                    adjust(product, MovementKind.ADJUSTMENT, delta, self.request.user, note='Inventory form edit')
+        except StockError as e:
+            form.add_error('stock_on_hand', str(e))
+            return self.form_invalid(form)
         messages.success(self.request, 'Inventory product updated successfully.')
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 class InventoryDeleteView(LoginRequiredMixin, CompanyScopedMixin, DeleteView):
@@ -532,4 +722,241 @@ class InventoryDeleteView(LoginRequiredMixin, CompanyScopedMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         messages.success(self.request, 'Inventory product deleted.')
-        return super().delete(request, *args, **kwargs)
\ No newline at end of file
+        return super().delete(request, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Bulk import (health checks & feed schedules)
+# ---------------------------------------------------------------------------
+class BulkImportView(LoginRequiredMixin, CompanyScopedMixin, FormView):
+    form_class = BulkImportForm
+    template_name = 'products/bulk_import.html'
+    login_url = 'company:login'
+    max_reported_errors = 200
+
+    def form_valid(self, form):
+        company = self.get_user_company()
+        if not company:
+            messages.error(self.request, 'You must be associated with a company to perform this action.')
+            return self.form_invalid(form)
+
+        upload = form.cleaned_data['file']
+        try:
+            fmt = form.cleaned_data['format'] or detect_format(upload.name)
+        except ImportFormatError as exc:
+            form.add_error('file', str(exc))
+            return self.form_invalid(form)
+
+        # The upload is parsed incrementally; nothing holds the whole file in memory
+        result = import_file(
+            form.cleaned_data['kind'], open_text(upload.file), fmt, company,
+            max_errors=self.max_reported_errors,
+        )
+
+        if result.fatal_error:
+            messages.error(self.request, f'Import stopped early: {result.fatal_error}')
+        if result.imported:
+            messages.success(self.request, f'Imported {result.imported} of {result.rows} rows.')
+        if result.error_count:
+            messages.warning(self.request, f'{result.error_count} rows were rejected.')
+        return self.render_to_response(self.get_context_data(form=self.form_class(), result=result))
+
+
+# ---------------------------------------------------------------------------
+# Streaming export
+# ---------------------------------------------------------------------------
+class ExportView(LoginRequiredMixin, CompanyScopedMixin, View):
+    login_url = 'company:login'
+
+    def get(self, request, dataset):
+        company = self.get_user_company()
+        fmt = request.GET.get('format', CSV)
+        if dataset not in DATASETS or fmt not in CONTENT_TYPES or not company:
+            raise Http404('Unknown export.')
+
+        response = StreamingHttpResponse(stream_export(dataset, company, fmt), content_type=CONTENT_TYPES[fmt])
+        filename = f"{company.slug or 'company'}-{dataset}-{timezone.now():%Y%m%d}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+# ---------------------------------------------------------------------------
+# Stock movements
+# ---------------------------------------------------------------------------
+class StockMovementBulkView(LoginRequiredMixin, CompanyScopedMixin, View):
+    """
+    GET lists recent movements (``?product=<id>``, ``?limit=``). POST applies
+    ``{"movements": [{"product" or "sku", "kind", "quantity", ...}, ...]}``
+    in one transaction: all of them or, on any error, none.
+    """
+    raise_exception = True
+
+    def error(self, message, status=400, **extra):
+        return JsonResponse({'error': message, **extra}, status=status)
+
+    def get(self, request):
+        company = self.get_user_company()
+        if not company:
+            return self.error('Not found.', status=404)
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+        except ApiError as e:
+            return self.error(str(e))
+        movements = StockMovement.objects.filter(company=company)
+        if request.GET.get('product', '').isdigit():
+            movements = movements.filter(product_id=request.GET['product'])
+        rows = movements.order_by('-id').values(
+            'id', 'product', 'kind', 'quantity', 'reference', 'note', 'feed_schedule', 'treatment', 'created_at',
+        )[:limit]
+        return JsonResponse({'results': list(rows)})
+
+    def post(self, request):
+        company = self.get_user_company()
+        if not company:
+            return self.error('Not found.', status=404)
+        try:
+            rows = json.loads(request.body)['movements']
+        except (ValueError, KeyError, TypeError):
+            return self.error('Expected a JSON object with a "movements" list.')
+        if not isinstance(rows, list) or not rows:
+            return self.error('"movements" must be a non-empty list.')
+        if len(rows) > MAX_BULK_MOVEMENTS:
+            return self.error(f'At most {MAX_BULK_MOVEMENTS} movements per request.')
+
+        forms, errors = [], {}
+        for index, row in enumerate(rows):
+            form = StockMovementForm(data=row if isinstance(row, dict) else {})
+            if form.is_valid():
+                forms.append((index, form.cleaned_data))
+            else:
+                errors[index] = form.errors.get_json_data()
+        # SKUs of the whole request resolved with one query
+        skus = {data['sku'] for _, data in forms if not data['product']}
+        by_sku = dict(InventoryProduct.objects.filter(company=company, sku__in=skus).values_list('sku', 'pk'))
+        movements = []
+        for index, data in forms:
+            product_id = data['product'] or by_sku.get(data['sku'])
+            if product_id is None:
+                errors[index] = {'sku': [{'message': f"Unknown sku '{data['sku']}'.", 'code': 'invalid'}]}
+                continue
+            movements.append(StockMovement(
+                product_id=product_id, kind=data['kind'], quantity=data['quantity'],
+                reference=data['reference'], note=data['note'],
+            ))
+        if errors:
+            return self.error('Invalid movements; nothing was applied.', errors=errors)
+
+        try:
+            stock = apply_movements(company, movements, request.user)
+        except StockError as e:
+            return self.error(f'{e}; nothing was applied.', status=409)
+        return JsonResponse({'applied': len(movements), 'stock': stock})
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+class SearchView(LoginRequiredMixin, CompanyScopedMixin, TemplateView):
+    """Ranked full-text search over the company's records and the shared catalogs"""
+    template_name = 'products/search.html'
+    login_url = 'company:login'
+    paginate_by = 20
+
+    def search(self):
+        query = self.request.GET.get('q', '').strip()
+        kind = self.request.GET.get('kind')
+        kinds = [kind] if kind in SearchKind.values else None
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        results, has_next = search(
+            self.get_user_company(), query, kinds, self.paginate_by, (page - 1) * self.paginate_by,
+        )
+        return {'query': query, 'kind': kinds[0] if kinds else '', 'page': page,
+                'results': results, 'has_next': has_next}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(self.search())
+        context['kind_choices'] = SearchKind.choices
+        return context
+
+class SearchApiView(SearchView):
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        found = self.search()
+        return JsonResponse({
+            'query': found['query'],
+            'page': found['page'],
+            'has_next': found['has_next'],
+            'results': [result.as_dict() for result in found['results']],
+        })
+
+# ---------------------------------------------------------------------------
+# JSON API (read-only)
+# ---------------------------------------------------------------------------
+class ApiView(LoginRequiredMixin, CompanyScopedMixin, View):
+    """Base for API endpoints: JSON errors, 403 instead of a login redirect"""
+    raise_exception = True
+
+    def error(self, message, status=400):
+        return JsonResponse({'error': message}, status=status)
+
+    def get(self, request, resource, **kwargs):
+        self.resource = RESOURCES.get(resource)
+        company = self.get_user_company()
+        if self.resource is None or not company:
+            return self.error('Not found.', status=404)
+        try:
+            fields = self.resource.select_fields(request.GET.get('fields'))
+            queryset = self.resource.filter(self.resource.queryset(company), request.GET)
+            return self.respond(request, queryset, fields, **kwargs)
+        except ApiError as e:
+            return self.error(str(e))
+        except InvalidCursor:
+            return self.error('Invalid cursor.')
+
+    def not_modified(self, request, etag):
+        """304 when the client's If-None-Match matches, checked before any rows are read"""
+        return get_conditional_response(request, etag=etag)
+
+class ApiListView(ApiView):
+    def respond(self, request, queryset, fields):
+        limit = parse_limit(request.GET.get('limit'))
+        cursor = request.GET.get('cursor') or None
+        direction = PREVIOUS if request.GET.get('dir') == PREVIOUS else NEXT
+
+        etag = compute_etag(
+            queryset, fields, limit, cursor, direction, timestamps=self.resource.timestamps(fields),
+        )
+        response = self.not_modified(request, etag)
+        if response is None:
+            page, rows = paginate(self.resource, queryset, fields, limit, cursor, direction)
+            response = JsonResponse({
+                'results': rows,
+                'next': self.page_url(request, page.next_cursor, NEXT),
+                'previous': self.page_url(request, page.previous_cursor, PREVIOUS),
+            })
+        response['ETag'] = etag
+        return response
+
+    def page_url(self, request, cursor, direction):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        params['dir'] = direction
+        return f"{request.path}?{params.urlencode()}"
+
+class ApiDetailView(ApiView):
+    def respond(self, request, queryset, fields, pk):
+        queryset = queryset.filter(pk=pk)
+        etag = compute_etag(queryset, fields, timestamps=self.resource.timestamps(fields))
+        response = self.not_modified(request, etag)
+        if response is None:
+            row = queryset.values(*fields).first()
+            if row is None:
+                return self.error('Not found.', status=404)
+            response = JsonResponse(row)
+        response['ETag'] = etag
+        return response